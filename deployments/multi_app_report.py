@@ -0,0 +1,18 @@
+"""多应用并发报告 Deployment（同一个 Dify 实例上的多个应用共享连接和限速）"""
+
+from src.flows.multi_app_flow import multi_app_report_flow
+
+
+if __name__ == "__main__":
+    # 每天 02:00 在一个进程内处理所有带 "daily" 标签的 WorkflowReportConfig Block
+    # 对 Dify 的总请求速率不超过每秒 20 次，同一账户只登录一次 Console
+    multi_app_report_flow.serve(
+        name="multi-app-daily-report",
+        cron="0 2 * * *",
+        parameters={
+            "tags": ["daily"],
+            "max_concurrency": 8,
+            "requests_per_second": 20,
+        },
+        tags=["daily", "report", "workflow", "multi-app"],
+    )
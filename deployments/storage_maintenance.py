@@ -0,0 +1,18 @@
+"""存储维护 Deployment（分区合并 + 过期清理）"""
+
+from src.flows.maintenance_flow import storage_maintenance_flow
+
+
+if __name__ == "__main__":
+    # 每周一 04:00 把上上周及更早的日分区合并为周分区，并清理 90 天前的文件
+    # 存储类型和连接参数读取环境变量（STORAGE_TYPE、OUTPUT_BASE_DIR、S3_* 等）
+    storage_maintenance_flow.serve(
+        name="storage-maintenance",
+        cron="0 4 * * 1",
+        parameters={
+            "granularity": "weekly",
+            "min_age_days": 7,
+            "retention_days": 90,
+        },
+        tags=["maintenance", "storage"],
+    )
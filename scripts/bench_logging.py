@@ -0,0 +1,84 @@
+"""日志开销基准（逐条日志 vs 低开销模式）"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from loguru import logger  # noqa: E402
+
+from src.core.logger import LogSampler, ProgressLogger, setup_logger  # noqa: E402
+
+# 模拟一条日志的请求参数（与获取日志时的 params 大小相近）
+PARAMS = {"page": 12, "limit": 100, "keyword": "退款", "created_at__after": "2024-01-01T00:00:00Z"}
+
+
+class SlowStream:
+    """每次写入耗时约 write_delay 秒的输出流"""
+
+    def __init__(self, write_delay: float = 0.00005):
+        self.write_delay = write_delay
+
+    def write(self, message: str):
+        time.sleep(self.write_delay)
+
+    def flush(self):
+        pass
+
+
+def measure(func, count: int) -> float:
+    """运行 count 次，返回每次调用的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    logger.complete()
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量热点路径上的日志开销")
+    parser.add_argument("--count", type=int, default=20000, help="每项调用次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        results = {}
+
+        # 1. 未启用的 DEBUG 日志：f-string 每次都格式化，{} 占位符只在输出时格式化
+        setup_logger(log_level="INFO", log_dir=Path(log_dir), low_overhead=False)
+        results["DEBUG f-string（未输出）"] = measure(lambda i: logger.debug(f"请求参数: {PARAMS}, 第 {i} 条"), args.count)
+        results["DEBUG {} 占位符（未输出）"] = measure(lambda i: logger.debug("请求参数: {}, 第 {} 条", PARAMS, i), args.count)
+
+        # 2. 逐条输出 INFO 到较慢的终端（模拟 Prefect Worker 等读取较慢的管道），只统计记录日志的线程耗时
+        stderr = sys.stderr
+        sys.stderr = SlowStream()
+        try:
+            setup_logger(log_level="INFO", log_dir=Path(log_dir), low_overhead=False)
+            results["逐条 INFO（同步输出）"] = measure(lambda i: logger.info("处理日志 {}", i), args.count)
+            setup_logger(log_level="INFO", log_dir=Path(log_dir), low_overhead=True)
+            start = time.perf_counter()
+            for i in range(args.count):
+                logger.info("处理日志 {}", i)
+            results["逐条 INFO（低开销模式）"] = (time.perf_counter() - start) / args.count * 1_000_000
+            logger.remove()
+        finally:
+            sys.stderr = stderr
+
+        # 3. 代替逐条日志的进度行和采样警告
+        setup_logger(log_level="INFO", enable_file_logging=False, low_overhead=True)
+        progress = ProgressLogger("基准", total=args.count)
+        results["ProgressLogger.advance"] = measure(lambda i: progress.advance(), args.count)
+        sampler = LogSampler()
+        results["LogSampler.warning"] = measure(lambda i: sampler.warning("bench", "获取日志 {} 失败", i), args.count)
+
+    logger.remove()
+    print(f"每项 {args.count} 次调用，平均每次耗时:")
+    for name, micros in results.items():
+        print(f"  {name:<28} {micros:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
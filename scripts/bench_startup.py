@@ -0,0 +1,69 @@
+"""命令行启动耗时基准（防止导入开销回退）"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# 普通命令需要的全部模块；flow 以外的命令都不应导入 Prefect
+FETCH_IMPORTS = (
+    "import sys, dotenv, src.cli, src.core.logger, src.core.exceptions, src.services.fetcher, src.utils.jsoncodec; "
+    "assert 'prefect' not in sys.modules, 'prefect 被导入'"
+)
+
+# 真正获取日志时必须导入的第三方库（HTTP 客户端和日志），fetch 依赖导入扣除这部分后再与预算比较，
+# 只衡量本项目代码带来的导入开销（如误导入 Prefect、pandas 等）
+FETCH_FLOOR_IMPORTS = "import dotenv, requests, loguru"
+
+# 名称 -> (命令, 扣除的基准命令；None 表示空解释器)
+CASES = {
+    "--help": ([sys.executable, "-m", "src.cli", "--help"], None),
+    "fetch --help": ([sys.executable, "-m", "src.cli", "fetch", "--help"], None),
+    "fetch 依赖导入": ([sys.executable, "-c", FETCH_IMPORTS], [sys.executable, "-c", FETCH_FLOOR_IMPORTS]),
+}
+
+
+def measure(command, runs: int) -> float:
+    """多次运行命令，返回耗时中位数（毫秒）"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=project_root, check=True, stdout=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量 dify-monitor 命令行的启动耗时")
+    parser.add_argument("--runs", type=int, default=7, help="每项运行次数（取中位数）")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=150.0,
+        help="启动开销上限（毫秒，扣除空解释器的启动时间；fetch 依赖导入另外扣除 requests / loguru 的导入时间），"
+        "超过时退出码为 1",
+    )
+    args = parser.parse_args()
+
+    baseline = measure([sys.executable, "-c", "pass"], args.runs)
+    print(f"空解释器: {baseline:.0f} ms")
+
+    failed = False
+    for name, (command, floor_command) in CASES.items():
+        elapsed = measure(command, args.runs)
+        floor = measure(floor_command, args.runs) if floor_command else baseline
+        overhead = elapsed - floor
+        status = "OK" if overhead <= args.budget_ms else "超出"
+        failed = failed or overhead > args.budget_ms
+        note = f"，扣除第三方库 {floor - baseline:.0f} ms" if floor_command else ""
+        print(f"{name:<16} {elapsed:6.0f} ms（开销 {overhead:5.0f} ms{note}） {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
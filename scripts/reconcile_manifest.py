@@ -0,0 +1,36 @@
+"""从磁盘重建本地存储的产物清单"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.config import DifyConfig
+from src.services.artifact_manifest import ArtifactManifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="扫描 reports/ 和 data/ 目录，重建产物清单（.manifest.db）")
+    parser.add_argument(
+        "--base-dir",
+        default=None,
+        help="存储基础目录（默认使用环境变量 OUTPUT_BASE_DIR，未设置时为 ./outputs）",
+    )
+    args = parser.parse_args()
+
+    base_dir = args.base_dir or DifyConfig.from_env().output_base_dir
+    with ArtifactManifest(base_dir) as manifest:
+        result = manifest.reconcile()
+
+    print(f"清单: {Path(base_dir) / ArtifactManifest.DB_FILENAME}")
+    print(f"  新增: {result['added']}")
+    print(f"  更新: {result['updated']}")
+    print(f"  删除: {result['removed']}")
+    print(f"  总数: {result['total']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 """工作流日志报表配置 Block（存到 Prefect Server 的 Blocks 里，UI 可维护）"""
 
-from typing import Optional
+from typing import List, Optional, Union
 from prefect.blocks.core import Block
 from pydantic import Field
 
@@ -31,6 +31,10 @@ class WorkflowReportConfig(Block):
         None,
         description="应用 ID（可选），用于获取应用详情"
     )
+    tags: List[str] = Field(
+        default_factory=list,
+        description="标签（可选），多应用 Flow 按标签选择要处理的应用，例如 [\"daily\"]"
+    )
     
     # Console 配置（可选，用于需要 Console API 的场景）
     console_token: Optional[str] = Field(
@@ -47,14 +51,22 @@ class WorkflowReportConfig(Block):
     )
     
     # 输出配置
-    output_format: str = Field(
+    output_format: Union[str, List[str]] = Field(
         "csv",
-        description="输出格式: csv/markdown/json"
+        description="输出格式: csv/markdown/json/ndjson/ndjson.gz/webhook，多个格式可用列表或逗号分隔（如 csv,markdown），只获取一次日志"
     )
     output_dir: str = Field(
         "./outputs/reports/daily",
         description="输出目录路径"
     )
+    index_dir: Optional[str] = Field(
+        None,
+        description="本地索引目录（检索命中索引等），None 表示使用 output_dir/.index"
+    )
+    compression: Optional[str] = Field(
+        None,
+        description="报告文件压缩策略，如 report=gzip,export=zstd（report: CSV 报告，export: json/ndjson 导出），None 表示不压缩"
+    )
     
     # 功能开关
     fetch_all: bool = Field(
@@ -73,6 +85,33 @@ class WorkflowReportConfig(Block):
         True,
         description="是否在完成时发送通知"
     )
+    resume: Optional[bool] = Field(
+        None,
+        description="是否从检查点恢复（参数相同的重试和重新运行跳过已获取的分页和已丰富的日志），"
+                    "None 表示只在 created_at_before 不晚于当前时间时开启"
+    )
+    
+    # 分片丰富（可选，用于大批量回填）
+    enrich_chunk_size: Optional[int] = Field(
+        None,
+        description="分片丰富时每个分片的日志数（None 表示由单个任务处理全部日志）"
+    )
+    enrich_chunk_retries: int = Field(
+        2,
+        description="每个分片失败后的重试次数"
+    )
+    task_runner: str = Field(
+        "thread",
+        description="分片丰富使用的任务执行器: thread/process/dask/ray（dask/ray 需要安装 distributed 可选依赖）"
+    )
+    task_runner_workers: Optional[int] = Field(
+        None,
+        description="任务执行器的并发数（线程 / 进程数，dask 本地集群的 worker 数）"
+    )
+    task_runner_address: Optional[str] = Field(
+        None,
+        description="dask 调度器或 ray 集群地址（None 表示启动本地临时集群）"
+    )
     
     # 查询参数（可选）
     limit: int = Field(
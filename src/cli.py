@@ -0,0 +1,332 @@
+"""
+dify-monitor 命令行入口
+
+各子命令只在执行时才导入所需模块：--help 和参数解析不导入 requests / loguru，
+fetch / report / search 只使用 src.services，只有 flow 子命令会导入 Prefect。
+启动耗时由 scripts/bench_startup.py 检查。
+
+示例:
+    dify-monitor fetch --all --with-details --output logs.json
+    dify-monitor report --after 2024-01-01T00:00:00Z --format csv,markdown --output-dir ./outputs/reports
+    dify-monitor search "退款 流程" --output-dir ./outputs/reports
+    dify-monitor flow run --config-name daily-workflow-report
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def _add_api_arguments(parser: argparse.ArgumentParser):
+    """Dify API 连接参数（未提供时读取 DIFY_* 环境变量 / .env）"""
+    group = parser.add_argument_group("Dify API")
+    group.add_argument("--base-url", help="Dify API 基础 URL（默认 DIFY_BASE_URL）")
+    group.add_argument("--api-token", help="应用 API Token（默认 DIFY_API_TOKEN）")
+    group.add_argument("--app-id", help="应用 ID（默认 DIFY_APP_ID）")
+    group.add_argument("--console-token", help="Console API Token（默认 DIFY_CONSOLE_TOKEN）")
+    group.add_argument("--console-email", help="Console 登录邮箱（默认 DIFY_CONSOLE_EMAIL）")
+    group.add_argument("--console-password", help="Console 登录密码（默认 DIFY_CONSOLE_PASSWORD）")
+
+
+def _add_filter_arguments(parser: argparse.ArgumentParser):
+    """日志过滤和分页参数"""
+    group = parser.add_argument_group("过滤")
+    group.add_argument("--keyword", help="搜索关键词")
+    group.add_argument("--status", help="执行状态（succeeded/failed/stopped）")
+    group.add_argument("--after", help="创建时间下限（ISO 8601，如 2024-01-01T00:00:00Z）")
+    group.add_argument("--before", help="创建时间上限（ISO 8601）")
+    group.add_argument("--session-id", help="终端用户会话 ID")
+    group.add_argument("--account", help="创建者账户邮箱")
+    group.add_argument("--limit", type=int, default=20, help="每页数量（默认 20）")
+    group.add_argument("--all", action="store_true", help="自动翻页获取所有日志")
+    group.add_argument("--max-pages", type=int, help="最大页数")
+    group.add_argument("--with-details", action="store_true", help="获取工作流运行详情")
+    group.add_argument("--with-node-executions", action="store_true", help="获取节点执行详情（需要 Console 登录）")
+
+
+def _env(value: Optional[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    return value or os.getenv(name) or default
+
+
+def _load_dotenv():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def _fetch_logs(args: argparse.Namespace) -> Dict[str, Any]:
+    """按命令行参数获取（并丰富）日志"""
+    from src.core.exceptions import DifyConfigError
+    from src.services.fetcher import WorkflowLogFetcher
+
+    api_token = _env(args.api_token, "DIFY_API_TOKEN")
+    if not api_token:
+        raise DifyConfigError("必须提供 --api-token 或环境变量 DIFY_API_TOKEN")
+
+    app_id = _env(args.app_id, "DIFY_APP_ID")
+    fetcher = WorkflowLogFetcher(
+        base_url=_env(args.base_url, "DIFY_BASE_URL", "http://localhost"),
+        api_token=api_token,
+        console_token=_env(args.console_token, "DIFY_CONSOLE_TOKEN"),
+        console_email=_env(args.console_email, "DIFY_CONSOLE_EMAIL") if args.with_node_executions else None,
+        console_password=_env(args.console_password, "DIFY_CONSOLE_PASSWORD") if args.with_node_executions else None,
+    )
+    filters = dict(
+        keyword=args.keyword,
+        status=args.status,
+        created_at_before=args.before,
+        created_at_after=args.after,
+        created_by_end_user_session_id=args.session_id,
+        created_by_account=args.account,
+        limit=args.limit,
+    )
+    if args.all:
+        logs = fetcher.fetch_all_logs(max_pages=args.max_pages, **filters)
+        result = {"total": len(logs), "data": logs, "has_more": False}
+    else:
+        result = fetcher.fetch_logs(page=1, **filters)
+
+    if args.with_details or args.with_node_executions:
+        from src.core.logger import ProgressLogger
+
+        enriched = []
+        progress = ProgressLogger("丰富日志", total=len(result.get("data", [])))
+        for log in result.get("data", []):
+            try:
+                enriched.append(fetcher.enrich_log_with_details(
+                    log.copy(),
+                    default_app_id=app_id,
+                    include_node_executions=args.with_node_executions,
+                ))
+            except Exception as e:
+                log["enrichment_error"] = str(e)
+                enriched.append(log)
+            progress.advance()
+        progress.finish()
+        result = {**result, "data": enriched}
+    return result
+
+
+def cmd_fetch(args: argparse.Namespace) -> int:
+    """获取日志，输出 JSON（--output 以 .ndjson 结尾时每行一条日志）"""
+    from src.utils import jsoncodec
+
+    result = _fetch_logs(args)
+    if args.output in (None, "-"):
+        sys.stdout.write(jsoncodec.dumps(result, indent=2) + "\n")
+        return 0
+
+    from src.utils.atomic import atomic_write_bytes
+
+    if args.output.endswith(".ndjson"):
+        payload = b"".join(jsoncodec.dumps_bytes(log) + b"\n" for log in result.get("data", []))
+    else:
+        payload = jsoncodec.dumps_bytes(result, indent=2)
+    atomic_write_bytes(args.output, payload)
+    print(f"已写入 {len(result.get('data', []))} 条日志: {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_report(args: argparse.Namespace) -> int:
+    """获取日志并生成报告（不经过 Prefect）"""
+    from pathlib import Path
+    from src.services.report_sinks import generate_reports
+
+    result = _fetch_logs(args)
+    report = generate_reports(
+        result,
+        output_dir=args.output_dir,
+        output_format=args.format,
+        index_dir=args.index_dir or str(Path(args.output_dir) / ".index"),
+        compression=args.compression,
+        force=args.force,
+    )
+    if report.get("skipped"):
+        print("输入与上次生成时一致，报告未变化", file=sys.stderr)
+    for path in report.get("report_files", []):
+        print(path)
+    return 0
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    """在本地全文检索索引中搜索"""
+    from datetime import datetime
+    from pathlib import Path
+    from src.services.search_index import LogSearchIndex
+    from src.utils.formatters import format_timestamp
+
+    def parse_time(value: Optional[str]) -> Optional[int]:
+        if not value:
+            return None
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+    index_dir = args.index_dir or str(Path(args.output_dir) / ".index")
+    if not LogSearchIndex.exists(index_dir):
+        print(f"全文检索索引不存在: {index_dir}", file=sys.stderr)
+        return 1
+
+    with LogSearchIndex(index_dir) as search_index:
+        results = search_index.search(
+            " ".join(args.query),
+            limit=args.limit,
+            created_at_after=parse_time(args.after),
+            created_at_before=parse_time(args.before),
+        )
+
+    if args.json:
+        from src.utils import jsoncodec
+        sys.stdout.write(jsoncodec.dumps(results, indent=2) + "\n")
+        return 0
+    for i, record in enumerate(results, 1):
+        print(f"{i}. {record['log_id']} [{record['status']}] {format_timestamp(record['created_at'])}")
+        print(f"   提问: {record['user_query']}")
+        print(f"   回答: {record['ai_answer'][:200]}")
+    print(f"命中 {len(results)} 条日志", file=sys.stderr)
+    return 0
+
+
+def _print_json(result: Any):
+    from src.utils import jsoncodec
+    sys.stdout.write(jsoncodec.dumps(result, indent=2, default=str) + "\n")
+
+
+def cmd_flow_run(args: argparse.Namespace) -> int:
+    """运行 fetch_workflow_logs_flow"""
+    from src.flows.workflow_log_flow import fetch_workflow_logs_flow
+
+    _print_json(fetch_workflow_logs_flow(
+        config_name=args.config_name,
+        created_at_after=args.after,
+        created_at_before=args.before,
+        output_format=args.format,
+        output_dir=args.output_dir,
+    ))
+    return 0
+
+
+def cmd_flow_multi_app(args: argparse.Namespace) -> int:
+    """运行 multi_app_report_flow"""
+    from src.flows.multi_app_flow import multi_app_report_flow
+
+    summary = multi_app_report_flow(
+        config_names=args.config_names,
+        tags=args.tags,
+        max_concurrency=args.max_concurrency,
+        requests_per_second=args.requests_per_second,
+        created_at_after=args.after,
+        created_at_before=args.before,
+    )
+    _print_json(summary)
+    return 0 if summary.get("status") == "success" else 1
+
+
+def cmd_flow_maintenance(args: argparse.Namespace) -> int:
+    """运行 storage_maintenance_flow"""
+    from src.flows.maintenance_flow import storage_maintenance_flow
+
+    _print_json(storage_maintenance_flow(
+        app_id=args.app_id,
+        granularity=args.granularity,
+        min_age_days=args.min_age_days,
+        retention_days=args.retention_days,
+    ))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行解析器"""
+    parser = argparse.ArgumentParser(
+        prog="dify-monitor",
+        description="Dify 工作流日志监控命令行工具",
+    )
+    parser.add_argument("--log-level", default=None, help="日志级别（默认 LOG_LEVEL 或 INFO）")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    fetch = subparsers.add_parser("fetch", help="获取日志并输出 JSON / NDJSON")
+    _add_api_arguments(fetch)
+    _add_filter_arguments(fetch)
+    fetch.add_argument("--output", "-o", help="输出文件（.json 或 .ndjson，默认输出到标准输出）")
+    fetch.set_defaults(handler=cmd_fetch)
+
+    report = subparsers.add_parser("report", help="获取日志并生成报告（不经过 Prefect）")
+    _add_api_arguments(report)
+    _add_filter_arguments(report)
+    report.add_argument("--format", default="csv", help="输出格式，逗号分隔（csv/markdown/json/ndjson/ndjson.gz/webhook）")
+    report.add_argument("--output-dir", default="./outputs/reports", help="输出目录")
+    report.add_argument("--index-dir", help="本地索引目录（默认 OUTPUT_DIR/.index）")
+    report.add_argument("--compression", help="压缩策略，如 report=gzip,export=zstd")
+    report.add_argument("--force", action="store_true", help="忽略输入指纹，强制重新生成")
+    report.set_defaults(handler=cmd_report)
+
+    search = subparsers.add_parser("search", help="在本地全文检索索引中搜索（不访问 Dify API）")
+    search.add_argument("query", nargs="+", help="检索词（多个词需同时命中）")
+    search.add_argument("--output-dir", default="./outputs/reports", help="输出目录（索引位于 OUTPUT_DIR/.index）")
+    search.add_argument("--index-dir", help="本地索引目录")
+    search.add_argument("--after", help="创建时间下限（ISO 8601）")
+    search.add_argument("--before", help="创建时间上限（ISO 8601）")
+    search.add_argument("--limit", type=int, default=20, help="最多返回条数")
+    search.add_argument("--json", action="store_true", help="以 JSON 输出")
+    search.set_defaults(handler=cmd_search)
+
+    flow = subparsers.add_parser("flow", help="运行 Prefect Flow（会导入 Prefect）")
+    flow_commands = flow.add_subparsers(dest="flow_command", metavar="FLOW", required=True)
+
+    run = flow_commands.add_parser("run", help="运行 fetch_workflow_logs_flow")
+    run.add_argument("--config-name", help="Prefect Block 名称")
+    run.add_argument("--after", help="创建时间下限（ISO 8601）")
+    run.add_argument("--before", help="创建时间上限（ISO 8601）")
+    run.add_argument("--format", help="输出格式，逗号分隔（覆盖 Block）")
+    run.add_argument("--output-dir", help="输出目录（覆盖 Block）")
+    run.set_defaults(handler=cmd_flow_run)
+
+    multi_app = flow_commands.add_parser("multi-app", help="并发处理多个应用（multi_app_report_flow）")
+    multi_app.add_argument("--config-names", nargs="*", help="Block 名称")
+    multi_app.add_argument("--tags", nargs="*", help="Block 标签")
+    multi_app.add_argument("--max-concurrency", type=int, default=8, help="同时处理的应用数")
+    multi_app.add_argument("--requests-per-second", type=float, help="每个 Dify 主机的每秒请求数上限")
+    multi_app.add_argument("--after", help="创建时间下限（ISO 8601）")
+    multi_app.add_argument("--before", help="创建时间上限（ISO 8601）")
+    multi_app.set_defaults(handler=cmd_flow_multi_app)
+
+    maintenance = flow_commands.add_parser("maintenance", help="分区合并和过期清理（storage_maintenance_flow）")
+    maintenance.add_argument("--app-id", help="只合并指定应用的分区")
+    maintenance.add_argument("--granularity", choices=["weekly", "monthly"], default="weekly", help="合并粒度")
+    maintenance.add_argument("--min-age-days", type=int, default=7, help="周期结束至少多少天后才合并")
+    maintenance.add_argument("--retention-days", type=int, help="保留天数（不提供时不清理）")
+    maintenance.set_defaults(handler=cmd_flow_maintenance)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv: 命令行参数（None 表示使用 sys.argv）
+
+    Returns:
+        退出码
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "handler", None):
+        parser.print_help()
+        return 2
+
+    _load_dotenv()
+    from src.core.logger import setup_logger
+    setup_logger(log_level=(args.log_level or os.getenv("LOG_LEVEL", "INFO")).upper())
+
+    from src.core.exceptions import DifyWorkflowLogError
+    try:
+        return args.handler(args)
+    except DifyWorkflowLogError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,7 @@ class StorageConfig(BaseModel):
     """存储配置"""
     type: str = Field(default="local", description="存储类型: local/oss/s3")
     config: Dict[str, Any] = Field(default_factory=dict, description="存储后端配置")
+    compression: Optional[str] = Field(default=None, description="压缩策略，如 report=gzip,data=zstd")
 
 
 class NotificationConfig(BaseModel):
@@ -21,6 +22,7 @@ class NotificationConfig(BaseModel):
     enabled: bool = Field(default=False, description="是否启用通知")
     type: str = Field(default="email", description="通知类型: email/dingtalk/wechat")
     config: Dict[str, Any] = Field(default_factory=dict, description="通知渠道配置")
+    digest_window: float = Field(default=60.0, description="报告通知合并窗口（秒），窗口内的多条通知合并为一条摘要")
 
 
 class DifyConfig(BaseModel):
@@ -80,23 +82,34 @@ class DifyConfig(BaseModel):
             output_base_dir=os.getenv("OUTPUT_BASE_DIR", "./outputs"),
             storage=StorageConfig(
                 type=os.getenv("STORAGE_TYPE", "local"),
+                compression=os.getenv("STORAGE_COMPRESSION") or None,
                 config={
                     "endpoint": os.getenv("OSS_ENDPOINT"),
                     "access_key_id": os.getenv("OSS_ACCESS_KEY_ID"),
                     "access_key_secret": os.getenv("OSS_ACCESS_KEY_SECRET"),
                     "bucket_name": os.getenv("OSS_BUCKET_NAME"),
-                } if os.getenv("STORAGE_TYPE") == "oss" else {}
+                } if os.getenv("STORAGE_TYPE") == "oss" else {
+                    "bucket_name": os.getenv("S3_BUCKET_NAME"),
+                    "endpoint_url": os.getenv("S3_ENDPOINT_URL"),
+                    "access_key_id": os.getenv("S3_ACCESS_KEY_ID"),
+                    "secret_access_key": os.getenv("S3_SECRET_ACCESS_KEY"),
+                    "region": os.getenv("S3_REGION"),
+                    "prefix": os.getenv("S3_PREFIX", ""),
+                } if os.getenv("STORAGE_TYPE") == "s3" else {}
             ),
             notification=NotificationConfig(
                 enabled=os.getenv("NOTIFICATION_ENABLED", "false").lower() == "true",
                 type=os.getenv("NOTIFICATION_TYPE", "email"),
+                digest_window=float(os.getenv("NOTIFICATION_DIGEST_WINDOW", "60")),
                 config={
                     "smtp_host": os.getenv("SMTP_HOST"),
                     "smtp_port": int(os.getenv("SMTP_PORT", "587")),
                     "smtp_user": os.getenv("SMTP_USER"),
                     "smtp_password": os.getenv("SMTP_PASSWORD"),
                     "smtp_to": os.getenv("SMTP_TO"),
+                    "smtp_starttls": os.getenv("SMTP_STARTTLS", "true").lower() == "true",
                     "dingtalk_webhook": os.getenv("DINGTALK_WEBHOOK"),
+                    "messages_per_minute": int(os.getenv("DINGTALK_MESSAGES_PER_MINUTE", "20")),
                 }
             ),
             log_level=os.getenv("LOG_LEVEL", "INFO"),
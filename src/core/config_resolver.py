@@ -0,0 +1,347 @@
+"""运行配置解析（Block 配置本地缓存）"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.core.config import DifyConfig, NotificationConfig
+from src.core.logger import get_logger
+from src.utils import jsoncodec
+from src.utils.atomic import atomic_write_bytes
+
+logger = get_logger(__name__)
+
+# 参数传入时覆盖 Block 中的值（空值视为未传入）
+_BLOCK_FIELDS = (
+    "base_url",
+    "api_token",
+    "app_id",
+    "console_token",
+    "console_email",
+    "console_password",
+    "output_format",
+    "output_dir",
+    "index_dir",
+    "compression",
+    "limit",
+    "max_pages",
+    "enrich_chunk_size",
+    "task_runner",
+    "task_runner_workers",
+    "task_runner_address",
+)
+
+# 布尔 / 可以为 0 的参数：只有 None 视为未传入
+_BLOCK_FLAG_FIELDS = (
+    "fetch_all",
+    "with_details",
+    "with_node_executions",
+    "notify_on_complete",
+    "resume",
+    "enrich_chunk_retries",
+)
+
+# 不使用 Block 时的默认值
+_ENV_DEFAULTS = {
+    "output_format": "csv",
+    "output_dir": "./outputs/reports",
+    "fetch_all": True,
+    "with_details": True,
+    "with_node_executions": False,
+    "notify_on_complete": False,
+    "limit": 20,
+    "enrich_chunk_retries": 2,
+    "task_runner": "thread",
+}
+
+
+class ResolvedRunConfig(BaseModel):
+    """
+    一次 Flow 运行解析后的配置（不可修改）
+
+    合并了参数、Block（或环境变量）和默认值，Flow 运行期间只使用这一份配置。
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    base_url: str
+    api_token: str
+    app_id: Optional[str] = None
+    console_token: Optional[str] = None
+    console_email: Optional[str] = None
+    console_password: Optional[str] = None
+    output_format: Union[str, Tuple[str, ...]] = "csv"
+    output_dir: str = "./outputs/reports"
+    index_dir: str
+    compression: Optional[str] = None
+    fetch_all: bool = True
+    with_details: bool = True
+    with_node_executions: bool = False
+    notify_on_complete: bool = False
+    # None 表示时间范围有确定上限时自动开启（见 src.services.checkpoint.is_bounded_window）
+    resume: Optional[bool] = None
+    limit: int = 20
+    max_pages: Optional[int] = None
+    enrich_chunk_size: Optional[int] = None
+    enrich_chunk_retries: int = 2
+    task_runner: str = "thread"
+    task_runner_workers: Optional[int] = None
+    task_runner_address: Optional[str] = None
+    notification: NotificationConfig = Field(default_factory=NotificationConfig)
+    source: str = Field("env", description="配置来源: block/block-cache/block-stale/env")
+
+
+class BlockConfigCache:
+    """
+    WorkflowReportConfig Block 的本地缓存
+
+    - 进程内缓存和磁盘缓存（每个 Block 一个 JSON 文件，权限 0600）在 ttl 秒内直接使用，不访问 Prefect API；
+    - 过期或 Block 类的字段定义（schema checksum）变化后重新读取 Block。有效期内不会发现 Block 的修改，
+      修改最多 ttl 秒后生效（需要立即生效时调用 invalidate 或删除缓存文件）；
+    - 读取失败或超过 timeout 秒未返回时，使用最后一次成功读取的配置（fail open），并记录警告。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        ttl: float = 300.0,
+        timeout: float = 5.0,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 磁盘缓存目录
+            ttl: 缓存有效期（秒，0 表示每次都读取 Block）
+            timeout: 读取 Block 的超时时间（秒）
+        """
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.ttl = ttl
+        self.timeout = timeout
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="block-config")
+
+    def _path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.json"
+
+    def _read_disk(self, name: str) -> Optional[Dict[str, Any]]:
+        path = self._path(name)
+        if not path.exists():
+            return None
+        try:
+            entry = jsoncodec.loads(path.read_bytes())
+        except (OSError, jsoncodec.JSONDecodeError) as e:
+            logger.warning(f"读取 Block 缓存失败: {e}")
+            return None
+        return entry if isinstance(entry, dict) and "data" in entry else None
+
+    def _write_disk(self, name: str, entry: Dict[str, Any]):
+        path = self._path(name)
+        try:
+            # 缓存包含 Token：目录只允许当前用户访问，文件从创建起就是 0600
+            self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            atomic_write_bytes(path, jsoncodec.dumps_bytes(entry, default=str), permissions=0o600)
+        except OSError as e:
+            logger.warning(f"写入 Block 缓存失败: {e}")
+
+    @staticmethod
+    def _fetch(name: str) -> Dict[str, Any]:
+        """从 Prefect API 读取 Block 文档"""
+        from prefect.client.orchestration import get_client
+        from src.blocks.workflow_report_config import WorkflowReportConfig
+
+        with get_client(sync_client=True) as client:
+            document = client.read_block_document_by_name(
+                name=name,
+                block_type_slug=WorkflowReportConfig.get_block_type_slug(),
+                include_secrets=True,
+            )
+        return {
+            "updated": document.updated.isoformat() if document.updated else None,
+            "data": dict(document.data),
+        }
+
+    def get(self, name: str) -> Tuple[Dict[str, Any], str]:
+        """
+        获取 Block 的字段值
+
+        Args:
+            name: Block 名称
+
+        Returns:
+            (字段值, 来源 block/block-cache/block-stale)
+
+        Raises:
+            Exception: 读取 Block 失败且没有可用的缓存
+        """
+        from src.blocks.workflow_report_config import WorkflowReportConfig
+
+        checksum = WorkflowReportConfig._calculate_schema_checksum()
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            entry = self._read_disk(name)
+        # Block 类的字段定义变化时缓存视为过期（仍可在读取失败时作为兜底）
+        fresh = (
+            entry is not None
+            and entry.get("schema_checksum") == checksum
+            and time.time() - entry.get("fetched_at", 0) < self.ttl
+        )
+        if fresh:
+            with self._lock:
+                self._entries[name] = entry
+            return entry["data"], "block-cache"
+
+        try:
+            # 复制上下文，读取线程使用与调用方相同的 Prefect 设置
+            context = contextvars.copy_context()
+            fetched = self._executor.submit(context.run, self._fetch, name).result(timeout=self.timeout)
+        except Exception as e:
+            if entry is None:
+                raise
+            reason = f"超过 {self.timeout} 秒未返回" if isinstance(e, FutureTimeoutError) else str(e)
+            logger.warning(f"读取 Block '{name}' 失败（{reason}），使用上次成功读取的配置")
+            return entry["data"], "block-stale"
+
+        if entry is not None and entry.get("updated") != fetched["updated"]:
+            logger.info(f"Block '{name}' 已更新（{entry.get('updated')} -> {fetched['updated']}），使用新的配置")
+        entry = {**fetched, "schema_checksum": checksum, "fetched_at": time.time()}
+        with self._lock:
+            self._entries[name] = entry
+        self._write_disk(name, entry)
+        return entry["data"], "block"
+
+    def invalidate(self, name: Optional[str] = None):
+        """
+        删除缓存
+
+        Args:
+            name: Block 名称（None 表示全部）
+        """
+        with self._lock:
+            names = [name] if name else list(self._entries)
+            for key in names:
+                self._entries.pop(key, None)
+        paths = [self._path(name)] if name else list(self.cache_dir.glob("*.json"))
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+
+_CACHE: Optional[BlockConfigCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def default_config_cache_dir() -> Path:
+    """
+    Block 缓存的默认目录（XDG_CACHE_HOME 或 ~/.cache 下）
+
+    缓存包含 Token，不放在输出目录中，避免随报告一起被同步、上传或打包。
+    """
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "dify-workflow-monitor" / "block-config"
+
+
+def get_block_config_cache() -> BlockConfigCache:
+    """
+    获取进程内共享的 Block 缓存
+
+    缓存目录、有效期和超时时间读取环境变量 CONFIG_CACHE_DIR（默认见 default_config_cache_dir）、
+    CONFIG_CACHE_TTL（默认 300 秒）、CONFIG_RESOLVE_TIMEOUT（默认 5 秒）。
+
+    Returns:
+        Block 缓存
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            cache_dir = os.getenv("CONFIG_CACHE_DIR") or default_config_cache_dir()
+            _CACHE = BlockConfigCache(
+                cache_dir,
+                ttl=float(os.getenv("CONFIG_CACHE_TTL", "300")),
+                timeout=float(os.getenv("CONFIG_RESOLVE_TIMEOUT", "5")),
+            )
+        return _CACHE
+
+
+def load_block_config(config_name: str):
+    """
+    读取 WorkflowReportConfig Block（使用本地缓存）
+
+    Args:
+        config_name: Block 名称
+
+    Returns:
+        WorkflowReportConfig 实例
+    """
+    from src.blocks.workflow_report_config import WorkflowReportConfig
+
+    data, _ = get_block_config_cache().get(config_name)
+    return WorkflowReportConfig(**data)
+
+
+def resolve_run_config(config_name: Optional[str] = None, **params: Any) -> ResolvedRunConfig:
+    """
+    解析一次 Flow 运行的配置
+
+    使用 Block 时参数传入的值覆盖 Block 中的值；不使用 Block 时参数覆盖环境变量，未提供的使用默认值。
+    环境变量只读取一次（DifyConfig.from_env），通知配置也取自这一次读取。
+
+    Args:
+        config_name: Prefect Block 名称
+        **params: Flow 参数（None 表示未传入）
+
+    Returns:
+        不可修改的运行配置
+
+    Raises:
+        ValueError: Block 无法加载，或缺少 base_url / api_token
+    """
+    try:
+        env_config = DifyConfig.from_env()
+    except Exception as e:
+        logger.warning(f"加载环境变量配置失败，使用参数值和默认通知配置: {e}")
+        env_config = None
+
+    values = {key: value for key, value in params.items() if key in ResolvedRunConfig.model_fields}
+    if config_name:
+        try:
+            block_values, source = get_block_config_cache().get(config_name)
+        except Exception as e:
+            raise ValueError(f"无法加载 Block 配置 '{config_name}': {e}") from e
+        for key in _BLOCK_FIELDS:
+            values[key] = values.get(key) or block_values.get(key)
+        for key in _BLOCK_FLAG_FIELDS:
+            if values.get(key) is None and block_values.get(key) is not None:
+                values[key] = block_values[key]
+    else:
+        source = "env"
+        if env_config is not None:
+            for key in ("base_url", "api_token", "app_id", "console_token", "console_email", "console_password"):
+                values[key] = values.get(key) or getattr(env_config, key)
+        for key, default in _ENV_DEFAULTS.items():
+            if values.get(key) is None or (key not in _BLOCK_FLAG_FIELDS and not values.get(key)):
+                values[key] = default
+
+    if not values.get("base_url") or not values.get("api_token"):
+        raise ValueError("必须提供 base_url 和 api_token（通过 Block、参数或环境变量）")
+
+    # 本地索引默认放在输出目录下，随应用的报告一起保存
+    values["output_dir"] = values.get("output_dir") or _ENV_DEFAULTS["output_dir"]
+    values["index_dir"] = values.get("index_dir") or str(Path(values["output_dir"]) / ".index")
+    if isinstance(values.get("output_format"), list):
+        values["output_format"] = tuple(values["output_format"])
+    values = {key: value for key, value in values.items() if value is not None}
+
+    return ResolvedRunConfig(
+        **values,
+        notification=env_config.notification if env_config is not None else NotificationConfig(),
+        source=source,
+    )
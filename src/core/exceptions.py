@@ -19,6 +19,11 @@ class DifyAuthenticationError(DifyAPIError):
     pass
 
 
+class DifyCircuitOpenError(DifyAPIError):
+    """接口处于熔断状态，请求未发出"""
+    pass
+
+
 class DifyConfigError(DifyWorkflowLogError):
     """配置错误"""
     pass
@@ -32,3 +37,11 @@ class DifyStorageError(DifyWorkflowLogError):
 class DifyNotificationError(DifyWorkflowLogError):
     """通知服务错误"""
     pass
+
+
+class DifyWebhookError(DifyWorkflowLogError):
+    """Webhook 推送错误"""
+    def __init__(self, message: str, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
@@ -1,16 +1,58 @@
 """日志配置模块"""
 
+import os
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 from loguru import logger
-from prefect import get_run_logger as get_prefect_logger
+
+_configured = False
+
+# Prefect 运行上下文模块（首次检测时缓存）
+_prefect_context = None
+
+
+class _BackgroundStream:
+    """
+    后台线程写入的输出流
+
+    记录日志的线程只把格式化后的消息放入队列，由后台线程写入终端，终端或管道阻塞时不影响业务线程。
+    比 loguru 的 enqueue（多进程队列，每条消息都要序列化）开销小，适合日志量大的控制台输出。
+    移除处理器时（包括 loguru 在进程退出时）写完队列中剩余的消息。
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            if message is None:
+                break
+            self._stream.write(message)
+            # 队列空时再刷新，连续的消息合并为一次写入
+            if self._queue.empty():
+                self._stream.flush()
+
+    def write(self, message: str):
+        self._queue.put(message)
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
 
 
 def setup_logger(
     log_level: str = "INFO",
     log_dir: Optional[Path] = None,
     enable_file_logging: bool = True,
+    low_overhead: Optional[bool] = None,
 ) -> None:
     """
     配置日志系统
@@ -19,13 +61,21 @@ def setup_logger(
         log_level: 日志级别
         log_dir: 日志目录
         enable_file_logging: 是否启用文件日志
+        low_overhead: 低开销模式（默认读取环境变量 LOG_LOW_OVERHEAD），控制台输出由后台线程写入，
+            记录日志的线程不等待终端 / 管道（日志文件本身带缓冲，保持同步写入）
     """
+    global _configured
+    _configured = True
+    
+    if low_overhead is None:
+        low_overhead = os.getenv("LOG_LOW_OVERHEAD", "false").lower() == "true"
+    
     # 移除默认处理器
     logger.remove()
     
     # 控制台输出（带颜色）
     logger.add(
-        sys.stderr,
+        _BackgroundStream(sys.stderr) if low_overhead else sys.stderr,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level=log_level,
         colorize=True,
@@ -59,6 +109,12 @@ def setup_logger(
         )
 
 
+def ensure_logger_configured() -> None:
+    """尚未调用过 setup_logger 时使用默认参数配置日志（多次调用只生效一次）"""
+    if not _configured:
+        setup_logger()
+
+
 def get_logger(name: Optional[str] = None):
     """
     获取日志器
@@ -69,15 +125,160 @@ def get_logger(name: Optional[str] = None):
     Returns:
         日志器实例
     """
-    # 如果在 Prefect 环境中，尝试使用 Prefect 日志器
-    try:
-        prefect_logger = get_prefect_logger()
-        if prefect_logger:
-            return prefect_logger
-    except Exception:
-        pass
+    # 如果在 Prefect 运行上下文中，使用 Prefect 日志器
+    prefect_logger = _get_prefect_run_logger()
+    if prefect_logger:
+        return prefect_logger
     
     # 否则使用 loguru
     if name:
         return logger.bind(name=name)
     return logger
+
+
+def _get_prefect_run_logger():
+    """
+    获取 Prefect 运行日志器（不在 Flow / Task 运行中时返回 None）
+
+    只在 Prefect 已被导入时检测，命令行等不使用 Prefect 的场景不需要承担导入开销；
+    先读取运行上下文（ContextVar，开销很小），不在运行中时不调用 get_run_logger，避免每次抛出再捕获异常。
+    """
+    global _prefect_context
+    if _prefect_context is None:
+        if "prefect" not in sys.modules:
+            return None
+        try:
+            import prefect.context as prefect_context
+        except Exception:
+            return None
+        _prefect_context = prefect_context
+    if _prefect_context.TaskRunContext.get() is None and _prefect_context.FlowRunContext.get() is None:
+        return None
+    try:
+        from prefect import get_run_logger
+        return get_run_logger()
+    except Exception:
+        return None
+
+
+class LogSampler:
+    """
+    按键限流的日志采样器
+
+    同一个键在 interval 秒内只放行一条日志，期间被跳过的条数在下一次放行时返回，
+    用于每个请求 / 每条记录都可能触发的日志（如大量日志获取详情失败），避免日志量随数据量增长。
+    """
+
+    def __init__(self, interval: float = 10.0):
+        """
+        初始化采样器
+
+        Args:
+            interval: 同一个键两次放行之间的最小间隔（秒，0 表示全部放行）
+        """
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 进程池 / dask / ray 执行器按值序列化任务函数时会连带序列化模块级的采样器，锁不能序列化
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def sample(self, key: str) -> Optional[int]:
+        """
+        判断这条日志是否放行
+
+        Args:
+            key: 日志类别
+
+        Returns:
+            放行时返回上次放行后被跳过的条数，不放行时返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return None
+            self._last[key] = now
+            return self._suppressed.pop(key, 0)
+
+    def warning(self, key: str, message: str, *args: Any):
+        """
+        采样记录一条警告（message 使用 loguru 的 {} 占位符，只有放行时才格式化）
+
+        Args:
+            key: 日志类别
+            message: 日志模板
+            *args: 模板参数
+        """
+        suppressed = self.sample(key)
+        if suppressed is None:
+            return
+        if suppressed:
+            message += f"（此前 {self.interval:g} 秒内另有 {suppressed} 条同类日志未输出）"
+        logger.opt(depth=1).warning(message, *args)
+
+
+class ProgressLogger:
+    """
+    阶段进度日志
+
+    代替逐条记录的日志：每个阶段最多每 interval 秒输出一行进度（完成数、总数、速率），
+    结束时输出一行汇总，大批量运行时日志行数与数据量无关。
+    """
+
+    def __init__(self, stage: str, total: Optional[int] = None, unit: str = "条", interval: float = 10.0):
+        """
+        初始化进度日志
+
+        Args:
+            stage: 阶段名称
+            total: 总数（未知时为 None）
+            unit: 计数单位
+            interval: 两次进度输出之间的最小间隔（秒）
+        """
+        self.stage = stage
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self._started = time.monotonic()
+        self._last_report = self._started
+        self._lock = threading.Lock()
+
+    def advance(self, count: int = 1, total: Optional[int] = None):
+        """
+        记录完成数量，距上次输出超过 interval 秒时输出一行进度
+
+        Args:
+            count: 新完成的数量
+            total: 更新总数（如第一页响应中才知道总数）
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.done += count
+            if total is not None:
+                self.total = total
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+            done, total = self.done, self.total
+        elapsed = now - self._started
+        progress = f"{done}/{total}（{done * 100 // total}%）" if total else str(done)
+        logger.opt(depth=1).info(
+            "{}: {} {}，{:.1f} {}/秒",
+            self.stage, progress, self.unit, done / elapsed if elapsed else 0.0, self.unit,
+        )
+
+    def finish(self):
+        """输出阶段汇总"""
+        elapsed = time.monotonic() - self._started
+        logger.opt(depth=1).info("{}完成: {} {}，耗时 {:.1f} 秒", self.stage, self.done, self.unit, elapsed)
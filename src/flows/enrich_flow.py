@@ -0,0 +1,99 @@
+"""分片丰富日志详情"""
+
+from typing import Any, Dict, Optional
+from prefect import get_run_logger
+
+from src.flows.task_runners import create_task_runner
+from src.flows.tasks.enrich_task import (
+    enrich_logs_task,
+    merge_chunks,
+    split_into_chunks,
+    update_local_indexes,
+)
+
+
+def run_chunked_enrichment(
+    logs_result: Dict[str, Any],
+    base_url: str,
+    api_token: str,
+    task_runner: str = "thread",
+    max_workers: Optional[int] = None,
+    task_runner_address: Optional[str] = None,
+    chunk_size: int = 200,
+    chunk_retries: int = 2,
+    app_id: Optional[str] = None,
+    console_token: Optional[str] = None,
+    console_email: Optional[str] = None,
+    console_password: Optional[str] = None,
+    with_node_executions: bool = False,
+    index_dir: Optional[str] = None,
+    checkpoint_dir: Optional[str] = None,
+    checkpoint_key: Optional[str] = None,
+    shared_connections: bool = False,
+) -> Dict[str, Any]:
+    """
+    把日志拆分为分片，在指定的 Task Runner 上并行丰富详情，再按原顺序合并
+
+    在调用方 Flow 内打开 Task Runner，每个分片提交一次 enrich_logs_task（不使用子 Flow，
+    日志数据和凭据不会作为 Flow 参数保存到 Prefect API）。每个分片单独重试，一个分片失败不会让
+    其他分片重新获取详情。本地索引在合并后由当前进程统一写入，分布式 worker 不需要访问索引目录。
+
+    Args:
+        logs_result: 日志数据结果
+        base_url: Dify API 基础 URL
+        api_token: 应用 API Token
+        task_runner: thread/process/dask/ray
+        max_workers: 并发数
+        task_runner_address: dask 调度器或 ray 集群地址
+        chunk_size: 每个分片的日志数
+        chunk_retries: 每个分片的重试次数
+        app_id: 应用ID
+        console_token: Console API Token
+        console_email: Console 登录邮箱
+        console_password: Console 登录密码
+        with_node_executions: 是否包含节点执行详情
+        index_dir: 本地索引目录
+        checkpoint_dir: 检查点目录（所有 worker 都需要能访问，分布式集群上通常不提供）
+        checkpoint_key: 检查点键
+        shared_connections: 是否使用进程内共享的连接池
+
+    Returns:
+        增强后的日志数据结果（日志顺序与输入一致）
+    """
+    logger = get_run_logger()
+
+    chunks = split_into_chunks(logs_result, chunk_size)
+    logger.info(f"日志拆分为 {len(chunks)} 个分片（每片最多 {chunk_size} 条）")
+    if not chunks:
+        return logs_result
+
+    chunk_task = enrich_logs_task.with_options(retries=chunk_retries)
+    with create_task_runner(task_runner, max_workers=max_workers, address=task_runner_address) as runner:
+        futures = [
+            runner.submit(
+                chunk_task,
+                parameters={
+                    "logs_result": chunk,
+                    "base_url": base_url,
+                    "api_token": api_token,
+                    "app_id": app_id,
+                    "console_token": console_token,
+                    "console_email": console_email,
+                    "console_password": console_password,
+                    "with_node_executions": with_node_executions,
+                    "index_dir": None,
+                    "checkpoint_dir": checkpoint_dir,
+                    "checkpoint_key": checkpoint_key,
+                    "shared_connections": shared_connections,
+                },
+            )
+            for chunk in chunks
+        ]
+        # futures 与分片顺序一致，按顺序取结果即保持原日志顺序
+        result = merge_chunks(logs_result, [future.result() for future in futures])
+
+    if index_dir:
+        update_local_indexes(result["data"], index_dir, with_node_executions)
+
+    logger.info(f"分片丰富完成: {len(result['data'])} 条日志")
+    return result
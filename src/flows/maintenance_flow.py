@@ -0,0 +1,59 @@
+"""存储维护 Flow（分区合并 + 过期清理）"""
+
+from typing import Any, Dict, Optional
+from prefect import flow, get_run_logger
+
+from src.core.config import DifyConfig
+from src.services.storage import create_storage_service
+
+
+@flow(name="storage-maintenance", log_prints=True)
+def storage_maintenance_flow(
+    base_dir: Optional[str] = None,
+    app_id: Optional[str] = None,
+    granularity: str = "weekly",
+    min_age_days: int = 7,
+    compression: Optional[str] = None,
+    retention_days: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    合并已结束周期的日分区，再按保留天数清理过期文件
+
+    存储类型和连接参数使用环境变量（STORAGE_TYPE、S3_* 等）中的配置。
+
+    Args:
+        base_dir: 本地存储基础目录（默认使用 OUTPUT_BASE_DIR）
+        app_id: 只合并指定应用的分区（None 表示所有应用）
+        granularity: 合并粒度（weekly/monthly）
+        min_age_days: 周期结束至少多少天后才合并
+        compression: 合并文件的压缩算法（none/gzip/zstd，None 使用存储的压缩策略）
+        retention_days: 保留天数（None 表示不清理）
+
+    Returns:
+        维护结果
+    """
+    logger = get_run_logger()
+
+    config = DifyConfig.from_env()
+    options = dict(config.storage.config)
+    if config.storage.type == "local":
+        options["base_dir"] = base_dir or config.output_base_dir
+    storage = create_storage_service(config.storage.type, compression=config.storage.compression, **options)
+
+    result = storage.compact_partitions(
+        app_id=app_id,
+        granularity=granularity,
+        min_age_days=min_age_days,
+        compression=compression,
+    )
+    logger.info(
+        f"分区合并: 生成 {len(result['compacted'])} 个文件，"
+        f"合并 {result['merged_files']} 个日分区，{result['records']} 条记录"
+    )
+
+    result["cleaned"] = 0
+    if retention_days is not None:
+        result["cleaned"] = storage.cleanup_old_files(retention_days)
+        logger.info(f"过期清理: 删除 {result['cleaned']} 个文件（保留 {retention_days} 天）")
+
+    return result
@@ -0,0 +1,162 @@
+"""多应用并发报告 Flow"""
+
+from typing import Any, Dict, List, Optional
+from prefect import flow, get_run_logger, task
+
+from src.flows.task_runners import create_task_runner
+from src.flows.workflow_log_flow import fetch_workflow_logs_flow
+from src.services.connection_pool import configure_connection_pool
+
+# 按标签查找 Block 时每次读取的数量
+BLOCK_PAGE_SIZE = 200
+
+
+def resolve_config_names(
+    config_names: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    解析要处理的 Block 名称
+
+    Args:
+        config_names: Block 名称列表
+        tags: Block 标签，带有任意一个标签的 WorkflowReportConfig Block 都会被加入
+
+    Returns:
+        去重后的 Block 名称（保持 config_names 的顺序，标签匹配的按名称排序追加在后面）
+    """
+    names = list(dict.fromkeys(config_names or []))
+    if not tags:
+        return names
+
+    from prefect.client.orchestration import get_client
+    from src.blocks.workflow_report_config import WorkflowReportConfig
+
+    wanted = set(tags)
+    matched = []
+    with get_client(sync_client=True) as client:
+        offset = 0
+        while True:
+            documents = client.read_block_documents_by_type(
+                WorkflowReportConfig.get_block_type_slug(),
+                offset=offset,
+                limit=BLOCK_PAGE_SIZE,
+                include_secrets=False,
+            )
+            for document in documents:
+                if document.name and wanted & set(document.data.get("tags") or []):
+                    matched.append(document.name)
+            if len(documents) < BLOCK_PAGE_SIZE:
+                break
+            offset += BLOCK_PAGE_SIZE
+
+    return names + [name for name in sorted(matched) if name not in names]
+
+
+@task(name="run-app-report")
+def run_app_report_task(config_name: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    运行单个应用的报告 Flow（作为子 Flow），失败时返回错误而不是抛出，不影响其他应用
+
+    Args:
+        config_name: Block 名称
+        overrides: 覆盖 Block 配置的参数
+
+    Returns:
+        该应用的执行结果
+    """
+    try:
+        result = fetch_workflow_logs_flow(config_name=config_name, shared_connections=True, **overrides)
+    except Exception as e:
+        return {"config_name": config_name, "status": "failed", "error": str(e)}
+    return {"config_name": config_name, **result}
+
+
+@flow(name="fetch-workflow-logs-multi-app", log_prints=True)
+def multi_app_report_flow(
+    config_names: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    max_concurrency: int = 8,
+    requests_per_second: Optional[float] = None,
+    max_connections: int = 32,
+    created_at_after: Optional[str] = None,
+    created_at_before: Optional[str] = None,
+    notify_on_complete: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    在一个进程内并发处理多个应用的报告
+
+    每个应用按自己的 WorkflowReportConfig Block 运行 fetch_workflow_logs_flow（子 Flow），
+    所有应用共享 HTTP 连接池、同一账户的 Console Token 和按主机的速率限制，最后汇总各应用的结果。
+    同一个 Dify 实例上的多个应用不再各自占用一个进程、各自登录。
+
+    Args:
+        config_names: Block 名称列表
+        tags: Block 标签（处理带有任意一个标签的 Block，可以与 config_names 同时使用）
+        max_concurrency: 同时处理的应用数
+        requests_per_second: 对每个 Dify 主机的每秒请求数上限（None 表示不限速）
+        max_connections: 每个主机保持的最大连接数
+        created_at_after: 创建时间下限（覆盖所有 Block）
+        created_at_before: 创建时间上限（覆盖所有 Block）
+        notify_on_complete: 是否在完成时发送通知（覆盖所有 Block，报告通知在合并窗口内合并为一条摘要）
+
+    Returns:
+        汇总结果
+    """
+    logger = get_run_logger()
+
+    names = resolve_config_names(config_names, tags)
+    if not names:
+        raise ValueError("没有找到要处理的应用，请提供 config_names 或 tags")
+    logger.info(f"并发处理 {len(names)} 个应用（并发数 {max_concurrency}）: {', '.join(names)}")
+
+    pool = configure_connection_pool(max_connections=max_connections, requests_per_second=requests_per_second)
+    overrides = {
+        key: value
+        for key, value in {
+            "created_at_after": created_at_after,
+            "created_at_before": created_at_before,
+            "notify_on_complete": notify_on_complete,
+        }.items()
+        if value is not None
+    }
+
+    with create_task_runner("thread", max_workers=max_concurrency) as runner:
+        futures = [
+            runner.submit(run_app_report_task, parameters={"config_name": name, "overrides": overrides})
+            for name in names
+        ]
+        apps = [future.result() for future in futures]
+
+    failed = [app for app in apps if app.get("status") != "success"]
+    summary = {
+        "apps": apps,
+        "app_count": len(apps),
+        "succeeded": len(apps) - len(failed),
+        "failed": len(failed),
+        "logs_count": sum(app.get("logs_count", 0) for app in apps),
+        "report_count": sum(app.get("report_count", 0) for app in apps),
+        "retries": sum(app.get("retries", 0) for app in apps),
+        "partial_logs": sum(app.get("partial_logs", 0) for app in apps),
+        "requests": pool.stats["requests"],
+        "console_logins": pool.stats["logins"],
+        "throttled_seconds": round(pool.throttled_seconds(), 1),
+        "status": "success" if not failed else ("failed" if len(failed) == len(apps) else "partial"),
+    }
+
+    logger.info("=" * 60)
+    for app in apps:
+        if app.get("status") == "success":
+            skipped = "（报告未变化）" if app.get("report_skipped") else ""
+            partial = f"，{app['partial_logs']} 条只有部分详情" if app.get("partial_logs") else ""
+            logger.info(f"  {app['config_name']}: {app.get('logs_count', 0)} 条日志{partial}，{app.get('report_count', 0)} 个报告{skipped}")
+        else:
+            logger.error(f"  {app['config_name']}: 失败 - {app.get('error')}")
+    logger.info(
+        f"汇总: {summary['succeeded']}/{summary['app_count']} 个应用成功，{summary['logs_count']} 条日志，"
+        f"{summary['report_count']} 个报告，{summary['requests']} 次请求（重试 {summary['retries']} 次），"
+        f"Console 登录 {summary['console_logins']} 次，限速等待 {summary['throttled_seconds']} 秒"
+    )
+    logger.info("=" * 60)
+
+    return summary
@@ -0,0 +1,75 @@
+"""本地全文检索 Flow"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from prefect import flow, get_run_logger
+
+from src.core.config_resolver import load_block_config
+from src.services.search_index import LogSearchIndex
+from src.utils.formatters import format_timestamp
+
+
+def _parse_time(value: Optional[str]) -> Optional[int]:
+    """把 ISO 8601 时间字符串转换为 Unix 时间戳"""
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+@flow(name="search-workflow-logs", log_prints=True)
+def search_workflow_logs_flow(
+    query: str,
+    config_name: Optional[str] = None,
+    index_dir: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    created_at_after: Optional[str] = None,
+    created_at_before: Optional[str] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    在本地全文检索索引中搜索用户提问、AI 回答和检索片段
+
+    不访问 Dify API，索引由 fetch_workflow_logs_flow 在丰富日志详情时增量维护。
+
+    Args:
+        query: 检索词（多个词用空格分隔，需同时命中）
+        config_name: Prefect Block 名称（用于定位索引目录）
+        index_dir: 本地索引目录（优先级最高）
+        output_dir: 输出目录（未提供 index_dir 时使用 output_dir/.index）
+        created_at_after: 创建时间下限
+        created_at_before: 创建时间上限
+        limit: 最多返回条数
+
+    Returns:
+        命中记录列表
+    """
+    logger = get_run_logger()
+
+    if not index_dir and config_name:
+        block_config = load_block_config(config_name)
+        index_dir = block_config.index_dir
+        output_dir = output_dir or block_config.output_dir
+
+    index_dir = index_dir or str(Path(output_dir or "./outputs/reports") / ".index")
+    if not LogSearchIndex.exists(index_dir):
+        logger.warning(f"全文检索索引不存在: {index_dir}")
+        return []
+
+    with LogSearchIndex(index_dir) as search_index:
+        results = search_index.search(
+            query,
+            limit=limit,
+            created_at_after=_parse_time(created_at_after),
+            created_at_before=_parse_time(created_at_before),
+        )
+
+    logger.info(f"检索 '{query}' 命中 {len(results)} 条日志")
+    for i, record in enumerate(results, 1):
+        logger.info(
+            f"{i}. {record['log_id']} [{record['status']}] {format_timestamp(record['created_at'])}\n"
+            f"   提问: {record['user_query']}\n"
+            f"   回答: {record['ai_answer'][:200]}"
+        )
+
+    return results
@@ -0,0 +1,55 @@
+"""Task Runner 选择"""
+
+from typing import Optional
+
+from src.core.exceptions import DifyConfigError
+
+TASK_RUNNER_TYPES = ("thread", "process", "dask", "ray")
+
+
+def create_task_runner(
+    runner_type: str = "thread",
+    max_workers: Optional[int] = None,
+    address: Optional[str] = None,
+):
+    """
+    创建 Prefect Task Runner
+
+    Args:
+        runner_type: thread（线程池）/process（进程池）/dask/ray（分布式，需要安装 prefect-dask / prefect-ray）
+        max_workers: 并发数（线程 / 进程数；dask 未指定 address 时为本地集群的 worker 数）
+        address: dask 调度器或 ray 集群地址（None 表示启动本地临时集群）
+
+    Returns:
+        Task Runner 实例
+
+    Raises:
+        DifyConfigError: 不支持的类型或未安装对应依赖
+    """
+    runner_type = (runner_type or "thread").strip().lower()
+
+    if runner_type == "thread":
+        from prefect.task_runners import ThreadPoolTaskRunner
+        return ThreadPoolTaskRunner(max_workers=max_workers)
+
+    if runner_type == "process":
+        from prefect.task_runners import ProcessPoolTaskRunner
+        return ProcessPoolTaskRunner(max_workers=max_workers)
+
+    if runner_type == "dask":
+        try:
+            from prefect_dask import DaskTaskRunner
+        except ImportError as e:
+            raise DifyConfigError("dask 任务执行器需要安装 prefect-dask: uv pip install -e '.[distributed]'") from e
+        if address:
+            return DaskTaskRunner(address=address)
+        return DaskTaskRunner(cluster_kwargs={"n_workers": max_workers} if max_workers else {})
+
+    if runner_type == "ray":
+        try:
+            from prefect_ray import RayTaskRunner
+        except ImportError as e:
+            raise DifyConfigError("ray 任务执行器需要安装 prefect-ray: uv pip install -e '.[distributed]'") from e
+        return RayTaskRunner(address=address) if address else RayTaskRunner()
+
+    raise DifyConfigError(f"不支持的任务执行器: {runner_type}（可选: {', '.join(TASK_RUNNER_TYPES)}）")
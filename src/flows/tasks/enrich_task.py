@@ -3,10 +3,94 @@
 from typing import Any, Dict, List, Optional
 from prefect import task
 
+from src.services.checkpoint import RunCheckpoint
+from src.services.connection_pool import get_connection_pool
 from src.services.fetcher import WorkflowLogFetcher
-from src.core.logger import get_logger
+from src.services.retrieval_index import RetrievalHitIndex
+from src.services.search_index import LogSearchIndex
+from src.core.logger import LogSampler, ProgressLogger, get_logger
 
 logger = get_logger(__name__)
+_sampler = LogSampler()
+
+# 带有这些字段的日志只获取到部分详情，不写入检查点，重试时重新获取
+PARTIAL_ENRICHMENT_KEYS = ("workflow_run_detail_error", "node_executions_error")
+
+
+def update_local_indexes(logs: List[Dict[str, Any]], index_dir: str, with_node_executions: bool = False):
+    """
+    把丰富后的日志增量写入本地索引（全文检索索引、检索命中索引）
+    
+    Args:
+        logs: 丰富后的日志列表（获取详情失败的日志会被跳过）
+        index_dir: 本地索引目录
+        with_node_executions: 是否包含节点执行详情（检索命中索引只在获取节点执行详情时才有数据）
+    """
+    index_classes = [LogSearchIndex]
+    if with_node_executions:
+        index_classes.append(RetrievalHitIndex)
+    
+    # 索引只是辅助数据：打不开（SQLite 不支持 trigram 分词、数据库被锁、目录只读等）时跳过该索引，
+    # 不让已经完成的丰富结果因此失败重试
+    indexes = []
+    for index_class in index_classes:
+        try:
+            indexes.append(index_class(index_dir))
+        except Exception as e:
+            logger.warning(f"打开本地索引 {index_class.DB_FILENAME} 失败，跳过该索引: {e}")
+    if not indexes:
+        return
+    
+    for log in logs:
+        if "enrichment_error" in log:
+            continue
+        for index in indexes:
+            try:
+                index.add_log(log)
+            except Exception as e:
+                logger.warning(f"更新本地索引 {index.DB_FILENAME} 失败: {e}")
+    
+    for index in indexes:
+        try:
+            index.close()
+        except Exception as e:
+            logger.warning(f"关闭本地索引 {index.DB_FILENAME} 失败: {e}")
+    logger.info(f"本地索引已更新: {index_dir}")
+
+
+def split_into_chunks(logs_result: Dict[str, Any], chunk_size: int) -> List[Dict[str, Any]]:
+    """
+    把日志结果拆分为多个分片（每个分片保留原结果的元数据）
+    
+    Args:
+        logs_result: 日志数据结果
+        chunk_size: 每个分片的日志数
+    
+    Returns:
+        分片列表（按日志顺序）
+    """
+    logs = logs_result.get("data", [])
+    chunk_size = max(chunk_size, 1)
+    return [
+        {**logs_result, "data": logs[start:start + chunk_size]}
+        for start in range(0, len(logs), chunk_size)
+    ]
+
+
+def merge_chunks(logs_result: Dict[str, Any], chunk_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    按分片顺序合并丰富后的日志
+    
+    Args:
+        logs_result: 原始日志数据结果（提供元数据）
+        chunk_results: 各分片的丰富结果（与拆分时顺序一致）
+    
+    Returns:
+        合并后的日志数据结果
+    """
+    result = logs_result.copy()
+    result["data"] = [log for chunk in chunk_results for log in chunk.get("data", [])]
+    return result
 
 
 @task(name="enrich-workflow-logs", retries=1)
@@ -19,6 +103,10 @@ def enrich_logs_task(
     console_email: Optional[str] = None,
     console_password: Optional[str] = None,
     with_node_executions: bool = False,
+    index_dir: Optional[str] = None,
+    checkpoint_dir: Optional[str] = None,
+    checkpoint_key: Optional[str] = None,
+    shared_connections: bool = False,
 ) -> Dict[str, Any]:
     """
     丰富日志详情任务
@@ -32,6 +120,11 @@ def enrich_logs_task(
         console_email: Console 登录邮箱
         console_password: Console 登录密码
         with_node_executions: 是否包含节点执行详情
+        index_dir: 本地索引目录（提供时增量更新检索命中索引和全文检索索引）
+        checkpoint_dir: 检查点目录（与 checkpoint_key 同时提供时记录每条丰富完成的日志，
+            任务重试或重新运行时跳过已丰富的日志）
+        checkpoint_key: 检查点键
+        shared_connections: 是否使用进程内共享的连接池（多应用并发运行时共享连接、Console Token 和限速）
     
     Returns:
         增强后的日志数据结果
@@ -44,24 +137,45 @@ def enrich_logs_task(
         console_token=console_token,
         console_email=console_email,
         console_password=console_password,
+        connection_pool=get_connection_pool() if shared_connections else None,
     )
     
     logs = logs_result.get("data", [])
     enriched_logs = []
     
-    for i, log in enumerate(logs, 1):
-        logger.debug(f"处理日志 {i}/{len(logs)}")
-        try:
-            enriched_log = fetcher.enrich_log_with_details(
-                log.copy(),
-                default_app_id=app_id,
-                include_node_executions=with_node_executions,
-            )
-            enriched_logs.append(enriched_log)
-        except Exception as e:
-            logger.warning(f"获取日志 {log.get('id', 'unknown')} 的详细信息失败: {e}")
-            log["enrichment_error"] = str(e)
-            enriched_logs.append(log)
+    checkpoint = RunCheckpoint(checkpoint_dir, checkpoint_key) if checkpoint_dir and checkpoint_key else None
+    done = checkpoint.load_enriched([str(log.get("id")) for log in logs if log.get("id")]) if checkpoint else {}
+    if done:
+        logger.info(f"从检查点恢复: {len(done)}/{len(logs)} 条日志已丰富，跳过")
+    
+    progress = ProgressLogger("丰富日志", total=len(logs) - len(done))
+    try:
+        for log in logs:
+            cached = done.get(str(log.get("id")))
+            if cached is not None:
+                enriched_logs.append(cached)
+                continue
+            try:
+                enriched_log = fetcher.enrich_log_with_details(
+                    log.copy(),
+                    default_app_id=app_id,
+                    include_node_executions=with_node_executions,
+                )
+                enriched_logs.append(enriched_log)
+                if checkpoint and not any(key in enriched_log for key in PARTIAL_ENRICHMENT_KEYS):
+                    checkpoint.save_enriched(enriched_log)
+            except Exception as e:
+                _sampler.warning("enrich", "获取日志 {} 的详细信息失败: {}", log.get("id", "unknown"), e)
+                log["enrichment_error"] = str(e)
+                enriched_logs.append(log)
+            progress.advance()
+    finally:
+        if checkpoint:
+            checkpoint.close()
+    progress.finish()
+    
+    if index_dir:
+        update_local_indexes(enriched_logs, index_dir, with_node_executions)
     
     result = logs_result.copy()
     result["data"] = enriched_logs
@@ -3,12 +3,35 @@
 from typing import Any, Dict, List, Optional
 from prefect import task
 
+from src.services.checkpoint import RunCheckpoint
+from src.services.connection_pool import get_connection_pool
 from src.services.fetcher import WorkflowLogFetcher
 from src.core.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def _dedupe_by_id(logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    按日志 ID 去重（保留第一次出现的日志）
+
+    日志列表按创建时间倒序分页，获取过程中产生的新日志会把已有日志挤到下一页，
+    从检查点的页码继续获取或跨页获取时同一条日志可能出现两次。
+    """
+    seen = set()
+    unique = []
+    for log in logs:
+        log_id = log.get("id")
+        if log_id is not None:
+            if log_id in seen:
+                continue
+            seen.add(log_id)
+        unique.append(log)
+    if len(unique) < len(logs):
+        logger.info(f"跳过 {len(logs) - len(unique)} 条重复的日志（分页期间有新日志产生）")
+    return unique
+
+
 @task(name="fetch-workflow-logs", retries=2, retry_delay_seconds=5)
 def fetch_logs_task(
     base_url: str,
@@ -22,6 +45,9 @@ def fetch_logs_task(
     fetch_all: bool = False,
     limit: int = 20,
     max_pages: Optional[int] = None,
+    checkpoint_dir: Optional[str] = None,
+    checkpoint_key: Optional[str] = None,
+    shared_connections: bool = False,
 ) -> Dict[str, Any]:
     """
     获取工作流日志任务
@@ -38,6 +64,10 @@ def fetch_logs_task(
         fetch_all: 是否获取所有日志
         limit: 每页数量
         max_pages: 最大页数限制
+        checkpoint_dir: 检查点目录（与 checkpoint_key 同时提供时，获取所有日志会记录每个完成的分页，
+            任务重试或重新运行时从最后一个完成页的下一页继续）
+        checkpoint_key: 检查点键
+        shared_connections: 是否使用进程内共享的连接池（多应用并发运行时共享连接和限速）
     
     Returns:
         日志数据结果
@@ -48,19 +78,38 @@ def fetch_logs_task(
     logger.info(f"请求参数: base_url={base_url}, created_at_after={created_at_after}, created_at_before={created_at_before}")
     logger.info(f"其他参数: keyword={keyword}, status={status}, fetch_all={fetch_all}, limit={limit}")
     
-    fetcher = WorkflowLogFetcher(base_url=base_url, api_token=api_token)
+    fetcher = WorkflowLogFetcher(
+        base_url=base_url,
+        api_token=api_token,
+        connection_pool=get_connection_pool() if shared_connections else None,
+    )
     
     if fetch_all:
-        logs = fetcher.fetch_all_logs(
-            keyword=keyword,
-            status=status,
-            created_at_before=created_at_before,
-            created_at_after=created_at_after,
-            created_by_end_user_session_id=created_by_end_user_session_id,
-            created_by_account=created_by_account,
-            limit=limit,
-            max_pages=max_pages,
-        )
+        checkpoint = RunCheckpoint(checkpoint_dir, checkpoint_key) if checkpoint_dir and checkpoint_key else None
+        logs, start_page, finished = checkpoint.load_pages() if checkpoint else ([], 1, False)
+        if finished:
+            logger.info(f"从检查点恢复: 已获取全部 {start_page - 1} 页、{len(logs)} 条日志")
+        elif start_page > 1:
+            logger.info(f"从检查点恢复: 已获取 {start_page - 1} 页、{len(logs)} 条日志，从第 {start_page} 页继续")
+        
+        try:
+            if not finished:
+                logs.extend(fetcher.fetch_all_logs(
+                    keyword=keyword,
+                    status=status,
+                    created_at_before=created_at_before,
+                    created_at_after=created_at_after,
+                    created_by_end_user_session_id=created_by_end_user_session_id,
+                    created_by_account=created_by_account,
+                    limit=limit,
+                    max_pages=max_pages,
+                    start_page=start_page,
+                    on_page=checkpoint.save_page if checkpoint else None,
+                ))
+        finally:
+            if checkpoint:
+                checkpoint.close()
+        logs = _dedupe_by_id(logs)
         result = {
             "total": len(logs),
             "data": logs,
@@ -1,59 +1,42 @@
 """生成报告 Task"""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 from prefect import task
-from pathlib import Path
 
-from src.services.reporter import ReportGenerator
-from src.core.logger import get_logger
-
-logger = get_logger(__name__)
+from src.services.report_sinks import generate_reports
 
 
 @task(name="generate-reports")
 def generate_reports_task(
     logs_result: Dict[str, Any],
     output_dir: str,
-    output_format: str = "csv",
+    output_format: Union[str, List[str]] = "csv",
+    index_dir: Optional[str] = None,
+    sink_options: Optional[Dict[str, Dict[str, Any]]] = None,
+    compression: Union[str, Dict[str, str], None] = None,
+    force: bool = False,
 ) -> Dict[str, Any]:
     """
-    生成报告任务
-    
+    生成报告任务（见 src.services.report_sinks.generate_reports）
+
     Args:
         logs_result: 日志数据结果
         output_dir: 输出目录
-        output_format: 输出格式 (csv/markdown/json)
-    
+        output_format: 输出格式 (csv/markdown/json/ndjson/ndjson.gz/webhook)，可以是列表或逗号分隔的字符串
+        index_dir: 本地索引目录（用于跨运行的问题排序，存在检索命中索引时生成文档引用统计）
+        sink_options: 各输出格式的额外配置，如 {"csv": {...}}
+        compression: 压缩策略（产物类型 → none/gzip/zstd，如 "report=gzip,export=zstd"）
+        force: 忽略输入指纹，强制重新生成
+
     Returns:
         报告生成结果
     """
-    logger.info(f"开始生成 {output_format} 报告")
-    
-    reporter = ReportGenerator(output_dir=output_dir)
-    report_files = []
-    
-    if output_format == "csv":
-        report_files = reporter.generate_csv_reports(logs_result)
-    elif output_format == "markdown":
-        md_content = reporter.generate_markdown_report(logs_result, include_details=True)
-        md_file = Path(output_dir) / f"logs_report_{logs_result.get('total', 0)}.md"
-        md_file.write_text(md_content, encoding="utf-8")
-        report_files = [str(md_file)]
-    elif output_format == "json":
-        import json
-        json_file = Path(output_dir) / f"logs_data_{logs_result.get('total', 0)}.json"
-        json_file.write_text(
-            json.dumps(logs_result, ensure_ascii=False, indent=2),
-            encoding="utf-8"
-        )
-        report_files = [str(json_file)]
-    else:
-        logger.warning(f"不支持的输出格式: {output_format}")
-    
-    logger.info(f"成功生成 {len(report_files)} 个报告文件")
-    
-    return {
-        "report_files": report_files,
-        "report_count": len(report_files),
-        "logs_count": len(logs_result.get("data", [])),
-    }
+    return generate_reports(
+        logs_result,
+        output_dir=output_dir,
+        output_format=output_format,
+        index_dir=index_dir,
+        sink_options=sink_options,
+        compression=compression,
+        force=force,
+    )
@@ -1,17 +1,23 @@
 """工作流日志获取 Flow"""
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Union
 from prefect import flow, get_run_logger
+from prefect.runtime import flow_run
 
-from src.core.config import DifyConfig
-from src.core.logger import setup_logger, get_logger
+from src.core.config_resolver import resolve_run_config
+from src.core.logger import ensure_logger_configured
 from src.flows.tasks.fetch_task import fetch_logs_task
-from src.flows.tasks.enrich_task import enrich_logs_task
+from src.flows.enrich_flow import run_chunked_enrichment
+from src.flows.tasks.enrich_task import PARTIAL_ENRICHMENT_KEYS, enrich_logs_task
 from src.flows.tasks.report_task import generate_reports_task
-from src.services.notifier import create_notification_service
+from src.services.checkpoint import RunCheckpoint, compute_checkpoint_key, is_bounded_window
+from src.services.notification_dispatcher import get_notification_dispatcher
+from src.services.report_sinks import normalize_output_formats
+from src.utils.circuit_breaker import circuit_breaker_scope, create_circuit_breakers
+from src.utils.retry import create_retry_budget, format_retry_stats, retry_budget_scope
 
-# 初始化日志
-setup_logger()
+# 超过这么多天没有更新的检查点视为放弃的运行，成功运行结束时顺带清除
+CHECKPOINT_RETENTION_DAYS = 30
 
 
 @flow(name="fetch-workflow-logs", log_prints=True)
@@ -26,14 +32,23 @@ def fetch_workflow_logs_flow(
     created_by_end_user_session_id: Optional[str] = None,
     created_by_account: Optional[str] = None,
     # 输出配置（如果使用 Block，这些参数会被 Block 中的值覆盖）
-    output_format: Optional[str] = None,  # csv/markdown/json
+    output_format: Optional[Union[str, List[str]]] = None,  # csv/markdown/json/ndjson/ndjson.gz/webhook，可以是列表
     output_dir: Optional[str] = None,
+    index_dir: Optional[str] = None,
+    compression: Optional[str] = None,
     # 功能开关（如果使用 Block，这些参数会被 Block 中的值覆盖）
     fetch_all: Optional[bool] = None,
     with_details: Optional[bool] = None,
     with_node_executions: Optional[bool] = None,
     limit: Optional[int] = None,
     max_pages: Optional[int] = None,
+    resume: Optional[bool] = None,
+    # 分片丰富（如果使用 Block，这些参数会被 Block 中的值覆盖）
+    enrich_chunk_size: Optional[int] = None,
+    enrich_chunk_retries: Optional[int] = None,
+    task_runner: Optional[str] = None,
+    task_runner_workers: Optional[int] = None,
+    task_runner_address: Optional[str] = None,
     # 通知配置（如果使用 Block，这些参数会被 Block 中的值覆盖）
     notify_on_complete: Optional[bool] = None,
     # 配置（从环境变量或参数传入，如果使用 Block，这些参数会被 Block 中的值覆盖）
@@ -43,6 +58,8 @@ def fetch_workflow_logs_flow(
     console_token: Optional[str] = None,
     console_email: Optional[str] = None,
     console_password: Optional[str] = None,
+    # 多应用并发运行时由父 Flow 开启
+    shared_connections: bool = False,
 ) -> Dict[str, Any]:
     """
     获取 Dify 工作流日志的主 Flow
@@ -59,13 +76,22 @@ def fetch_workflow_logs_flow(
         created_at_after: 创建时间下限
         created_by_end_user_session_id: 终端用户会话ID
         created_by_account: 账户邮箱
-        output_format: 输出格式（如果使用 Block，会被 Block 中的值覆盖）
+        output_format: 输出格式，可以是列表，如 ["csv", "markdown"]，所有格式共享一次获取和报告遍历（如果使用 Block，会被 Block 中的值覆盖）
         output_dir: 输出目录（如果使用 Block，会被 Block 中的值覆盖）
+        index_dir: 本地索引目录（默认为 output_dir/.index，如果使用 Block，会被 Block 中的值覆盖）
+        compression: 报告文件压缩策略，如 "report=gzip,export=zstd"（如果使用 Block，会被 Block 中的值覆盖）
         fetch_all: 是否获取所有日志（如果使用 Block，会被 Block 中的值覆盖）
         with_details: 是否获取详细信息（如果使用 Block，会被 Block 中的值覆盖）
         with_node_executions: 是否包含节点执行详情（如果使用 Block，会被 Block 中的值覆盖）
         limit: 每页数量（如果使用 Block，会被 Block 中的值覆盖）
         max_pages: 最大页数限制（如果使用 Block，会被 Block 中的值覆盖）
+        resume: 是否从检查点恢复，参数相同的重试和重新运行跳过已获取的分页和已丰富的日志；默认只在 created_at_before 不晚于当前时间时开启，
+            没有上限时显式开启只对本次 Flow 运行的重试生效（如果使用 Block，会被 Block 中的值覆盖）
+        enrich_chunk_size: 分片丰富时每个分片的日志数，未设置时由单个任务处理全部日志（如果使用 Block，会被 Block 中的值覆盖）
+        enrich_chunk_retries: 每个分片的重试次数（如果使用 Block，会被 Block 中的值覆盖）
+        task_runner: 分片丰富使用的任务执行器 thread/process/dask/ray（如果使用 Block，会被 Block 中的值覆盖）
+        task_runner_workers: 任务执行器的并发数（如果使用 Block，会被 Block 中的值覆盖）
+        task_runner_address: dask 调度器或 ray 集群地址（如果使用 Block，会被 Block 中的值覆盖）
         notify_on_complete: 是否在完成时发送通知（如果使用 Block，会被 Block 中的值覆盖）
         base_url: Dify API 基础 URL（如果使用 Block，会被 Block 中的值覆盖）
         api_token: 应用 API Token（如果使用 Block，会被 Block 中的值覆盖）
@@ -73,132 +99,202 @@ def fetch_workflow_logs_flow(
         console_token: Console API Token（如果使用 Block，会被 Block 中的值覆盖）
         console_email: Console 登录邮箱（如果使用 Block，会被 Block 中的值覆盖）
         console_password: Console 登录密码（如果使用 Block，会被 Block 中的值覆盖）
+        shared_connections: 是否使用进程内共享的连接池（连接、Console Token、按主机限速在多个应用之间共享）
     
     Returns:
         执行结果字典
     """
+    ensure_logger_configured()
     logger = get_run_logger()
     logger.info("开始执行工作流日志获取任务")
     
-    # 如果提供了 config_name，从 Block 加载配置
+    # 合并参数、Block（或环境变量）和默认值，本次运行只使用这一份不可修改的配置
+    # Block 配置在本地缓存（CONFIG_CACHE_TTL），Prefect API 慢或不可用时使用上次成功读取的配置
+    run_config = resolve_run_config(
+        config_name,
+        base_url=base_url,
+        api_token=api_token,
+        app_id=app_id,
+        console_token=console_token,
+        console_email=console_email,
+        console_password=console_password,
+        output_format=output_format,
+        output_dir=output_dir,
+        index_dir=index_dir,
+        compression=compression,
+        fetch_all=fetch_all,
+        with_details=with_details,
+        with_node_executions=with_node_executions,
+        notify_on_complete=notify_on_complete,
+        resume=resume,
+        limit=limit,
+        max_pages=max_pages,
+        enrich_chunk_size=enrich_chunk_size,
+        enrich_chunk_retries=enrich_chunk_retries,
+        task_runner=task_runner,
+        task_runner_workers=task_runner_workers,
+        task_runner_address=task_runner_address,
+    )
     if config_name:
-        try:
-            from src.blocks.workflow_report_config import WorkflowReportConfig
-            logger.info(f"从 Block 加载配置: {config_name}")
-            block_config = WorkflowReportConfig.load(config_name)
-            
-            # 从 Block 读取配置（参数传入的值会覆盖 Block 中的值）
-            base_url = base_url or block_config.base_url
-            api_token = api_token or block_config.api_token
-            app_id = app_id or block_config.app_id
-            console_token = console_token or block_config.console_token
-            console_email = console_email or block_config.console_email
-            console_password = console_password or block_config.console_password
-            output_format = output_format or block_config.output_format
-            output_dir = output_dir or block_config.output_dir
-            fetch_all = fetch_all if fetch_all is not None else block_config.fetch_all
-            with_details = with_details if with_details is not None else block_config.with_details
-            with_node_executions = with_node_executions if with_node_executions is not None else block_config.with_node_executions
-            notify_on_complete = notify_on_complete if notify_on_complete is not None else block_config.notify_on_complete
-            limit = limit or block_config.limit
-            max_pages = max_pages or block_config.max_pages
-            
-            logger.info(f"已从 Block '{config_name}' 加载配置")
-        except Exception as e:
-            logger.error(f"从 Block 加载配置失败: {e}")
-            raise ValueError(f"无法加载 Block 配置 '{config_name}': {e}")
+        logger.info(f"已从 Block '{config_name}' 加载配置（{run_config.source}）")
     else:
-        # 向后兼容：从环境变量或参数加载配置
         logger.info("使用参数或环境变量配置（未使用 Block）")
-        try:
-            config = DifyConfig.from_env()
-            # 如果参数提供了值，则覆盖配置
-            base_url = base_url or config.base_url
-            api_token = api_token or config.api_token
-            app_id = app_id or config.app_id
-            console_token = console_token or config.console_token
-            console_email = console_email or config.console_email
-            console_password = console_password or config.console_password
-        except Exception as e:
-            logger.warning(f"加载环境变量配置失败，使用参数值: {e}")
-        
-        # 设置默认值（如果未提供）
-        output_format = output_format or "csv"
-        output_dir = output_dir or "./outputs/reports"
-        fetch_all = fetch_all if fetch_all is not None else True
-        with_details = with_details if with_details is not None else True
-        with_node_executions = with_node_executions if with_node_executions is not None else False
-        notify_on_complete = notify_on_complete if notify_on_complete is not None else False
-        limit = limit or 20
-    
-    # 验证必需参数
-    if not base_url or not api_token:
-        raise ValueError("必须提供 base_url 和 api_token（通过 Block、参数或环境变量）")
     
     # 打印关键配置（用于排查问题）
     logger.info("=" * 60)
     logger.info("关键配置信息:")
-    logger.info(f"  base_url: {base_url}")
-    logger.info(f"  api_token: {api_token[:10]}...{api_token[-4:] if len(api_token) > 14 else '***'}")
-    logger.info(f"  app_id: {app_id or '(未配置)'}")
+    logger.info(f"  base_url: {run_config.base_url}")
+    logger.info(f"  api_token: {run_config.api_token[:10]}...{run_config.api_token[-4:] if len(run_config.api_token) > 14 else '***'}")
+    logger.info(f"  app_id: {run_config.app_id or '(未配置)'}")
     logger.info(f"  时间范围: {created_at_after} ~ {created_at_before}")
-    logger.info(f"  输出格式: {output_format}")
-    logger.info(f"  输出目录: {output_dir}")
-    logger.info(f"  获取所有: {fetch_all}")
-    logger.info(f"  包含详情: {with_details}")
-    logger.info(f"  包含节点执行: {with_node_executions}")
+    logger.info(f"  输出格式: {run_config.output_format}")
+    logger.info(f"  输出目录: {run_config.output_dir}")
+    logger.info(f"  索引目录: {run_config.index_dir}")
+    logger.info(f"  获取所有: {run_config.fetch_all}")
+    logger.info(f"  包含详情: {run_config.with_details}")
+    logger.info(f"  包含节点执行: {run_config.with_node_executions}")
+    if run_config.enrich_chunk_size:
+        logger.info(f"  分片丰富: 每片 {run_config.enrich_chunk_size} 条，任务执行器 {run_config.task_runner}")
     logger.info("=" * 60)
     
-    # Task 1: 获取日志
-    logs_result = fetch_logs_task(
-        base_url=base_url,
-        api_token=api_token,
-        keyword=keyword,
-        status=status,
-        created_at_before=created_at_before,
-        created_at_after=created_at_after,
-        created_by_end_user_session_id=created_by_end_user_session_id,
-        created_by_account=created_by_account,
-        fetch_all=fetch_all,
-        limit=limit,
-        max_pages=max_pages,
-    )
+    # 检查点：参数相同的重试和手动重新运行从上次的进度继续。
+    # 只有时间范围有确定上限时分页内容才稳定，可以跨运行复用；没有上限（如定时获取最新日志）时默认不记录检查点，
+    # 显式开启时检查点键包含 Flow 运行 ID，只在本次运行的重试之间复用，不会读到上次运行的旧分页
+    checkpoint_key = None
+    bounded_window = is_bounded_window(created_at_before)
+    resume = run_config.resume if run_config.resume is not None else bounded_window
+    if resume:
+        run_scope = {} if bounded_window else {"flow_run_id": flow_run.id}
+        checkpoint_key = compute_checkpoint_key(
+            **run_scope,
+            base_url=run_config.base_url,
+            api_token=run_config.api_token,
+            app_id=run_config.app_id,
+            keyword=keyword,
+            status=status,
+            created_at_before=created_at_before,
+            created_at_after=created_at_after,
+            created_by_end_user_session_id=created_by_end_user_session_id,
+            created_by_account=created_by_account,
+            fetch_all=run_config.fetch_all,
+            limit=run_config.limit,
+            max_pages=run_config.max_pages,
+            with_node_executions=run_config.with_node_executions,
+        )
+        scope = "跨运行复用" if bounded_window else "只用于本次 Flow 运行的重试（created_at_before 没有确定上限）"
+        logger.info(f"检查点: {checkpoint_key[:12]}，{scope}（{run_config.index_dir}/{RunCheckpoint.DB_FILENAME}）")
+    checkpoint_dir = run_config.index_dir if checkpoint_key else None
     
-    # Task 2: 丰富详情（如果需要）
-    if with_details:
-        enriched_result = enrich_logs_task(
-            logs_result=logs_result,
-            base_url=base_url,
-            api_token=api_token,
-            app_id=app_id,
-            console_token=console_token,
-            console_email=console_email,
-            console_password=console_password,
-            with_node_executions=with_node_executions,
+    # 本次运行的所有 API 请求共享一个重试预算，Dify 故障时不会因为大量请求同时重试而形成重试风暴；
+    # Console 节点执行接口连续失败后熔断，剩余日志不再请求，运行很快结束并保留部分数据
+    with retry_budget_scope(create_retry_budget()) as retry_budget, \
+            circuit_breaker_scope(create_circuit_breakers()) as breakers:
+        # Task 1: 获取日志
+        logs_result = fetch_logs_task(
+            base_url=run_config.base_url,
+            api_token=run_config.api_token,
+            keyword=keyword,
+            status=status,
+            created_at_before=created_at_before,
+            created_at_after=created_at_after,
+            created_by_end_user_session_id=created_by_end_user_session_id,
+            created_by_account=created_by_account,
+            fetch_all=run_config.fetch_all,
+            limit=run_config.limit,
+            max_pages=run_config.max_pages,
+            checkpoint_dir=checkpoint_dir,
+            checkpoint_key=checkpoint_key,
+            shared_connections=shared_connections,
         )
-    else:
-        enriched_result = logs_result
+    
+        # Task 2: 丰富详情（如果需要）
+        if run_config.with_details and run_config.enrich_chunk_size:
+            # 分片模式：在本 Flow 内打开 Task Runner，按分片提交 enrich_logs_task 并行丰富，每个分片单独重试
+            enriched_result = run_chunked_enrichment(
+                task_runner=run_config.task_runner,
+                max_workers=run_config.task_runner_workers,
+                task_runner_address=run_config.task_runner_address,
+                logs_result=logs_result,
+                base_url=run_config.base_url,
+                api_token=run_config.api_token,
+                chunk_size=run_config.enrich_chunk_size,
+                chunk_retries=run_config.enrich_chunk_retries,
+                app_id=run_config.app_id,
+                console_token=run_config.console_token,
+                console_email=run_config.console_email,
+                console_password=run_config.console_password,
+                with_node_executions=run_config.with_node_executions,
+                index_dir=run_config.index_dir,
+                # 远程集群的 worker 访问不到本地索引目录，不记录丰富进度
+                checkpoint_dir=None if run_config.task_runner_address else checkpoint_dir,
+                checkpoint_key=checkpoint_key,
+                shared_connections=shared_connections,
+            )
+        elif run_config.with_details:
+            enriched_result = enrich_logs_task(
+                logs_result=logs_result,
+                base_url=run_config.base_url,
+                api_token=run_config.api_token,
+                app_id=run_config.app_id,
+                console_token=run_config.console_token,
+                console_email=run_config.console_email,
+                console_password=run_config.console_password,
+                with_node_executions=run_config.with_node_executions,
+                index_dir=run_config.index_dir,
+                checkpoint_dir=checkpoint_dir,
+                checkpoint_key=checkpoint_key,
+                shared_connections=shared_connections,
+            )
+        else:
+            enriched_result = logs_result
+    
+    retry_stats = retry_budget.stats()
+    if any(item["retries"] or item["budget_exhausted"] for item in retry_stats.values()):
+        logger.info(f"API 重试: 共 {retry_budget.retries} 次，{format_retry_stats(retry_stats)}")
+    circuit_breakers = breakers.snapshot()
+    for name, breaker in circuit_breakers.items():
+        if breaker["opened"]:
+            logger.warning(
+                f"接口 {name} 在本次运行中熔断 {breaker['opened']} 次（当前 {breaker['state']}），"
+                f"跳过 {breaker['rejected']} 次请求: {breaker['last_error']}"
+            )
+    partial_logs = sum(
+        1 for log in enriched_result.get("data", []) if any(key in log for key in PARTIAL_ENRICHMENT_KEYS)
+    )
+    if partial_logs:
+        logger.warning(f"{partial_logs} 条日志只获取到部分详情（已标记 *_error 字段）")
     
     # Task 3: 生成报告
     report_result = generate_reports_task(
         logs_result=enriched_result,
-        output_dir=output_dir,
-        output_format=output_format,
+        output_dir=run_config.output_dir,
+        output_format=run_config.output_format,
+        index_dir=run_config.index_dir,
+        compression=run_config.compression,
     )
     
-    # Task 4: 发送通知（如果需要）
-    if notify_on_complete:
+    # 报告已生成，本次进度不再需要；下次运行重新获取最新数据
+    if checkpoint_key:
+        with RunCheckpoint(checkpoint_dir, checkpoint_key) as checkpoint:
+            checkpoint.clear()
+            checkpoint.purge_older_than(CHECKPOINT_RETENTION_DAYS)
+    
+    # Task 4: 发送通知（如果需要，报告未变化时不重复通知）
+    # 通知交给后台分发器发送，不阻塞 Flow；合并窗口内的多条报告通知合并为一条摘要
+    if run_config.notify_on_complete and not report_result.get("skipped"):
         try:
-            config = DifyConfig.from_env()
-            if config.notification.enabled:
-                notifier = create_notification_service(
-                    notification_type=config.notification.type,
-                    **config.notification.config
+            notification = run_config.notification
+            if notification.enabled:
+                dispatcher = get_notification_dispatcher(
+                    notification_type=notification.type,
+                    digest_window=notification.digest_window,
+                    spool_dir=run_config.index_dir,
+                    **notification.config
                 )
-                if notifier:
-                    notifier.notify_report_ready(
+                if dispatcher:
+                    dispatcher.submit_report_ready(
                         report_path=", ".join(report_result.get("report_files", [])),
-                        report_type=output_format,
+                        report_type=", ".join(normalize_output_formats(run_config.output_format)),
                     )
         except Exception as e:
             logger.warning(f"发送通知失败: {e}")
@@ -207,6 +303,11 @@ def fetch_workflow_logs_flow(
         "logs_count": len(enriched_result.get("data", [])),
         "report_files": report_result.get("report_files", []),
         "report_count": report_result.get("report_count", 0),
+        "report_skipped": report_result.get("skipped", False),
+        "retries": retry_budget.retries,
+        "retry_stats": retry_stats,
+        "circuit_breakers": circuit_breakers,
+        "partial_logs": partial_logs,
         "status": "success",
     }
     
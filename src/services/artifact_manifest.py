@@ -0,0 +1,234 @@
+"""存储产物清单索引"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 清单覆盖的顶层目录 → 产物类型
+ARTIFACT_DIRS = {"reports": "report", "data": "data"}
+
+
+def file_checksum(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件的 SHA-256 校验和"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactManifest:
+    """
+    存储产物清单
+
+    在 SQLite 中记录存储服务写入的每个文件（相对路径、类型、大小、校验和、创建 / 修改时间），
+    列表、按时间范围查询和过期清理都直接查询清单，耗时只与结果数量相关，不再遍历整个目录。
+    清单与磁盘不一致时（手动删除 / 复制文件）可以用 reconcile 从磁盘重建。
+    """
+
+    DB_FILENAME = ".manifest.db"
+
+    def __init__(self, base_dir: str):
+        """
+        初始化产物清单
+
+        Args:
+            base_dir: 存储基础目录（清单中的路径相对于该目录）
+        """
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.base_dir / self.DB_FILENAME
+        self.created = not self.db_path.exists()
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        """初始化表结构"""
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                path TEXT PRIMARY KEY,
+                artifact_type TEXT NOT NULL,
+                report_type TEXT,
+                size INTEGER NOT NULL,
+                checksum TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                modified_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_artifacts_type_time
+                ON artifacts (artifact_type, report_type, modified_at);
+            CREATE INDEX IF NOT EXISTS idx_artifacts_time
+                ON artifacts (modified_at);
+            """
+        )
+
+    def relative_path(self, path: Path) -> str:
+        """转换为清单中使用的相对路径（统一使用 / 分隔）"""
+        return Path(path).resolve().relative_to(self.base_dir.resolve()).as_posix()
+
+    @staticmethod
+    def classify(relative_path: str) -> Optional[Dict[str, Optional[str]]]:
+        """
+        根据相对路径判断产物类型
+
+        Returns:
+            {"artifact_type", "report_type"}，不属于清单管理的路径返回 None
+        """
+        parts = relative_path.split("/")
+        artifact_type = ARTIFACT_DIRS.get(parts[0])
+        if artifact_type is None or len(parts) < 2:
+            return None
+        report_type = parts[1] if artifact_type == "report" and len(parts) > 2 else None
+        return {"artifact_type": artifact_type, "report_type": report_type}
+
+    def record(
+        self,
+        path: Path,
+        artifact_type: str,
+        report_type: Optional[str] = None,
+        checksum: Optional[str] = None,
+    ):
+        """
+        记录（或更新）一个已写入的文件
+
+        Args:
+            path: 文件路径
+            artifact_type: 产物类型（report/data）
+            report_type: 报告类型（daily/weekly 等）
+            checksum: 内容的 SHA-256，未提供时读取文件计算
+        """
+        path = Path(path)
+        stat = path.stat()
+        rel_path = self.relative_path(path)
+        checksum = checksum or file_checksum(path)
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO artifacts (path, artifact_type, report_type, size, checksum, created_at, modified_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    artifact_type = excluded.artifact_type,
+                    report_type = excluded.report_type,
+                    size = excluded.size,
+                    checksum = excluded.checksum,
+                    modified_at = excluded.modified_at
+                """,
+                (rel_path, artifact_type, report_type, stat.st_size, checksum, time.time(), stat.st_mtime),
+            )
+
+    def query(
+        self,
+        artifact_type: Optional[str] = None,
+        report_type: Optional[str] = None,
+        modified_after: Optional[float] = None,
+        modified_before: Optional[float] = None,
+        path_prefix: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        按类型和修改时间范围查询产物
+
+        Args:
+            artifact_type: 产物类型
+            report_type: 报告类型
+            modified_after: 修改时间下限（含，Unix 时间戳）
+            modified_before: 修改时间上限（不含，Unix 时间戳）
+            path_prefix: 相对路径前缀（如 data/partitions/）
+
+        Returns:
+            产物记录列表（按路径排序，path 为相对路径）
+        """
+        conditions = []
+        params: List[Any] = []
+        if artifact_type is not None:
+            conditions.append("artifact_type = ?")
+            params.append(artifact_type)
+        if report_type is not None:
+            conditions.append("report_type = ?")
+            params.append(report_type)
+        if modified_after is not None:
+            conditions.append("modified_at >= ?")
+            params.append(modified_after)
+        if modified_before is not None:
+            conditions.append("modified_at < ?")
+            params.append(modified_before)
+        if path_prefix:
+            # 不用 LIKE，避免前缀中的 _ / % 被当作通配符
+            conditions.append("substr(path, 1, ?) = ?")
+            params.extend([len(path_prefix), path_prefix])
+
+        sql = "SELECT * FROM artifacts"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY path"
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def remove(self, paths: Iterable[str]):
+        """
+        从清单中删除记录
+
+        Args:
+            paths: 相对路径列表
+        """
+        with self.conn:
+            self.conn.executemany("DELETE FROM artifacts WHERE path = ?", [(path,) for path in paths])
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        从磁盘重建清单
+
+        遍历 reports/ 和 data/ 目录：补录清单中没有的文件，更新大小或修改时间变化的文件，
+        删除磁盘上已经不存在的记录。
+
+        Returns:
+            {"added", "updated", "removed", "total"} 计数
+        """
+        known = {row["path"]: row for row in self.query()}
+        seen = set()
+        added = updated = 0
+
+        for dir_name in ARTIFACT_DIRS:
+            dir_path = self.base_dir / dir_name
+            if not dir_path.exists():
+                continue
+            for file_path in dir_path.rglob("*"):
+                if not file_path.is_file() or file_path.name.startswith("."):
+                    continue
+                rel_path = self.relative_path(file_path)
+                kind = self.classify(rel_path)
+                if kind is None:
+                    continue
+                seen.add(rel_path)
+
+                row = known.get(rel_path)
+                stat = file_path.stat()
+                if row is not None and row["size"] == stat.st_size and row["modified_at"] == stat.st_mtime:
+                    continue
+                self.record(file_path, kind["artifact_type"], kind["report_type"])
+                if row is None:
+                    added += 1
+                else:
+                    updated += 1
+
+        missing = [path for path in known if path not in seen]
+        self.remove(missing)
+
+        result = {"added": added, "updated": updated, "removed": len(missing), "total": len(seen)}
+        logger.info(f"产物清单已重建: {result}")
+        return result
+
+    def close(self):
+        """关闭清单"""
+        self.conn.close()
+
+    def __enter__(self) -> "ArtifactManifest":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,230 @@
+"""获取 / 丰富进度检查点"""
+
+import hashlib
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.logger import get_logger
+from src.utils import jsoncodec
+
+logger = get_logger(__name__)
+
+# 检查点内容的格式变化时递增，使旧检查点失效
+CHECKPOINT_VERSION = 1
+
+
+def compute_checkpoint_key(**params: Any) -> str:
+    """
+    根据 Flow 运行参数计算检查点键
+
+    参数相同（同一应用、同一时间范围和过滤条件）的重试和手动重新运行得到同一个键，
+    从而复用上次的进度。API Token 只参与哈希，不会以明文写入检查点。
+
+    Args:
+        **params: 决定获取和丰富结果的参数（需要可 JSON 序列化）
+
+    Returns:
+        十六进制检查点键
+    """
+    payload = jsoncodec.dumps_bytes([CHECKPOINT_VERSION, sorted(params.items())], default=str)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def is_bounded_window(created_at_before: Optional[str], now: Optional[datetime] = None) -> bool:
+    """
+    判断时间范围是否有确定的上限（created_at_before 不晚于当前时间）
+
+    日志列表按创建时间倒序分页，上限之后不会再有新日志插入，同样的参数重新获取时各页内容不变，
+    检查点中的页码才能复用；没有上限时新日志会把已有日志挤到后面的分页。
+
+    Args:
+        created_at_before: 创建时间上限（ISO 8601，无时区时按 UTC）
+        now: 当前时间（默认为系统时间）
+
+    Returns:
+        是否有确定的上限（无法解析时返回 False）
+    """
+    if not created_at_before:
+        return False
+    try:
+        before = datetime.fromisoformat(created_at_before.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if before.tzinfo is None:
+        before = before.replace(tzinfo=timezone.utc)
+    return before <= (now or datetime.now(timezone.utc))
+
+
+class RunCheckpoint:
+    """
+    一次获取 / 丰富运行的持久化进度
+
+    保存在索引目录下的 checkpoints.db（SQLite）中，按检查点键区分不同的运行：
+    - 已完成的分页：页码、该页的日志和是否还有下一页，重试时从最后一个完成页的下一页继续；
+    - 已丰富的日志：日志 ID 和丰富后的内容，重试时跳过这些日志（获取详情失败的日志不记录，会重新获取）。
+    Flow 成功生成报告后清除检查点，下次运行重新获取最新数据。
+    """
+
+    DB_FILENAME = "checkpoints.db"
+
+    # 丰富结果每累计这么多条提交一次，减少 fsync 次数
+    COMMIT_EVERY = 50
+
+    def __init__(self, index_dir: str, key: str):
+        """
+        初始化检查点
+
+        Args:
+            index_dir: 索引目录（分片在多个进程中运行时需要是共享路径）
+            key: 检查点键（见 compute_checkpoint_key）
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_dir / self.DB_FILENAME
+        self.key = key
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self._pending = 0
+        self._init_schema()
+
+    def _init_schema(self):
+        """初始化表结构"""
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS fetched_pages (
+                run_key TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                has_more INTEGER NOT NULL,
+                logs BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_key, page)
+            );
+            CREATE TABLE IF NOT EXISTS enriched_logs (
+                run_key TEXT NOT NULL,
+                log_id TEXT NOT NULL,
+                log BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_key, log_id)
+            );
+            """
+        )
+
+    def load_pages(self) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        读取已完成的分页
+
+        Returns:
+            (已获取的日志, 下一个要获取的页码, 是否已经获取完毕)
+        """
+        rows = self.conn.execute(
+            "SELECT page, has_more, logs FROM fetched_pages WHERE run_key = ? ORDER BY page",
+            (self.key,),
+        ).fetchall()
+
+        logs: List[Dict[str, Any]] = []
+        next_page = 1
+        finished = False
+        for page, has_more, data in rows:
+            # 只接受从第 1 页开始连续的分页
+            if page != next_page:
+                break
+            logs.extend(jsoncodec.loads(data))
+            next_page = page + 1
+            finished = not has_more
+        return logs, next_page, finished
+
+    def save_page(self, page: int, logs: List[Dict[str, Any]], has_more: bool):
+        """
+        记录一个已完成的分页（立即提交）
+
+        Args:
+            page: 页码
+            logs: 该页的日志
+            has_more: 是否还有下一页
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO fetched_pages (run_key, page, has_more, logs, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (self.key, page, int(bool(has_more)), jsoncodec.dumps_bytes(logs, default=str), time.time()),
+        )
+        self.conn.commit()
+
+    def load_enriched(self, log_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        读取已丰富的日志
+
+        Args:
+            log_ids: 只读取这些日志（None 表示全部）
+
+        Returns:
+            日志 ID -> 丰富后的日志
+        """
+        rows = self.conn.execute(
+            "SELECT log_id, log FROM enriched_logs WHERE run_key = ?",
+            (self.key,),
+        ).fetchall()
+        wanted = set(log_ids) if log_ids is not None else None
+        return {
+            log_id: jsoncodec.loads(data)
+            for log_id, data in rows
+            if wanted is None or log_id in wanted
+        }
+
+    def save_enriched(self, log: Dict[str, Any]):
+        """
+        记录一条已丰富的日志（每 COMMIT_EVERY 条提交一次，调用 flush 立即提交）
+
+        Args:
+            log: 丰富后的日志（没有 ID 的日志不记录）
+        """
+        log_id = log.get("id")
+        if not log_id:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO enriched_logs (run_key, log_id, log, updated_at) VALUES (?, ?, ?, ?)",
+            (self.key, str(log_id), jsoncodec.dumps_bytes(log, default=str), time.time()),
+        )
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        """提交尚未提交的丰富结果"""
+        self.conn.commit()
+        self._pending = 0
+
+    def clear(self):
+        """清除本次运行的检查点"""
+        self.conn.execute("DELETE FROM fetched_pages WHERE run_key = ?", (self.key,))
+        self.conn.execute("DELETE FROM enriched_logs WHERE run_key = ?", (self.key,))
+        self.conn.commit()
+        self._pending = 0
+
+    def purge_older_than(self, days: float) -> int:
+        """
+        删除超过指定天数未更新的检查点（所有运行）
+
+        Args:
+            days: 天数
+
+        Returns:
+            删除的记录数
+        """
+        cutoff = time.time() - days * 86400
+        deleted = self.conn.execute("DELETE FROM fetched_pages WHERE updated_at < ?", (cutoff,)).rowcount
+        deleted += self.conn.execute("DELETE FROM enriched_logs WHERE updated_at < ?", (cutoff,)).rowcount
+        self.conn.commit()
+        return deleted
+
+    def close(self):
+        """提交并关闭连接"""
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self) -> "RunCheckpoint":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
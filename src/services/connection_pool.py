@@ -0,0 +1,247 @@
+"""多应用共享的 Dify 连接池"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class HostRateLimiter:
+    """
+    单个主机的请求速率限制（令牌桶）
+
+    所有共享连接池的线程从同一个桶里取令牌，桶空时等待，保证对同一个 Dify 实例的总请求速率不超过上限。
+    """
+
+    def __init__(self, requests_per_second: float, burst: Optional[int] = None):
+        """
+        初始化限速器
+
+        Args:
+            requests_per_second: 每秒请求数上限
+            burst: 桶容量（允许的瞬时并发请求数，默认等于每秒请求数）
+        """
+        self.rate = requests_per_second
+        self.capacity = max(burst or int(requests_per_second), 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        """取一个令牌（桶空时阻塞等待）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+
+class PooledSession:
+    """
+    连接池上的 Session 视图
+
+    与 requests.Session 的 get/post 用法相同，请求头（如各应用自己的 API Token）按视图区分，
+    底层连接在所有应用之间共享，每个请求先经过所在主机的限速器。
+    """
+
+    def __init__(self, pool: "DifyConnectionPool", base_url: str, headers: Optional[Dict[str, str]] = None):
+        self.pool = pool
+        self.host = urlparse(base_url).netloc
+        self.headers: Dict[str, str] = dict(headers or {})
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        headers = {**self.headers, **(kwargs.pop("headers", None) or {})}
+        self.pool.throttle(self.host)
+        return self.pool.thread_session().request(method, url, headers=headers, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """连接归连接池所有，这里不需要关闭"""
+
+
+class DifyConnectionPool:
+    """
+    多应用共享的 Dify 连接池
+
+    - HTTP 连接：所有线程的 Session 挂载同一个 HTTPAdapter，连接在应用之间复用；
+      Session 按线程创建，cookie 等状态不会在线程之间互相影响；
+    - Console Token：同一个 Dify 实例的同一个账户只登录一次，Token 失效时只由一个线程重新登录；
+    - 速率限制：按主机限速，同一个 Dify 实例上所有应用的请求共享一个上限。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 32,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+    ):
+        """
+        初始化连接池
+
+        Args:
+            max_connections: 每个主机保持的最大连接数
+            requests_per_second: 每个主机的每秒请求数上限（None 表示不限速）
+            burst: 限速桶容量（默认等于每秒请求数）
+        """
+        self.max_connections = max_connections
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions: list = []
+        self._limiters: Dict[str, HostRateLimiter] = {}
+        self._tokens: Dict[Tuple[str, str], str] = {}
+        self._token_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.stats = {"requests": 0, "logins": 0}
+
+    def session(self, base_url: str, headers: Optional[Dict[str, str]] = None) -> PooledSession:
+        """
+        创建一个共享连接的 Session 视图
+
+        Args:
+            base_url: Dify API 基础 URL（决定使用哪个主机的限速器）
+            headers: 该视图的请求头
+
+        Returns:
+            Session 视图
+        """
+        return PooledSession(self, base_url, headers)
+
+    def thread_session(self) -> requests.Session:
+        """当前线程的 Session（挂载共享的 HTTPAdapter）"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def throttle(self, host: str):
+        """
+        记录一次请求，超过主机的速率上限时等待
+
+        Args:
+            host: 主机（host:port）
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            if not self.requests_per_second:
+                return
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = HostRateLimiter(self.requests_per_second, self.burst)
+                self._limiters[host] = limiter
+        limiter.acquire()
+
+    def console_token(
+        self,
+        base_url: str,
+        email: str,
+        login: Callable[[], Optional[str]],
+        stale_token: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        获取账户的 Console Token（同一账户只登录一次）
+
+        Args:
+            base_url: Dify API 基础 URL
+            email: Console 登录邮箱
+            login: 登录函数，成功时返回 Token
+            stale_token: 已失效的 Token（缓存的仍是它时重新登录；其他线程已刷新时直接返回新 Token）
+
+        Returns:
+            Console Token，登录失败时返回 None
+        """
+        key = (base_url.rstrip("/"), email)
+        with self._lock:
+            lock = self._token_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            token = self._tokens.get(key)
+            if token and token != stale_token:
+                return token
+            token = login()
+            with self._lock:
+                self.stats["logins"] += 1
+                if token:
+                    self._tokens[key] = token
+                else:
+                    self._tokens.pop(key, None)
+            return token
+
+    def throttled_seconds(self) -> float:
+        """所有主机因限速累计等待的秒数"""
+        with self._lock:
+            return sum(limiter.waited_seconds for limiter in self._limiters.values())
+
+    def close(self):
+        """关闭所有连接"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+
+
+_POOL: Optional[DifyConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def configure_connection_pool(
+    max_connections: int = 32,
+    requests_per_second: Optional[float] = None,
+    burst: Optional[int] = None,
+) -> DifyConnectionPool:
+    """
+    （重新）创建进程内共享的连接池
+
+    Args:
+        max_connections: 每个主机保持的最大连接数
+        requests_per_second: 每个主机的每秒请求数上限（None 表示不限速）
+        burst: 限速桶容量
+
+    Returns:
+        新的连接池
+    """
+    global _POOL
+    # 旧连接池可能仍被正在运行的 Flow 使用，不主动关闭，由垃圾回收释放连接
+    with _POOL_LOCK:
+        _POOL = DifyConnectionPool(max_connections, requests_per_second, burst)
+        return _POOL
+
+
+def get_connection_pool() -> DifyConnectionPool:
+    """
+    获取进程内共享的连接池（未配置时使用默认参数创建）
+
+    Returns:
+        连接池
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = DifyConnectionPool()
+        return _POOL
@@ -1,14 +1,38 @@
 """工作流日志获取服务"""
 
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 import requests
 
-from src.core.exceptions import DifyAPIError, DifyAuthenticationError
-from src.core.logger import get_logger
+from src.core.exceptions import DifyAPIError, DifyAuthenticationError, DifyCircuitOpenError
+from src.core.logger import LogSampler, ProgressLogger, get_logger
+from src.utils import jsoncodec
+from src.utils.circuit_breaker import get_circuit_breaker
 from src.utils.retry import retry_on_api_error
 
+if TYPE_CHECKING:
+    from src.services.connection_pool import DifyConnectionPool
+
 logger = get_logger(__name__)
 
+# 逐条日志获取详情时的失败警告按类别采样，避免大批量运行时刷屏
+_sampler = LogSampler()
+
+# Console 节点执行接口的熔断器名称
+NODE_EXECUTIONS_ENDPOINT = "console_node_executions"
+
+
+def _parse_json(response: requests.Response) -> Any:
+    """
+    解析响应体 JSON
+
+    解码失败时抛出 requests 的 JSONDecodeError（属于 RequestException），
+    与 response.json() 的行为一致，调用方的异常处理不变。
+    """
+    try:
+        return jsoncodec.loads(response.content)
+    except jsoncodec.JSONDecodeError as e:
+        raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos) from e
+
 
 class WorkflowLogFetcher:
     """工作流日志获取器"""
@@ -20,6 +44,7 @@ class WorkflowLogFetcher:
         console_token: Optional[str] = None,
         console_email: Optional[str] = None,
         console_password: Optional[str] = None,
+        connection_pool: Optional["DifyConnectionPool"] = None,
     ):
         """
         初始化日志获取器
@@ -30,15 +55,16 @@ class WorkflowLogFetcher:
             console_token: Console API Token (可选)
             console_email: Console 登录邮箱 (可选)
             console_password: Console 登录密码 (可选)
+            connection_pool: 共享连接池 (可选，多个应用共享连接、Console Token 和限速)
         """
         self.base_url = base_url.rstrip("/")
         self.api_token = api_token
         self.console_token = console_token
         self.console_email = console_email
         self.console_password = console_password
+        self.connection_pool = connection_pool
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = self._create_session({
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json",
         })
@@ -50,23 +76,52 @@ class WorkflowLogFetcher:
         elif console_email and console_password:
             self._auto_login_console()
 
+    def _create_session(self, headers: Dict[str, str]):
+        """创建 session（使用共享连接池时为连接池上的视图）"""
+        if self.connection_pool:
+            return self.connection_pool.session(self.base_url, headers)
+        session = requests.Session()
+        session.headers.update(headers)
+        return session
+
     def _init_console_session(self, token: str):
         """初始化 Console API session"""
         self.console_token = token
-        self.console_session = requests.Session()
-        self.console_session.headers.update({
+        self.console_session = self._create_session({
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
         })
 
-    def _auto_login_console(self) -> bool:
-        """自动登录 Console API 获取 token"""
+    def _auto_login_console(self, force: bool = False) -> bool:
+        """
+        自动登录 Console API 获取 token
+
+        使用共享连接池时同一账户只登录一次；force=True 表示当前 token 已失效，需要重新登录。
+        """
         if not self.console_email or not self.console_password:
             return False
 
+        if self.connection_pool:
+            token = self.connection_pool.console_token(
+                self.base_url,
+                self.console_email,
+                self._login_console,
+                stale_token=self.console_token if force else None,
+            )
+        else:
+            token = self._login_console()
+
+        if not token:
+            return False
+        self._init_console_session(token)
+        return True
+
+    def _login_console(self) -> Optional[str]:
+        """登录 Console API，成功时返回 access_token"""
         try:
             url = f"{self.base_url}/console/api/login"
-            response = requests.post(
+            poster = self.connection_pool.session(self.base_url) if self.connection_pool else requests
+            response = poster.post(
                 url,
                 json={
                     "email": self.console_email,
@@ -75,25 +130,24 @@ class WorkflowLogFetcher:
                 timeout=30,
             )
             response.raise_for_status()
-            result = response.json()
+            result = _parse_json(response)
             
             if result.get("result") == "success":
                 data = result.get("data", {})
                 access_token = data.get("access_token")
                 if access_token:
-                    self._init_console_session(access_token)
                     logger.info(f"已自动获取 Console Token (用户: {self.console_email})")
-                    return True
+                    return access_token
                 else:
                     logger.error("登录成功但未获取到 access_token")
-                    return False
+                    return None
             else:
                 error_msg = result.get("data", "未知错误")
                 logger.error(f"登录失败: {error_msg}")
-                return False
+                return None
         except requests.exceptions.RequestException as e:
             logger.error(f"自动登录失败: {str(e)}")
-            return False
+            return None
 
     def _ensure_console_token(self) -> bool:
         """确保 Console Token 有效"""
@@ -107,7 +161,7 @@ class WorkflowLogFetcher:
         """处理 Console API 认证错误"""
         if self.console_email and self.console_password:
             logger.warning("Console Token 可能已失效，尝试重新登录...")
-            if self._auto_login_console():
+            if self._auto_login_console(force=True):
                 return True
         return False
 
@@ -143,16 +197,17 @@ class WorkflowLogFetcher:
         if created_by_account:
             params["created_by_account"] = created_by_account
 
-        # 打印请求信息（用于排查问题）
-        logger.info(f"请求 URL: {url}")
-        logger.info(f"请求参数: {params}")
+        # 请求信息（用于排查问题，DEBUG 级别，未启用时不格式化）
+        logger.debug("请求 URL: {}，参数: {}", url, params)
         
         try:
             response = self.session.get(url, params=params, timeout=30)
-            logger.debug(f"响应状态码: {response.status_code}")
             response.raise_for_status()
-            result = response.json()
-            logger.info(f"响应数据: total={result.get('total', 0)}, has_more={result.get('has_more', False)}, data_count={len(result.get('data', []))}")
+            result = _parse_json(response)
+            logger.debug(
+                "响应: 状态码={}, total={}, has_more={}, data_count={}",
+                response.status_code, result.get("total", 0), result.get("has_more", False), len(result.get("data", [])),
+            )
             return result
         except requests.exceptions.RequestException as e:
             status_code = getattr(e.response, "status_code", None) if hasattr(e, "response") else None
@@ -173,10 +228,22 @@ class WorkflowLogFetcher:
         created_by_account: Optional[str] = None,
         limit: int = 20,
         max_pages: Optional[int] = None,
+        start_page: int = 1,
+        on_page: Optional[Callable[[int, List[Dict[str, Any]], bool], None]] = None,
     ) -> List[Dict[str, Any]]:
-        """获取所有日志（自动翻页）"""
+        """
+        获取所有日志（自动翻页）
+
+        Args:
+            start_page: 起始页码（从检查点恢复时跳过已获取的分页）
+            on_page: 每获取完一页后的回调 (页码, 该页日志, 是否还有下一页)，用于记录检查点
+
+        Returns:
+            从 start_page 开始获取到的日志
+        """
         all_logs = []
-        page = 1
+        page = start_page
+        progress = ProgressLogger("获取日志", unit="页")
 
         while True:
             if max_pages and page > max_pages:
@@ -194,17 +261,21 @@ class WorkflowLogFetcher:
             )
 
             logs = result.get("data", [])
+            has_more = bool(logs) and result.get("has_more", False)
+            if on_page:
+                on_page(page, logs, has_more)
             if not logs:
                 break
 
             all_logs.extend(logs)
-            logger.debug(f"已获取第 {page} 页，共 {len(all_logs)} 条日志")
+            progress.advance()
 
-            if not result.get("has_more", False):
+            if not has_more:
                 break
 
             page += 1
 
+        progress.finish()
         logger.info(f"共获取 {len(all_logs)} 条日志")
         return all_logs
 
@@ -218,7 +289,7 @@ class WorkflowLogFetcher:
             if response.status_code == 404:
                 return None
             response.raise_for_status()
-            return response.json()
+            return _parse_json(response)
         except requests.exceptions.RequestException as e:
             if hasattr(e, "response") and e.response is not None:
                 if e.response.status_code == 404:
@@ -231,31 +302,47 @@ class WorkflowLogFetcher:
             raise DifyAPIError(f"请求失败: {str(e)}") from e
 
     def fetch_node_executions(self, app_id: str, workflow_run_id: str) -> List[Dict[str, Any]]:
-        """获取工作流运行的节点执行详情"""
+        """
+        获取工作流运行的节点执行详情
+
+        Console 接口连续失败（无法登录、Token 失效后重新登录仍失败、请求失败）达到阈值后熔断，
+        熔断期间不再发出请求或重新登录，直接抛出 DifyCircuitOpenError。
+
+        Raises:
+            DifyAPIError: 获取失败（调用方据此标记日志）
+        """
+        breaker = get_circuit_breaker(NODE_EXECUTIONS_ENDPOINT)
+        if not breaker.allow():
+            raise DifyCircuitOpenError(f"Console 节点执行接口已熔断，跳过: {breaker.last_error}")
+        try:
+            node_executions = self._request_node_executions(app_id, workflow_run_id)
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+        return node_executions
+
+    def _request_node_executions(self, app_id: str, workflow_run_id: str) -> List[Dict[str, Any]]:
+        """请求 Console API 的节点执行详情（404 表示没有节点执行记录）"""
         if not self._ensure_console_token():
-            logger.warning("无法获取 Console Token，跳过节点执行详情")
-            return []
+            raise DifyAuthenticationError("无法获取 Console Token，跳过节点执行详情")
 
         url = f"{self.base_url}/console/api/apps/{app_id}/workflow-runs/{workflow_run_id}/node-executions"
         
         try:
             response = self.console_session.get(url, timeout=30)
+            if response.status_code == 401 and self._handle_console_auth_error():
+                response = self.console_session.get(url, timeout=30)
             if response.status_code == 404:
                 return []
-            elif response.status_code == 401:
-                if self._handle_console_auth_error():
-                    response = self.console_session.get(url, timeout=30)
-                    if response.status_code == 401:
-                        return []
-                    response.raise_for_status()
-                else:
-                    return []
+            if response.status_code == 401:
+                raise DifyAuthenticationError("Console Token 无效且重新登录失败", status_code=401)
             response.raise_for_status()
-            result = response.json()
+            result = _parse_json(response)
             return result.get("data", [])
         except requests.exceptions.RequestException as e:
-            logger.warning(f"获取节点执行详情失败: {str(e)}")
-            return []
+            status_code = getattr(e.response, "status_code", None) if getattr(e, "response", None) is not None else None
+            raise DifyAPIError(f"获取节点执行详情失败: {e}", status_code=status_code) from e
 
     def enrich_log_with_details(
         self,
@@ -276,7 +363,7 @@ class WorkflowLogFetcher:
             if run_detail:
                 log["workflow_run_detail"] = run_detail
         except Exception as e:
-            logger.warning(f"获取工作流运行详情失败: {str(e)}")
+            _sampler.warning("workflow_run_detail", "获取工作流运行详情失败: {}", e)
             log["workflow_run_detail_error"] = str(e)
 
         # 获取节点执行详情
@@ -292,7 +379,7 @@ class WorkflowLogFetcher:
                     node_executions = self.fetch_node_executions(app_id, workflow_run_id)
                     log["node_executions"] = node_executions
                 except Exception as e:
-                    logger.warning(f"获取节点执行详情失败: {str(e)}")
+                    _sampler.warning("node_executions", "获取节点执行详情失败: {}", e)
                     log["node_executions_error"] = str(e)
             else:
                 log["node_executions_error"] = "无法确定 app_id"
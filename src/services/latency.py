@@ -0,0 +1,146 @@
+"""延迟分位数统计服务"""
+
+from typing import Any, Dict, List, Optional
+
+from src.utils.formatters import format_timestamp
+from src.utils.tdigest import TDigest
+
+
+class LatencyStats:
+    """
+    延迟分位数统计
+
+    基于 t-digest 按整体、工作流、节点类型和日期四个维度流式统计 elapsed_time，
+    内存占用与日志数量无关；不同分片的统计结果可以通过 merge 合并。
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    DIMENSION_OVERALL = "整体"
+    DIMENSION_WORKFLOW = "工作流"
+    DIMENSION_NODE_TYPE = "节点类型"
+    DIMENSION_DATE = "日期"
+
+    def __init__(self, compression: float = 100.0):
+        """
+        初始化延迟统计
+
+        Args:
+            compression: t-digest 压缩参数
+        """
+        self.compression = compression
+        self.overall = TDigest(compression)
+        self.by_workflow: Dict[str, TDigest] = {}
+        self.by_node_type: Dict[str, TDigest] = {}
+        self.by_date: Dict[str, TDigest] = {}
+
+    def _digest(self, group: Dict[str, TDigest], key: str) -> TDigest:
+        """获取（必要时创建）分组对应的 t-digest"""
+        digest = group.get(key)
+        if digest is None:
+            digest = TDigest(self.compression)
+            group[key] = digest
+        return digest
+
+    def add_log(self, log: Dict[str, Any]) -> None:
+        """
+        统计一条日志的工作流耗时和节点耗时
+
+        Args:
+            log: 日志数据（可包含 workflow_run_detail 和 node_executions）
+        """
+        workflow_run = log.get("workflow_run") or {}
+        run_detail = log.get("workflow_run_detail") or {}
+
+        elapsed = workflow_run.get("elapsed_time")
+        if elapsed is None:
+            elapsed = run_detail.get("elapsed_time")
+
+        if isinstance(elapsed, (int, float)):
+            self.overall.add(elapsed)
+
+            workflow_id = run_detail.get("workflow_id")
+            if workflow_id:
+                self._digest(self.by_workflow, workflow_id).add(elapsed)
+
+            created_at = log.get("created_at")
+            if created_at:
+                date_str = format_timestamp(created_at).split()[0]
+                self._digest(self.by_date, date_str).add(elapsed)
+
+        for node in log.get("node_executions") or []:
+            node_elapsed = node.get("elapsed_time")
+            if not isinstance(node_elapsed, (int, float)):
+                continue
+            node_type = node.get("node_type") or "unknown"
+            self._digest(self.by_node_type, node_type).add(node_elapsed)
+
+    def merge(self, other: "LatencyStats") -> "LatencyStats":
+        """
+        合并另一个分片的延迟统计（原地修改并返回自身）
+
+        Args:
+            other: 另一个分片的延迟统计
+        """
+        self.overall.merge(other.overall)
+        for mine, theirs in (
+            (self.by_workflow, other.by_workflow),
+            (self.by_node_type, other.by_node_type),
+            (self.by_date, other.by_date),
+        ):
+            for key, digest in theirs.items():
+                self._digest(mine, key).merge(digest)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可 JSON 化的字典"""
+        return {
+            "compression": self.compression,
+            "overall": self.overall.to_dict(),
+            "by_workflow": {k: v.to_dict() for k, v in self.by_workflow.items()},
+            "by_node_type": {k: v.to_dict() for k, v in self.by_node_type.items()},
+            "by_date": {k: v.to_dict() for k, v in self.by_date.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyStats":
+        """从 to_dict 的结果恢复"""
+        stats = cls(compression=data.get("compression", 100.0))
+        stats.overall = TDigest.from_dict(data.get("overall", {}))
+        stats.by_workflow = {k: TDigest.from_dict(v) for k, v in data.get("by_workflow", {}).items()}
+        stats.by_node_type = {k: TDigest.from_dict(v) for k, v in data.get("by_node_type", {}).items()}
+        stats.by_date = {k: TDigest.from_dict(v) for k, v in data.get("by_date", {}).items()}
+        return stats
+
+    @classmethod
+    def header(cls) -> List[str]:
+        """报告表头"""
+        return ["维度", "分组", "样本数", "平均耗时(秒)"] + [
+            f"P{int(q * 100)}(秒)" for q in cls.QUANTILES
+        ] + ["最大耗时(秒)"]
+
+    def rows(self) -> List[List[Any]]:
+        """
+        生成报告行
+
+        Returns:
+            每行依次为 维度、分组、样本数、平均值、各分位数、最大值
+        """
+        def format_value(value: Optional[float]) -> str:
+            return f"{value:.3f}" if value is not None else ""
+
+        def build_row(dimension: str, group: str, digest: TDigest) -> List[Any]:
+            return [dimension, group, int(digest.count), format_value(digest.mean)] + [
+                format_value(digest.quantile(q)) for q in self.QUANTILES
+            ] + [format_value(digest.max)]
+
+        rows = []
+        if self.overall.count > 0:
+            rows.append(build_row(self.DIMENSION_OVERALL, "全部", self.overall))
+        for workflow_id in sorted(self.by_workflow):
+            rows.append(build_row(self.DIMENSION_WORKFLOW, workflow_id, self.by_workflow[workflow_id]))
+        for node_type in sorted(self.by_node_type):
+            rows.append(build_row(self.DIMENSION_NODE_TYPE, node_type, self.by_node_type[node_type]))
+        for date_str in sorted(self.by_date):
+            rows.append(build_row(self.DIMENSION_DATE, date_str, self.by_date[date_str]))
+        return rows
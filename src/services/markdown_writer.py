@@ -0,0 +1,274 @@
+"""Markdown 报告渲染与流式写入"""
+
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, IO, List, Optional
+
+from src.core.logger import get_logger
+from src.services.latency import LatencyStats
+from src.utils.atomic import atomic_open, atomic_write_text
+from src.utils.formatters import format_json_for_markdown, format_timestamp
+
+logger = get_logger(__name__)
+
+DETAILS_HEADING = "## 📋 日志详情"
+
+
+def render_markdown_summary(
+    meta: Dict[str, Any],
+    data_count: int,
+    status_count: Dict[str, int],
+    latency_stats: LatencyStats,
+) -> List[str]:
+    """
+    渲染报告头部和整体摘要
+
+    Args:
+        meta: 日志结果元数据（total、page、limit、has_more）
+        data_count: 日志条数
+        status_count: 各状态的日志数量
+        latency_stats: 延迟分位数统计
+
+    Returns:
+        Markdown 行列表
+    """
+    md_lines = []
+    md_lines.append("# Dify 工作流执行日志报告")
+    md_lines.append("")
+    md_lines.append(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    md_lines.append("")
+
+    # 整体摘要
+    md_lines.append("## 📊 整体摘要")
+    md_lines.append("")
+    total = meta.get("total", 0)
+    page = meta.get("page", 1)
+    limit = meta.get("limit", 20)
+    has_more = meta.get("has_more", False)
+
+    md_lines.append("| 项目 | 值 |")
+    md_lines.append("|------|-----|")
+    md_lines.append(f"| 总记录数 | {total} |")
+    md_lines.append(f"| 当前页 | {page} |")
+    md_lines.append(f"| 每页数量 | {limit} |")
+    md_lines.append(f"| 当前页记录数 | {data_count} |")
+    md_lines.append(f"| 是否有更多 | {'是' if has_more else '否'} |")
+    md_lines.append("")
+
+    # 统计信息
+    if data_count:
+        md_lines.append("### 状态统计")
+        md_lines.append("")
+        md_lines.append("| 状态 | 数量 |")
+        md_lines.append("|------|------|")
+        for status, count in sorted(status_count.items()):
+            md_lines.append(f"| {status} | {count} |")
+        md_lines.append("")
+
+        # 延迟分位数
+        latency_rows = latency_stats.rows()
+        if latency_rows:
+            header = LatencyStats.header()
+            md_lines.append("### 延迟分位数")
+            md_lines.append("")
+            md_lines.append("| " + " | ".join(header) + " |")
+            md_lines.append("|" + "|".join(["------"] * len(header)) + "|")
+            for row in latency_rows:
+                md_lines.append("| " + " | ".join(str(v) for v in row) + " |")
+            md_lines.append("")
+
+    return md_lines
+
+
+def _render_field(value: Any, max_field_chars: Optional[int]) -> str:
+    """渲染 JSON 字段，超过长度上限时截断（超出部分不再解码和格式化）"""
+    text = format_json_for_markdown(value, max_chars=max_field_chars)
+    if max_field_chars and len(text) > max_field_chars:
+        text = text[:max_field_chars] + f"\n... (已截断，超过 {max_field_chars} 字符)"
+    return text
+
+
+def render_markdown_log(i: int, log: Dict[str, Any], max_field_chars: Optional[int] = None) -> List[str]:
+    """
+    渲染单条日志的详情段落
+
+    Args:
+        i: 日志序号（从 1 开始）
+        log: 日志数据
+        max_field_chars: 输入参数 / 输出结果每个字段最多渲染的字符数（None 表示不限制）
+
+    Returns:
+        Markdown 行列表
+    """
+    md_lines = []
+    log_id = log.get("id", "N/A")
+    workflow_run = log.get("workflow_run", {})
+
+    md_lines.append(f"### {i}. 日志 ID: `{log_id}`")
+    md_lines.append("")
+    md_lines.append("#### 基本信息")
+    md_lines.append("")
+    md_lines.append("| 字段 | 值 |")
+    md_lines.append("|------|-----|")
+    md_lines.append(f"| 日志ID | `{log_id}` |")
+    md_lines.append(f"| 状态 | {workflow_run.get('status', 'N/A')} |")
+    md_lines.append(f"| 创建时间 | {format_timestamp(log.get('created_at'))} |")
+    md_lines.append(f"| 耗时 | {workflow_run.get('elapsed_time', 0):.2f} 秒 |")
+    md_lines.append("")
+
+    # 工作流运行详情
+    run_detail = log.get("workflow_run_detail")
+    if run_detail:
+        md_lines.append("#### 工作流运行详情")
+        md_lines.append("")
+        if run_detail.get("inputs"):
+            md_lines.append("##### 输入参数")
+            md_lines.append("")
+            md_lines.append("```json")
+            md_lines.append(_render_field(run_detail.get("inputs"), max_field_chars))
+            md_lines.append("```")
+            md_lines.append("")
+
+        if run_detail.get("outputs"):
+            md_lines.append("##### 输出结果")
+            md_lines.append("")
+            md_lines.append("```json")
+            md_lines.append(_render_field(run_detail.get("outputs"), max_field_chars))
+            md_lines.append("```")
+            md_lines.append("")
+
+    return md_lines
+
+
+class StreamingMarkdownWriter:
+    """
+    流式 Markdown 报告写入器
+
+    每条日志的详情段落渲染后立即写入磁盘，不在内存中拼接整份报告；
+    当前分卷超过大小上限后切换到新的分卷文件（{basename}.part001.md ...），
+    结束时写出带整体摘要的索引文件 {basename}.md。只有一个分卷时直接合并为单个文件。
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        basename: str,
+        max_part_bytes: int = 5 * 1024 * 1024,
+        max_field_chars: Optional[int] = 4000,
+    ):
+        """
+        初始化流式写入器
+
+        Args:
+            output_dir: 输出目录
+            basename: 报告文件名（不含扩展名）
+            max_part_bytes: 单个分卷的大小上限（字节）
+            max_field_chars: 每个字段最多渲染的字符数（None 表示不限制）
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.basename = basename
+        self.max_part_bytes = max_part_bytes
+        self.max_field_chars = max_field_chars
+
+        self.parts: List[Dict[str, Any]] = []
+        self._file: Optional[IO[str]] = None
+        self._part_bytes = 0
+
+    def _part_path(self, number: int) -> Path:
+        return self.output_dir / f"{self.basename}.part{number:03d}.md"
+
+    def _open_part(self, first_log: int):
+        """关闭当前分卷并打开下一个分卷（先写入临时文件，结束时再替换为正式文件名）"""
+        self._close_part()
+        path = self._part_path(len(self.parts) + 1)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        self._file = open(tmp_path, "w", encoding="utf-8")
+        self._part_bytes = 0
+        self.parts.append({"path": path, "tmp_path": tmp_path, "first_log": first_log, "last_log": first_log})
+
+    def _close_part(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write_lines(self, lines: List[str]):
+        """写入若干行（行之间、段落之间以换行分隔，与一次性 join 的结果一致）"""
+        text = "\n".join(lines)
+        if self._part_bytes:
+            text = "\n" + text
+        self._file.write(text)
+        self._part_bytes += len(text.encode("utf-8"))
+
+    def write_log(self, i: int, log: Dict[str, Any]):
+        """
+        渲染并写入一条日志
+
+        Args:
+            i: 日志序号（从 1 开始）
+            log: 日志数据
+        """
+        if self._file is None or self._part_bytes >= self.max_part_bytes:
+            self._open_part(i)
+        elif self._part_bytes:
+            self._write_lines(["---", ""])
+
+        self._write_lines(render_markdown_log(i, log, self.max_field_chars))
+        self.parts[-1]["last_log"] = i
+
+    def abort(self):
+        """放弃写入，删除已写入的分卷临时文件"""
+        self._close_part()
+        for part in self.parts:
+            try:
+                part["tmp_path"].unlink()
+            except FileNotFoundError:
+                pass
+        self.parts = []
+
+    def close(self, summary_lines: List[str]) -> List[str]:
+        """
+        结束写入并生成最终报告
+
+        Args:
+            summary_lines: 报告头部和整体摘要（render_markdown_summary 的结果）
+
+        Returns:
+            生成的报告文件路径列表（第一个为主文件）
+        """
+        self._close_part()
+        main_path = self.output_dir / f"{self.basename}.md"
+
+        if len(self.parts) <= 1:
+            # 只有一个分卷：摘要 + 详情合并为单个文件
+            with atomic_open(main_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(summary_lines + [DETAILS_HEADING, ""]))
+                if self.parts:
+                    part_path = self.parts[0]["tmp_path"]
+                    if part_path.stat().st_size:
+                        f.write("\n")
+                        with open(part_path, "r", encoding="utf-8") as part:
+                            shutil.copyfileobj(part, f)
+            if self.parts:
+                self.parts[0]["tmp_path"].unlink()
+            return [str(main_path)]
+
+        for part in self.parts:
+            os.replace(part["tmp_path"], part["path"])
+
+        index_lines = list(summary_lines)
+        index_lines.append(DETAILS_HEADING)
+        index_lines.append("")
+        index_lines.append(f"日志详情较大，已拆分为 {len(self.parts)} 个分卷：")
+        index_lines.append("")
+        for number, part in enumerate(self.parts, 1):
+            index_lines.append(
+                f"- [第 {number} 部分]({part['path'].name})：日志 {part['first_log']} - {part['last_log']}"
+            )
+        index_lines.append("")
+        atomic_write_text(main_path, "\n".join(index_lines))
+
+        logger.info(f"Markdown 报告已拆分为 {len(self.parts)} 个分卷: {main_path}")
+        return [str(main_path)] + [str(part["path"]) for part in self.parts]
@@ -0,0 +1,232 @@
+"""节点级关键路径与热点分析服务"""
+
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.log_fields import extract_node_usage
+from src.utils.tdigest import TDigest
+
+
+def build_node_timeline(node_executions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    构建一次工作流运行的节点时间线
+
+    按执行序号（index）排序，并沿 predecessor_node_id 计算每个节点的累计耗时。
+    同一个 node_id 多次执行（循环、迭代）时，后继节点关联到其最近一次执行。
+
+    Args:
+        node_executions: 节点执行详情列表
+
+    Returns:
+        时间线条目列表，每项包含 node、start（相对开始时间）、finish（相对结束时间）和 predecessor（前驱条目下标）
+    """
+    ordered = sorted(
+        node_executions,
+        key=lambda n: (n.get("index") or 0, n.get("created_at") or 0),
+    )
+
+    timeline: List[Dict[str, Any]] = []
+    last_seen: Dict[str, int] = {}
+    for node in ordered:
+        elapsed = node.get("elapsed_time") or 0.0
+        predecessor = last_seen.get(node.get("predecessor_node_id") or "")
+        start = timeline[predecessor]["finish"] if predecessor is not None else 0.0
+        timeline.append({
+            "node": node,
+            "start": start,
+            "finish": start + elapsed,
+            "predecessor": predecessor,
+        })
+        if node.get("node_id"):
+            last_seen[node["node_id"]] = len(timeline) - 1
+
+    return timeline
+
+
+def critical_path(timeline: List[Dict[str, Any]]) -> List[int]:
+    """
+    计算关键路径
+
+    Args:
+        timeline: build_node_timeline 的结果
+
+    Returns:
+        关键路径上的时间线条目下标（从起点到终点）
+    """
+    if not timeline:
+        return []
+
+    current: Optional[int] = max(range(len(timeline)), key=lambda i: timeline[i]["finish"])
+    path = []
+    while current is not None:
+        path.append(current)
+        current = timeline[current]["predecessor"]
+    path.reverse()
+    return path
+
+
+class NodeAnalytics:
+    """
+    节点热点分析
+
+    逐条累积每次运行的节点时间线，按（节点类型, 节点标题）汇总耗时、耗时占比、
+    关键路径出现次数、错误率和 Token 费用，并保留全局最慢的若干次节点执行。
+    """
+
+    def __init__(self, top_n: int = 50, compression: float = 100.0):
+        """
+        初始化节点热点分析
+
+        Args:
+            top_n: 保留的最慢节点执行数量
+            compression: 节点耗时分位数使用的 t-digest 压缩参数
+        """
+        self.top_n = top_n
+        self.compression = compression
+        self.total_run_time = 0.0
+        self.run_count = 0
+        self.node_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+
+    def _stats(self, node_type: str, title: str) -> Dict[str, Any]:
+        """获取（必要时创建）节点汇总"""
+        key = (node_type, title)
+        stats = self.node_stats.get(key)
+        if stats is None:
+            stats = {
+                "count": 0,
+                "total_elapsed": 0.0,
+                "max_elapsed": 0.0,
+                "digest": TDigest(self.compression),
+                "critical_count": 0,
+                "critical_elapsed": 0.0,
+                "error_count": 0,
+                "total_tokens": 0,
+                "total_price": 0.0,
+            }
+            self.node_stats[key] = stats
+        return stats
+
+    def add_log(self, log: Dict[str, Any]) -> None:
+        """
+        分析一条日志的节点执行
+
+        Args:
+            log: 日志数据（需包含 node_executions）
+        """
+        node_executions = log.get("node_executions") or []
+        if not node_executions:
+            return
+
+        timeline = build_node_timeline(node_executions)
+        on_critical_path = set(critical_path(timeline))
+
+        run_elapsed = (log.get("workflow_run") or {}).get("elapsed_time")
+        if not isinstance(run_elapsed, (int, float)) or run_elapsed <= 0:
+            run_elapsed = max(entry["finish"] for entry in timeline)
+        self.total_run_time += run_elapsed
+        self.run_count += 1
+
+        for i, entry in enumerate(timeline):
+            node = entry["node"]
+            node_type = node.get("node_type") or "unknown"
+            title = node.get("title") or node.get("node_id") or ""
+            elapsed = node.get("elapsed_time") or 0.0
+            tokens, price = extract_node_usage(node)
+
+            stats = self._stats(node_type, title)
+            stats["count"] += 1
+            stats["total_elapsed"] += elapsed
+            stats["max_elapsed"] = max(stats["max_elapsed"], elapsed)
+            stats["digest"].add(elapsed)
+            stats["total_tokens"] += tokens
+            stats["total_price"] += price
+            if node.get("status") not in (None, "succeeded"):
+                stats["error_count"] += 1
+            if i in on_critical_path:
+                stats["critical_count"] += 1
+                stats["critical_elapsed"] += elapsed
+
+            record = {
+                "log_id": log.get("id", ""),
+                "workflow_run_id": (log.get("workflow_run") or {}).get("id", ""),
+                "node_type": node_type,
+                "title": title,
+                "elapsed_time": elapsed,
+                "share": elapsed / run_elapsed if run_elapsed else 0.0,
+                "status": node.get("status", ""),
+                "critical": i in on_critical_path,
+            }
+            self._seq += 1
+            item = (elapsed, self._seq, record)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, item)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    @staticmethod
+    def hotspot_header() -> List[str]:
+        """节点热点表头"""
+        return [
+            "节点类型", "节点标题", "执行次数", "总耗时(秒)", "平均耗时(秒)", "P90耗时(秒)",
+            "最大耗时(秒)", "耗时占比", "关键路径次数", "关键路径耗时(秒)", "失败次数", "错误率",
+            "Token数", "费用消耗",
+        ]
+
+    def hotspot_rows(self) -> List[List[Any]]:
+        """
+        生成节点热点行（按总耗时降序）
+
+        Returns:
+            每个（节点类型, 节点标题）一行
+        """
+        rows = []
+        ranked = sorted(self.node_stats.items(), key=lambda x: x[1]["total_elapsed"], reverse=True)
+        for (node_type, title), stats in ranked:
+            count = stats["count"]
+            p90 = stats["digest"].quantile(0.9)
+            share = stats["total_elapsed"] / self.total_run_time if self.total_run_time > 0 else 0.0
+            rows.append([
+                node_type,
+                title,
+                count,
+                f"{stats['total_elapsed']:.3f}",
+                f"{stats['total_elapsed'] / count:.3f}" if count else "",
+                f"{p90:.3f}" if p90 is not None else "",
+                f"{stats['max_elapsed']:.3f}",
+                f"{share:.2%}",
+                stats["critical_count"],
+                f"{stats['critical_elapsed']:.3f}",
+                stats["error_count"],
+                f"{stats['error_count'] / count:.2%}" if count else "",
+                stats["total_tokens"],
+                f"{stats['total_price']:.6f}",
+            ])
+        return rows
+
+    @staticmethod
+    def slowest_header() -> List[str]:
+        """最慢节点执行表头"""
+        return ["日志ID", "工作流运行ID", "节点类型", "节点标题", "耗时(秒)", "占本次运行耗时", "状态", "是否关键路径"]
+
+    def slowest_rows(self) -> List[List[Any]]:
+        """
+        生成最慢节点执行行（按耗时降序）
+
+        Returns:
+            最多 top_n 行
+        """
+        rows = []
+        for _, _, record in sorted(self._slowest, key=lambda x: (x[0], -x[1]), reverse=True):
+            rows.append([
+                record["log_id"],
+                record["workflow_run_id"],
+                record["node_type"],
+                record["title"],
+                f"{record['elapsed_time']:.3f}",
+                f"{record['share']:.2%}",
+                record["status"],
+                "是" if record["critical"] else "否",
+            ])
+        return rows
@@ -0,0 +1,330 @@
+"""后台通知分发"""
+
+import atexit
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.core.logger import get_logger
+from src.services.notifier import NotificationService, create_notification_service
+
+logger = get_logger(__name__)
+
+
+class NotificationSpool:
+    """
+    跨进程共享的待发送报告通知
+
+    保存在索引目录下的 notifications.db（SQLite）中，按通知渠道区分。Prefect 部署（.serve() / Worker）
+    的每次 Flow 运行都在单独的子进程中执行，通知先写入这里，合并窗口到期后由任意一个进程认领并合并发送，
+    不同运行生成的报告也能合并为一条摘要。认领后进程异常退出时，超过 stale_after 秒的认领会被其他进程重新认领。
+    """
+
+    DB_FILENAME = "notifications.db"
+
+    def __init__(self, spool_dir: str, stale_after: float = 300.0):
+        """
+        初始化通知队列
+
+        Args:
+            spool_dir: 队列目录（同一部署的所有运行需要使用同一目录）
+            stale_after: 认领超过多少秒仍未完成时视为失效（秒）
+        """
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.spool_dir / self.DB_FILENAME
+        self.stale_after = stale_after
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                PRAGMA journal_mode = WAL;
+                CREATE TABLE IF NOT EXISTS pending_reports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    report_path TEXT NOT NULL,
+                    report_type TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    claim TEXT,
+                    claimed_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_pending_reports_channel ON pending_reports (channel, created_at);
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接（每次操作使用独立连接，分发线程和 Flow 线程可以同时访问），正常结束时提交"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, channel: str, report_path: str, report_type: str) -> int:
+        """
+        加入一条报告通知
+
+        Returns:
+            通知 ID
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO pending_reports (channel, report_path, report_type, created_at) VALUES (?, ?, ?, ?)",
+                (channel, report_path, report_type, time.time()),
+            )
+            return cursor.lastrowid
+
+    # 未认领或认领已失效的通知
+    _CLAIMABLE = "channel = ? AND (claim IS NULL OR claimed_at < ?)"
+
+    def deadline(self, channel: str, digest_window: float) -> Optional[float]:
+        """
+        渠道的合并窗口截止时间（最早一条未认领通知的时间 + 合并窗口）
+
+        Returns:
+            截止时间（time.time() 时间戳），没有待发送的通知时返回 None
+        """
+        with self._connect() as conn:
+            (oldest,) = conn.execute(
+                f"SELECT MIN(created_at) FROM pending_reports WHERE {self._CLAIMABLE}",
+                (channel, time.time() - self.stale_after),
+            ).fetchone()
+        return None if oldest is None else oldest + digest_window
+
+    def latest(self, channel: str) -> Optional[int]:
+        """渠道中最新提交的未认领通知 ID，没有待发送的通知时返回 None"""
+        with self._connect() as conn:
+            (latest,) = conn.execute(
+                f"SELECT MAX(id) FROM pending_reports WHERE {self._CLAIMABLE}",
+                (channel, time.time() - self.stale_after),
+            ).fetchone()
+        return latest
+
+    def remaining(self, ids: Set[int]) -> Set[int]:
+        """返回其中还没有发送的通知 ID"""
+        if not ids:
+            return set()
+        placeholders = ",".join("?" * len(ids))
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT id FROM pending_reports WHERE id IN ({placeholders})", tuple(ids)).fetchall()
+        return {row[0] for row in rows}
+
+    def claim(self, channel: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        认领渠道中所有待发送的通知（同一时间只有一个进程能认领到）
+
+        Returns:
+            (认领标识, 报告列表)
+        """
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE pending_reports SET claim = ?, claimed_at = ? WHERE {self._CLAIMABLE}",
+                (token, now, channel, now - self.stale_after),
+            )
+            rows = conn.execute(
+                "SELECT report_path, report_type FROM pending_reports WHERE claim = ? ORDER BY id",
+                (token,),
+            ).fetchall()
+        return token, [{"report_path": path, "report_type": report_type} for path, report_type in rows]
+
+    def complete(self, token: str):
+        """删除已发送（或放弃发送）的通知"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pending_reports WHERE claim = ?", (token,))
+
+
+class NotificationDispatcher:
+    """
+    后台通知分发器
+
+    「报告已生成」通知写入跨进程的通知队列（NotificationSpool）后立即返回，由后台线程在合并窗口到期后发送，
+    慢的邮件服务器 / Webhook 不会拖慢 Flow。窗口内（包括其他进程中的运行）的多条通知合并为一条摘要发送。
+    进程退出时不等待合并窗口：本进程提交了渠道中最新的一条通知时（之后没有其他运行再提交）立即合并发送积压的通知，
+    否则留在通知队列中，由之后提交通知的运行发送。
+    """
+
+    def __init__(
+        self,
+        service: NotificationService,
+        spool: NotificationSpool,
+        channel: str,
+        digest_window: float = 60.0,
+    ):
+        """
+        初始化分发器
+
+        Args:
+            service: 通知服务（连接在多条消息之间复用）
+            spool: 跨进程的通知队列
+            channel: 通知渠道标识（相同通知配置的运行使用同一个渠道）
+            digest_window: 报告通知的合并窗口（秒，0 表示不合并）
+        """
+        self.service = service
+        self.spool = spool
+        self.channel = channel
+        self.digest_window = max(digest_window, 0)
+        self._submitted: Set[int] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit_report_ready(self, report_path: str, report_type: str) -> bool:
+        """提交「报告已生成」通知（合并窗口内的多条通知合并发送）"""
+        if self._closed:
+            logger.warning("通知分发器已关闭，丢弃通知")
+            return False
+        try:
+            notification_id = self.spool.add(self.channel, report_path, report_type)
+        except sqlite3.Error as e:
+            logger.warning(f"写入通知队列失败，丢弃通知: {e}")
+            return False
+        with self._lock:
+            self._submitted.add(notification_id)
+        self._wakeup.set()
+        return True
+
+    def _is_last_submitter(self) -> bool:
+        """渠道中最新提交的未发送通知是否来自本进程（之后没有其他运行再提交）"""
+        with self._lock:
+            submitted = set(self._submitted)
+        latest = self.spool.latest(self.channel)
+        return latest is not None and latest in submitted
+
+    def _run(self):
+        """后台线程：到达合并窗口截止时间时发送摘要，关闭后退出"""
+        while not self._closed:
+            try:
+                deadline = self.spool.deadline(self.channel, self.digest_window)
+            except sqlite3.Error as e:
+                logger.error(f"读取通知队列失败: {e}")
+                break
+            if deadline is not None and time.time() >= deadline:
+                self._flush_reports()
+                continue
+            self._wakeup.wait(None if deadline is None else deadline - time.time())
+            self._wakeup.clear()
+
+    def _flush_reports(self):
+        """认领并发送积压的报告通知（一条直接发送，多条合并为摘要）"""
+        try:
+            token, reports = self.spool.claim(self.channel)
+        except sqlite3.Error as e:
+            logger.error(f"读取通知队列失败: {e}")
+            return
+        if not reports:
+            return
+        try:
+            if len(reports) == 1:
+                sent = self.service.notify_report_ready(reports[0]["report_path"], reports[0]["report_type"])
+            else:
+                logger.info(f"合并发送 {len(reports)} 条报告通知")
+                sent = self.service.notify_report_digest(reports)
+            if not sent:
+                logger.error(f"发送通知失败，丢弃 {len(reports)} 条报告通知")
+        except Exception as e:
+            logger.error(f"发送通知失败: {e}")
+        finally:
+            # 发送失败的通知同样删除，避免每次运行都重复发送失败
+            self.spool.complete(token)
+
+    def close(self, timeout: float = 30.0):
+        """
+        停止后台线程，把本进程提交的通知交给通知队列（不等待合并窗口）
+
+        本进程提交了渠道中最新的一条通知时立即合并发送积压的通知，否则留给之后提交通知的运行发送。
+
+        Args:
+            timeout: 等待后台线程正在进行的发送完成的最长时间（秒）
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"后台发送未能在 {timeout:g} 秒内完成，积压的通知留在通知队列中由后续运行发送")
+            return
+        try:
+            if self._is_last_submitter():
+                self._flush_reports()
+        except sqlite3.Error as e:
+            logger.error(f"读取通知队列失败: {e}")
+        finally:
+            self.service.close()
+
+
+_DISPATCHERS: Dict[Tuple[Any, ...], NotificationDispatcher] = {}
+_DISPATCHERS_LOCK = threading.Lock()
+
+
+def notification_channel(notification_type: str, **kwargs) -> str:
+    """
+    通知渠道标识（通知类型和配置的哈希，密码等配置不会以明文写入通知队列）
+
+    Args:
+        notification_type: 通知类型
+        **kwargs: 通知服务配置参数
+
+    Returns:
+        十六进制渠道标识
+    """
+    payload = repr((notification_type, sorted((k, repr(v)) for k, v in kwargs.items())))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def get_notification_dispatcher(
+    notification_type: str = "email",
+    digest_window: float = 60.0,
+    spool_dir: str = "./outputs/.index",
+    **kwargs,
+) -> Optional[NotificationDispatcher]:
+    """
+    获取（复用）通知分发器
+
+    相同配置的分发器在进程内只创建一次；不同进程（如部署的每次运行）通过 spool_dir 下的通知队列合并发送。
+
+    Args:
+        notification_type: 通知类型 (email/dingtalk/wechat)
+        digest_window: 报告通知的合并窗口（秒）
+        spool_dir: 通知队列目录（同一部署的所有运行需要使用同一目录）
+        **kwargs: 通知服务配置参数
+
+    Returns:
+        分发器，通知配置无效时返回 None
+    """
+    channel = notification_channel(notification_type, **kwargs)
+    key = (channel, digest_window, str(Path(spool_dir).resolve()))
+    with _DISPATCHERS_LOCK:
+        dispatcher = _DISPATCHERS.get(key)
+        if dispatcher is None:
+            service = create_notification_service(notification_type=notification_type, **kwargs)
+            if service is None:
+                return None
+            dispatcher = NotificationDispatcher(
+                service,
+                NotificationSpool(spool_dir),
+                channel,
+                digest_window=digest_window,
+            )
+            _DISPATCHERS[key] = dispatcher
+    return dispatcher
+
+
+@atexit.register
+def close_notification_dispatchers():
+    """把本进程提交的通知交给通知队列（进程退出时自动调用，不等待合并窗口）"""
+    with _DISPATCHERS_LOCK:
+        dispatchers = list(_DISPATCHERS.values())
+        _DISPATCHERS.clear()
+    for dispatcher in dispatchers:
+        dispatcher.close()
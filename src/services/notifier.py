@@ -1,9 +1,12 @@
 """通知服务"""
 
 import smtplib
+import threading
+import time
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from abc import ABC, abstractmethod
 import requests
 
@@ -30,6 +33,20 @@ class NotificationService(ABC):
     def notify_report_ready(self, report_path: str, report_type: str) -> bool:
         """通知报告已生成"""
         pass
+    
+    @abstractmethod
+    def notify_report_digest(self, reports: List[Dict[str, str]]) -> bool:
+        """
+        合并通知一段时间内生成的多份报告
+        
+        Args:
+            reports: 报告列表（每项包含 report_path、report_type）
+        """
+        pass
+    
+    def close(self):
+        """释放连接等资源"""
+        pass
 
 
 class EmailNotificationService(NotificationService):
@@ -42,6 +59,8 @@ class EmailNotificationService(NotificationService):
         smtp_user: str,
         smtp_password: str,
         smtp_to: str,
+        smtp_starttls: bool = True,
+        timeout: float = 30,
     ):
         """
         初始化邮件通知服务
@@ -52,15 +71,47 @@ class EmailNotificationService(NotificationService):
             smtp_user: SMTP 用户名
             smtp_password: SMTP 密码
             smtp_to: 收件人邮箱
+            smtp_starttls: 是否使用 STARTTLS
+            timeout: 连接超时（秒）
         """
         self.smtp_host = smtp_host
         self.smtp_port = smtp_port
         self.smtp_user = smtp_user
         self.smtp_password = smtp_password
         self.smtp_to = smtp_to
+        self.smtp_starttls = smtp_starttls
+        self.timeout = timeout
+        self._server: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> smtplib.SMTP:
+        """建立 SMTP 连接（STARTTLS + 登录）"""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.smtp_starttls:
+                server.starttls()
+            if self.smtp_user and self.smtp_password:
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        logger.debug(f"已连接 SMTP 服务器: {self.smtp_host}:{self.smtp_port}")
+        return server
+    
+    def _get_server(self) -> smtplib.SMTP:
+        """获取 SMTP 连接，复用已有连接（服务器已断开时重连）"""
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except smtplib.SMTPException:
+                pass
+            self.close()
+        self._server = self._connect()
+        return self._server
     
     def _send_email(self, subject: str, body: str) -> bool:
-        """发送邮件"""
+        """发送邮件（多封邮件复用同一个 SMTP 连接）"""
         try:
             msg = MIMEMultipart()
             msg["From"] = self.smtp_user
@@ -69,10 +120,13 @@ class EmailNotificationService(NotificationService):
             
             msg.attach(MIMEText(body, "plain", "utf-8"))
             
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
+            with self._lock:
+                try:
+                    self._get_server().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # 连接在检查后被服务器关闭，重连后再试一次
+                    self.close()
+                    self._get_server().send_message(msg)
             
             logger.info(f"邮件已发送: {subject}")
             return True
@@ -80,6 +134,18 @@ class EmailNotificationService(NotificationService):
             logger.error(f"发送邮件失败: {str(e)}")
             return False
     
+    def close(self):
+        """关闭 SMTP 连接"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except smtplib.SMTPException:
+            self._server.close()
+        except OSError:
+            pass
+        self._server = None
+    
     def notify_success(self, task_name: str, result: Dict[str, Any]) -> bool:
         """通知任务成功"""
         subject = f"✅ {task_name} 执行成功"
@@ -114,19 +180,47 @@ class EmailNotificationService(NotificationService):
 报告已成功生成，请查看。
         """
         return self._send_email(subject, body)
+    
+    def notify_report_digest(self, reports: List[Dict[str, str]]) -> bool:
+        """合并通知多份报告"""
+        subject = f"📊 {len(reports)} 份报告已生成"
+        lines = [
+            f"{i}. [{report['report_type']}] {report['report_path']}"
+            for i, report in enumerate(reports, 1)
+        ]
+        body = "以下报告已成功生成，请查看：\n\n" + "\n".join(lines)
+        return self._send_email(subject, body)
 
 
 class DingTalkNotificationService(NotificationService):
     """钉钉通知服务"""
     
-    def __init__(self, webhook_url: str):
+    def __init__(self, webhook_url: str, messages_per_minute: int = 20):
         """
         初始化钉钉通知服务
         
         Args:
             webhook_url: 钉钉机器人 Webhook URL
+            messages_per_minute: 每分钟最多发送的消息数（钉钉机器人限制为 20 条/分钟）
         """
         self.webhook_url = webhook_url
+        self.messages_per_minute = max(messages_per_minute, 1)
+        self.session = requests.Session()
+        self._sent_at: deque = deque()
+        self._lock = threading.Lock()
+    
+    def _wait_for_quota(self):
+        """超过每分钟消息数限制时等待（滑动窗口）"""
+        with self._lock:
+            now = time.monotonic()
+            while self._sent_at and now - self._sent_at[0] >= 60:
+                self._sent_at.popleft()
+            if len(self._sent_at) >= self.messages_per_minute:
+                delay = 60 - (now - self._sent_at[0])
+                logger.info(f"钉钉消息达到每分钟 {self.messages_per_minute} 条限制，等待 {delay:.1f} 秒")
+                time.sleep(delay)
+                self._sent_at.popleft()
+            self._sent_at.append(time.monotonic())
     
     def _send_message(self, title: str, content: str) -> bool:
         """发送钉钉消息"""
@@ -139,8 +233,16 @@ class DingTalkNotificationService(NotificationService):
                 },
             }
             
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
+            self._wait_for_quota()
+            response = self.session.post(self.webhook_url, json=payload, timeout=10)
             response.raise_for_status()
+            # 钉钉的业务错误（包括限流）以 HTTP 200 + errcode 返回
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            if body.get("errcode"):
+                raise DifyNotificationError(f"钉钉返回错误 {body['errcode']}: {body.get('errmsg')}")
             
             logger.info(f"钉钉消息已发送: {title}")
             return True
@@ -165,6 +267,19 @@ class DingTalkNotificationService(NotificationService):
         title = f"📊 {report_type} 报告已生成"
         content = f"**报告类型**: {report_type}\n\n**报告路径**: {report_path}\n\n报告已成功生成，请查看。"
         return self._send_message(title, content)
+    
+    def notify_report_digest(self, reports: List[Dict[str, str]]) -> bool:
+        """合并通知多份报告"""
+        title = f"📊 {len(reports)} 份报告已生成"
+        content = "\n".join(
+            f"{i}. **{report['report_type']}**: {report['report_path']}"
+            for i, report in enumerate(reports, 1)
+        )
+        return self._send_message(title, content + "\n\n报告已成功生成，请查看。")
+    
+    def close(self):
+        """关闭 HTTP 连接池"""
+        self.session.close()
 
 
 def create_notification_service(
@@ -190,13 +305,19 @@ def create_notification_service(
                 smtp_user=kwargs["smtp_user"],
                 smtp_password=kwargs["smtp_password"],
                 smtp_to=kwargs["smtp_to"],
+                smtp_starttls=kwargs.get("smtp_starttls", True),
             )
         else:
             logger.warning("邮件通知配置不完整，跳过通知")
             return None
     elif notification_type == "dingtalk":
-        if "webhook_url" in kwargs:
-            return DingTalkNotificationService(webhook_url=kwargs["webhook_url"])
+        # 环境变量配置中的键名为 dingtalk_webhook
+        webhook_url = kwargs.get("webhook_url") or kwargs.get("dingtalk_webhook")
+        if webhook_url:
+            return DingTalkNotificationService(
+                webhook_url=webhook_url,
+                messages_per_minute=kwargs.get("messages_per_minute") or 20,
+            )
         else:
             logger.warning("钉钉通知配置不完整，跳过通知")
             return None
@@ -0,0 +1,411 @@
+"""报告输出插件（Report Sink）"""
+
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, List, Optional, Type, Union
+
+from src.core.logger import get_logger
+from src.services.latency import LatencyStats
+from src.services.markdown_writer import StreamingMarkdownWriter, render_markdown_summary
+from src.services.reporter import CsvReportBuilder, ReportGenerator
+from src.services.retrieval_index import RetrievalHitIndex
+from src.services.session_index import SessionIndex
+from src.services.storage import LocalStorageService, StorageService
+from src.services.webhook_sender import WebhookBatchSender
+from src.utils import jsoncodec
+from src.utils.fingerprint import ReportFingerprint, compute_logs_fingerprint
+
+logger = get_logger(__name__)
+
+
+class ReportSink(ABC):
+    """
+    报告输出插件基类
+
+    报告阶段只遍历一次日志：每个 Sink 依次收到 open(元数据) → write(每条日志) → close(元数据)，
+    多种输出格式共享同一次遍历，新增格式不会增加 API 调用。open 之后出现异常时调用 abort 代替 close。
+    """
+
+    def __init__(self, output_dir: str, **options: Any):
+        """
+        初始化输出插件
+
+        Args:
+            output_dir: 输出目录
+            **options: 插件配置参数（storage 存储服务、compression 压缩策略，以及各插件自己的配置）
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.options = options
+        # 报告文件通过存储服务写入，默认直接写到输出目录
+        self.storage: StorageService = options.get("storage") or LocalStorageService(
+            str(self.output_dir), compression=options.get("compression"), manifest=False
+        )
+
+    def open(self, meta: Dict[str, Any]) -> None:
+        """
+        开始输出
+
+        Args:
+            meta: 日志结果元数据（total、page、limit、has_more 等，不含 data）
+        """
+        pass
+
+    @abstractmethod
+    def write(self, idx: int, log: Dict[str, Any]) -> None:
+        """
+        输出一条日志
+
+        Args:
+            idx: 日志序号（从 1 开始）
+            log: 日志数据
+        """
+        pass
+
+    @abstractmethod
+    def close(self, meta: Dict[str, Any]) -> List[str]:
+        """
+        结束输出
+
+        Args:
+            meta: 日志结果元数据
+
+        Returns:
+            生成的报告文件路径列表
+        """
+        pass
+
+    def abort(self) -> None:
+        """放弃输出（open 之后出现异常时调用），删除未完成的文件、释放资源"""
+        pass
+
+
+_SINK_REGISTRY: Dict[str, Type[ReportSink]] = {}
+
+
+def register_report_sink(name: str) -> Callable[[Type[ReportSink]], Type[ReportSink]]:
+    """
+    注册输出插件的装饰器
+
+    Args:
+        name: 输出格式名称（即 output_format 中使用的名称）
+    """
+    def decorator(cls: Type[ReportSink]) -> Type[ReportSink]:
+        _SINK_REGISTRY[name] = cls
+        return cls
+    return decorator
+
+
+def available_report_sinks() -> List[str]:
+    """已注册的输出格式"""
+    return sorted(_SINK_REGISTRY)
+
+
+def create_report_sink(name: str, output_dir: str, **options: Any) -> Optional[ReportSink]:
+    """
+    创建输出插件实例
+
+    Args:
+        name: 输出格式名称
+        output_dir: 输出目录
+        **options: 插件配置参数
+
+    Returns:
+        输出插件实例，不支持的格式返回 None
+    """
+    sink_cls = _SINK_REGISTRY.get(name)
+    if sink_cls is None:
+        logger.warning(f"不支持的输出格式: {name}（可选: {', '.join(available_report_sinks())}）")
+        return None
+    return sink_cls(output_dir, **options)
+
+
+def normalize_output_formats(output_format: Union[str, List[str], None]) -> List[str]:
+    """
+    规范化输出格式参数
+
+    Args:
+        output_format: 单个格式、逗号分隔的字符串或格式列表
+
+    Returns:
+        去重后的格式列表（保持顺序）
+    """
+    if not output_format:
+        return []
+    if isinstance(output_format, str):
+        output_format = output_format.split(",")
+
+    formats = []
+    for fmt in output_format:
+        fmt = fmt.strip().lower()
+        if fmt and fmt not in formats:
+            formats.append(fmt)
+    return formats
+
+
+@register_report_sink("csv")
+class CsvReportSink(ReportSink):
+    """CSV 报告输出（options: index_dir 本地索引目录）"""
+
+    def open(self, meta: Dict[str, Any]) -> None:
+        self.builder = CsvReportBuilder()
+
+    def write(self, idx: int, log: Dict[str, Any]) -> None:
+        self.builder.add_log(idx, log)
+
+    def close(self, meta: Dict[str, Any]) -> List[str]:
+        index_dir = self.options.get("index_dir")
+        if not index_dir:
+            return self.builder.write(self.storage)
+
+        with SessionIndex(index_dir) as session_index:
+            report_files = self.builder.write(self.storage, session_index=session_index)
+
+        # 文档引用统计直接从检索命中索引生成，不需要重新读取全部日志
+        if report_files and RetrievalHitIndex.exists(index_dir):
+            with RetrievalHitIndex(index_dir) as hit_index:
+                reporter = ReportGenerator(output_dir=str(self.output_dir), storage=self.storage)
+                report_files.append(reporter.generate_document_usage_report(hit_index))
+        return report_files
+
+
+@register_report_sink("markdown")
+class MarkdownReportSink(ReportSink):
+    """
+    Markdown 报告输出
+
+    options:
+        max_part_bytes: 单个分卷的大小上限（字节），超过后拆分为多个文件并生成索引
+        max_field_chars: 输入参数 / 输出结果每个字段最多渲染的字符数（None 表示不限制）
+    """
+
+    def open(self, meta: Dict[str, Any]) -> None:
+        self.status_count: Dict[str, int] = {}
+        self.latency_stats = LatencyStats()
+        self.log_count = 0
+        self.writer = StreamingMarkdownWriter(
+            str(self.output_dir),
+            f"logs_report_{meta.get('total', 0)}",
+            max_part_bytes=self.options.get("max_part_bytes", 5 * 1024 * 1024),
+            max_field_chars=self.options.get("max_field_chars", 4000),
+        )
+
+    def write(self, idx: int, log: Dict[str, Any]) -> None:
+        status = log.get("workflow_run", {}).get("status", "unknown")
+        self.status_count[status] = self.status_count.get(status, 0) + 1
+        self.latency_stats.add_log(log)
+        self.log_count += 1
+        self.writer.write_log(idx, log)
+
+    def close(self, meta: Dict[str, Any]) -> List[str]:
+        summary_lines = render_markdown_summary(meta, self.log_count, self.status_count, self.latency_stats)
+        return self.writer.close(summary_lines)
+
+    def abort(self) -> None:
+        self.writer.abort()
+
+
+@register_report_sink("json")
+class JsonReportSink(ReportSink):
+    """JSON 数据输出"""
+
+    def open(self, meta: Dict[str, Any]) -> None:
+        self.logs: List[Dict[str, Any]] = []
+
+    def write(self, idx: int, log: Dict[str, Any]) -> None:
+        self.logs.append(log)
+
+    def close(self, meta: Dict[str, Any]) -> List[str]:
+        with self.storage.open_writer(f"logs_data_{meta.get('total', 0)}.json", "export") as writer:
+            writer.write(jsoncodec.dumps_bytes({**meta, "data": self.logs}, indent=2))
+        return [writer.path]
+
+
+@register_report_sink("ndjson")
+class NdjsonReportSink(ReportSink):
+    """
+    NDJSON 数据输出
+
+    每条日志序列化为一行，收到即写入存储，内存占用与日志数量无关；
+    总数等元数据写入单独的 logs_data_{总数}.ndjson.meta.json。
+    """
+
+    format_name = "ndjson"
+    # None 表示按 export 类型的压缩策略
+    compression: Optional[str] = None
+
+    def open(self, meta: Dict[str, Any]) -> None:
+        self.writer = self.storage.open_writer(
+            f"logs_data_{meta.get('total', 0)}.ndjson",
+            "export",
+            compression=self.compression,
+            compression_level=self.options.get("compresslevel"),
+        )
+        self.record_count = 0
+
+    def write(self, idx: int, log: Dict[str, Any]) -> None:
+        self.writer.write(jsoncodec.dumps_bytes(log) + b"\n")
+        self.record_count += 1
+
+    def close(self, meta: Dict[str, Any]) -> List[str]:
+        self.writer.commit()
+        data_name = PurePosixPath(self.writer.path.replace("\\", "/")).name
+
+        summary = {key: value for key, value in meta.items() if key != "data"}
+        summary.update({
+            "format": self.format_name,
+            "compression": self.writer.codec,
+            "data_file": data_name,
+            "record_count": self.record_count,
+        })
+        with self.storage.open_writer(f"{data_name}.meta.json", "export", compression="none") as meta_writer:
+            meta_writer.write(jsoncodec.dumps_bytes(summary, indent=2))
+        return [self.writer.path, meta_writer.path]
+
+    def abort(self) -> None:
+        self.writer.abort()
+
+
+@register_report_sink("ndjson.gz")
+class GzipNdjsonReportSink(NdjsonReportSink):
+    """gzip 压缩的 NDJSON 数据输出（options: compresslevel 压缩级别，默认 6）"""
+
+    format_name = "ndjson.gz"
+    compression = "gzip"
+
+
+@register_report_sink("webhook")
+class WebhookReportSink(ReportSink):
+    """
+    HTTP Webhook 输出：把日志按批次（gzip 压缩的 NDJSON）推送到下游接口，不生成本地报告文件
+
+    options:
+        url: 目标地址（未提供时使用环境变量 REPORT_WEBHOOK_URL）
+        headers: 额外的请求头（如 {"Authorization": "Bearer ..."}）
+        batch_max_records / batch_max_bytes: 批次条数和字节数（压缩前）
+        max_in_flight: 同时在途的批次数
+        max_retries: 每个批次最多重试次数
+        spool_path: 死信文件（默认 output_dir/webhook_deadletter.ndjson）
+    """
+
+    SENDER_OPTIONS = (
+        "headers", "batch_max_records", "batch_max_bytes",
+        "max_in_flight", "max_retries", "retry_max_wait", "timeout", "compresslevel",
+    )
+
+    def open(self, meta: Dict[str, Any]) -> None:
+        url = self.options.get("url") or os.getenv("REPORT_WEBHOOK_URL")
+        if not url:
+            raise ValueError("webhook 输出需要配置 url（sink_options 或环境变量 REPORT_WEBHOOK_URL）")
+        self.spool_path = Path(self.options.get("spool_path") or self.output_dir / "webhook_deadletter.ndjson")
+        self.sender = WebhookBatchSender(
+            url,
+            spool_path=str(self.spool_path),
+            **{key: self.options[key] for key in self.SENDER_OPTIONS if key in self.options},
+        )
+
+    def write(self, idx: int, log: Dict[str, Any]) -> None:
+        log_id = log.get("id")
+        self.sender.add(jsoncodec.dumps_bytes(log), record_id=str(log_id) if log_id else None)
+
+    def close(self, meta: Dict[str, Any]) -> List[str]:
+        stats = self.sender.close()
+        logger.info(
+            f"Webhook 推送完成: {stats['records']} 条记录（{stats['batches']} 个批次），"
+            f"失败 {stats['failed_records']} 条"
+        )
+        # 只有推送失败时返回死信文件，便于排查和重新推送
+        return [str(self.spool_path)] if stats["failed_records"] else []
+
+    def abort(self) -> None:
+        self.sender.abort()
+
+
+def generate_reports(
+    logs_result: Dict[str, Any],
+    output_dir: str,
+    output_format: Union[str, List[str]] = "csv",
+    index_dir: Optional[str] = None,
+    sink_options: Optional[Dict[str, Dict[str, Any]]] = None,
+    compression: Union[str, Dict[str, str], None] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    生成报告
+
+    所有输出格式共享同一次日志遍历：每条日志依次交给各个输出插件（Report Sink）。
+    输入（日志 ID、状态、详情哈希和输出参数）与上次生成时一致且报告文件都还在时，直接跳过生成。
+
+    Args:
+        logs_result: 日志数据结果
+        output_dir: 输出目录
+        output_format: 输出格式 (csv/markdown/json/ndjson/ndjson.gz/webhook)，可以是列表或逗号分隔的字符串
+        index_dir: 本地索引目录（用于跨运行的问题排序，存在检索命中索引时生成文档引用统计）
+        sink_options: 各输出格式的额外配置，如 {"csv": {...}}
+        compression: 压缩策略（产物类型 → none/gzip/zstd，如 "report=gzip,export=zstd"）
+        force: 忽略输入指纹，强制重新生成
+
+    Returns:
+        报告生成结果
+    """
+    formats = normalize_output_formats(output_format)
+    logs = logs_result.get("data", [])
+
+    fingerprint = compute_logs_fingerprint(
+        logs_result, formats=formats, index_dir=index_dir, sink_options=sink_options, compression=compression
+    )
+    report_fingerprint = ReportFingerprint(output_dir)
+    if not force:
+        report_files = report_fingerprint.unchanged_reports(fingerprint)
+        if report_files is not None:
+            logger.info(f"输入与上次生成时一致，跳过报告生成（{len(report_files)} 个报告文件）")
+            return {
+                "report_files": report_files,
+                "report_count": len(report_files),
+                "logs_count": len(logs),
+                "skipped": True,
+            }
+
+    logger.info(f"开始生成 {', '.join(formats)} 报告")
+
+    sinks = []
+    for fmt in formats:
+        options = {"index_dir": index_dir, "compression": compression}
+        options.update((sink_options or {}).get(fmt, {}))
+        sink = create_report_sink(fmt, output_dir, **options)
+        if sink:
+            sinks.append(sink)
+
+    # 元数据中保留 data 占位，使各输出格式重建结果时字段顺序与原始结果一致
+    meta = {key: (None if key == "data" else value) for key, value in logs_result.items()}
+
+    # 已经 open 且还没有成功 close 的输出，出现异常时逐个 abort，不留下未完成的文件和后台线程
+    pending: List[ReportSink] = []
+    report_files = []
+    try:
+        for sink in sinks:
+            sink.open(meta)
+            pending.append(sink)
+        for idx, log in enumerate(logs, 1):
+            for sink in sinks:
+                sink.write(idx, log)
+        while pending:
+            report_files.extend(pending[0].close(meta))
+            pending.pop(0)
+    finally:
+        for sink in pending:
+            try:
+                sink.abort()
+            except Exception as e:
+                logger.warning(f"放弃 {type(sink).__name__} 输出失败: {e}")
+
+    report_fingerprint.save(fingerprint, report_files)
+    logger.info(f"成功生成 {len(report_files)} 个报告文件")
+
+    return {
+        "report_files": report_files,
+        "report_count": len(report_files),
+        "logs_count": len(logs),
+        "skipped": False,
+    }
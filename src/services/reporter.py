@@ -1,205 +1,248 @@
 """报告生成服务"""
 
 import csv
-import json
 import os
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from src.core.logger import get_logger
+from src.services.latency import LatencyStats
+from src.services.markdown_writer import DETAILS_HEADING, render_markdown_log, render_markdown_summary
+from src.services.node_analytics import NodeAnalytics
+from src.services.retrieval_index import RetrievalHitIndex
+from src.services.segment_store import SegmentRef, SegmentStore
+from src.services.session_index import SessionIndex
+from src.services.storage import LocalStorageService, StorageService
+from src.utils import jsoncodec
 from src.utils.formatters import format_timestamp
+from src.utils.log_fields import iter_retrieval_hits
 
 logger = get_logger(__name__)
 
 
-class ReportGenerator:
-    """报告生成器"""
+class CsvReportBuilder:
+    """
+    CSV 报告构建器
+    
+    逐条累积日志的统计数据，全部日志处理完后再写出 CSV 报告，
+    使 CSV 报告可以和其他输出格式共享同一次日志遍历。
+    """
+    
+    def __init__(self):
+        """初始化 CSV 报告构建器"""
+        self.qa_pairs = []
+        self.user_stats = defaultdict(lambda: {
+            "message_count": 0,
+            "first_date": None,
+            "last_date": None,
+            "dates": set()
+        })
+        self.daily_stats = defaultdict(int)
+        self.total_tokens = 0
+        self.total_cost = 0.0
+        self.session_ids = set()
+        self.session_qa_map = defaultdict(list)
+        self.latency_stats = LatencyStats()
+        self.node_analytics = NodeAnalytics()
+        self.segment_store = SegmentStore()
+        # 总览统计
+        self.message_count = 0
+        self.first_created_at = None
+        self.last_created_at = None
+        self.total_time = 0
     
-    def __init__(self, output_dir: str):
+    def add_log(self, idx: int, log: Dict[str, Any]) -> None:
         """
-        初始化报告生成器
+        累积一条日志
         
         Args:
-            output_dir: 输出目录
-        """
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-    
-    def generate_csv_reports(self, result: Dict[str, Any]) -> List[str]:
+            idx: 日志序号（从 1 开始）
+            log: 日志数据
         """
-        生成 CSV 报告文件
+        qa_pairs = self.qa_pairs
+        user_stats = self.user_stats
+        session_ids = self.session_ids
+        session_qa_map = self.session_qa_map
+        daily_stats = self.daily_stats
+        segment_store = self.segment_store
         
-        Args:
-            result: 日志数据结果
+        # 总览统计
+        self.message_count += 1
+        if log.get("created_at"):
+            if self.first_created_at is None or log["created_at"] < self.first_created_at:
+                self.first_created_at = log["created_at"]
+            if self.last_created_at is None or log["created_at"] > self.last_created_at:
+                self.last_created_at = log["created_at"]
+        elapsed_time = log.get("workflow_run", {}).get("elapsed_time")
+        if elapsed_time:
+            self.total_time += elapsed_time
         
-        Returns:
-            生成的报告文件路径列表
-        """
-        logs = result.get("data", [])
-        if not logs:
-            logger.warning("没有日志数据，无法生成 CSV 报告")
-            return []
+        self.latency_stats.add_log(log)
+        self.node_analytics.add_log(log)
+        workflow_run = log.get("workflow_run", {})
+        run_detail = log.get("workflow_run_detail", {})
+        node_executions = log.get("node_executions", [])
         
-        # 提取数据
-        qa_pairs = []
-        user_stats = defaultdict(lambda: {
-            "message_count": 0,
-            "first_date": None,
-            "last_date": None,
-            "dates": set()
-        })
-        daily_stats = defaultdict(int)
-        total_tokens = 0
-        total_cost = 0.0
-        session_ids = set()
-        session_qa_map = defaultdict(list)
+        # 获取基本信息
+        created_at = log.get("created_at")
+        if created_at:
+            date_str = format_timestamp(created_at).split()[0]
+            daily_stats[date_str] += 1
         
-        # 处理每条日志
-        for idx, log in enumerate(logs, 1):
-            workflow_run = log.get("workflow_run", {})
-            run_detail = log.get("workflow_run_detail", {})
-            node_executions = log.get("node_executions", [])
-            
-            # 获取基本信息
-            created_at = log.get("created_at")
-            if created_at:
-                date_str = format_timestamp(created_at).split()[0]
-                daily_stats[date_str] += 1
-            
-            # 获取用户ID
-            user_id = None
-            created_by_account = log.get("created_by_account", {})
-            created_by_end_user = log.get("created_by_end_user", {})
-            if created_by_end_user:
-                user_id = created_by_end_user.get("session_id")
-            elif created_by_account:
-                user_id = created_by_account.get("email")
-            
-            if not user_id and run_detail:
-                inputs = run_detail.get("inputs", {})
-                if isinstance(inputs, str):
-                    try:
-                        inputs = json.loads(inputs)
-                    except (json.JSONDecodeError, TypeError):
-                        inputs = {}
-                elif not isinstance(inputs, dict):
+        # 获取用户ID
+        user_id = None
+        created_by_account = log.get("created_by_account", {})
+        created_by_end_user = log.get("created_by_end_user", {})
+        if created_by_end_user:
+            user_id = created_by_end_user.get("session_id")
+        elif created_by_account:
+            user_id = created_by_account.get("email")
+        
+        if not user_id and run_detail:
+            inputs = run_detail.get("inputs", {})
+            if isinstance(inputs, str):
+                try:
+                    inputs = jsoncodec.loads(inputs)
+                except (jsoncodec.JSONDecodeError, TypeError):
+                    inputs = {}
+            elif not isinstance(inputs, dict):
+                inputs = {}
+            user_id = inputs.get("sys.user_id") or inputs.get("sys", {}).get("user_id")
+        
+        # 获取会话ID
+        session_id = workflow_run.get("id") or log.get("id")
+        if session_id:
+            session_ids.add(session_id)
+        
+        # 获取用户提问和AI回答
+        user_query = ""
+        ai_answer = ""
+        attachments = []
+        # 不使用去重，直接按顺序存储所有查到的内容（包括重复）
+        # 每个片段都单独记录，保持原始顺序
+        segments_list = []  # 存储所有片段，格式: (知识库名称, 文档名称, 片段引用)
+        
+        if run_detail:
+            # 处理 inputs
+            inputs = run_detail.get("inputs", {})
+            if isinstance(inputs, str):
+                try:
+                    inputs = jsoncodec.loads(inputs)
+                except (jsoncodec.JSONDecodeError, TypeError):
                     inputs = {}
-                user_id = inputs.get("sys.user_id") or inputs.get("sys", {}).get("user_id")
+            elif not isinstance(inputs, dict):
+                inputs = {}
             
-            # 获取会话ID
-            session_id = workflow_run.get("id") or log.get("id")
-            if session_id:
-                session_ids.add(session_id)
+            # 处理 outputs
+            outputs = run_detail.get("outputs", {})
+            if isinstance(outputs, str):
+                try:
+                    outputs = jsoncodec.loads(outputs)
+                except (jsoncodec.JSONDecodeError, TypeError):
+                    outputs = {}
+            elif not isinstance(outputs, dict):
+                outputs = {}
             
-            # 获取用户提问和AI回答
-            user_query = ""
-            ai_answer = ""
-            attachments = []
-            # 不使用去重，直接按顺序存储所有查到的内容（包括重复）
-            # 每个片段都单独记录，保持原始顺序
-            segments_list = []  # 存储所有片段，格式: (知识库名称, 文档名称, 片段内容, 相似度)
+            user_query = inputs.get("query") or inputs.get("sys.query", "") or ""
+            ai_answer = outputs.get("text", "") or ""
             
-            if run_detail:
-                # 处理 inputs
-                inputs = run_detail.get("inputs", {})
-                if isinstance(inputs, str):
-                    try:
-                        inputs = json.loads(inputs)
-                    except (json.JSONDecodeError, TypeError):
-                        inputs = {}
-                elif not isinstance(inputs, dict):
-                    inputs = {}
-                
-                # 处理 outputs
-                outputs = run_detail.get("outputs", {})
-                if isinstance(outputs, str):
-                    try:
-                        outputs = json.loads(outputs)
-                    except (json.JSONDecodeError, TypeError):
-                        outputs = {}
-                elif not isinstance(outputs, dict):
-                    outputs = {}
-                
-                user_query = inputs.get("query") or inputs.get("sys.query", "") or ""
-                ai_answer = outputs.get("text", "") or ""
+            files = inputs.get("sys.files", []) or inputs.get("sys", {}).get("files", [])
+            if files:
+                attachments = [f.get("name", "") or f.get("filename", "") for f in files if isinstance(f, dict)]
+        
+        # 从节点执行详情中获取知识库信息（片段内容只在 segment_store 中保存一份）
+        for position, item in enumerate(iter_retrieval_hits(node_executions)):
+            metadata = item.get("metadata", {})
+            if metadata:
+                dataset_name = metadata.get("dataset_name", "")
+                document_name = metadata.get("document_name", "")
+                content = item.get("content", "")
                 
-                files = inputs.get("sys.files", []) or inputs.get("sys", {}).get("files", [])
-                if files:
-                    attachments = [f.get("name", "") or f.get("filename", "") for f in files if isinstance(f, dict)]
-            
-            # 从节点执行详情中获取知识库信息
+                # 不去重，直接记录所有查到的内容（包括重复）
+                if dataset_name and document_name and content:
+                    clean_dataset = dataset_name.replace("...", "").strip()
+                    clean_document = document_name.replace("...", "").strip()
+                    
+                    # 问答行只保存片段引用（片段ID + 相似度 + 位置），写 CSV 时再展开
+                    segment_ref = segment_store.add(item, position)
+                    
+                    # 直接追加，不去重
+                    segments_list.append((clean_dataset, clean_document, segment_ref))
+        
+        # 统计用户信息
+        if user_id:
+            user_stats[user_id]["message_count"] += 1
+            if created_at:
+                date_obj = datetime.fromtimestamp(created_at)
+                if not user_stats[user_id]["first_date"] or date_obj < user_stats[user_id]["first_date"]:
+                    user_stats[user_id]["first_date"] = date_obj
+                if not user_stats[user_id]["last_date"] or date_obj > user_stats[user_id]["last_date"]:
+                    user_stats[user_id]["last_date"] = date_obj
+                user_stats[user_id]["dates"].add(date_obj.date())
+        
+        # 统计Token和费用
+        if run_detail:
+            self.total_tokens += run_detail.get("total_tokens", 0) or 0
             for node in node_executions:
-                if node.get("node_type") == "knowledge-retrieval":
-                    node_outputs = node.get("outputs", {})
-                    if isinstance(node_outputs, str):
+                if node.get("node_type") == "llm":
+                    process_data = node.get("process_data", {})
+                    if isinstance(process_data, str):
                         try:
-                            node_outputs = json.loads(node_outputs)
+                            process_data = jsoncodec.loads(process_data)
                         except:
                             continue
-                    
-                    result_list = node_outputs.get("result", [])
-                    if result_list:
-                        for item in result_list:
-                            metadata = item.get("metadata", {})
-                            if metadata:
-                                dataset_name = metadata.get("dataset_name", "")
-                                document_name = metadata.get("document_name", "")
-                                content = item.get("content", "")
-                                score = metadata.get("score", 0)
-                                
-                                # 不去重，直接记录所有查到的内容（包括重复）
-                                if dataset_name and document_name and content:
-                                    clean_dataset = dataset_name.replace("...", "").strip()
-                                    clean_document = document_name.replace("...", "").strip()
-                                    
-                                    # 相似度和文本内容换行显示
-                                    segment_text = f"相似度:{score:.4f}\n{content[:200]}"
-                                    
-                                    # 直接追加，不去重
-                                    segments_list.append((clean_dataset, clean_document, segment_text))
-            
-            # 统计用户信息
-            if user_id:
-                user_stats[user_id]["message_count"] += 1
-                if created_at:
-                    date_obj = datetime.fromtimestamp(created_at)
-                    if not user_stats[user_id]["first_date"] or date_obj < user_stats[user_id]["first_date"]:
-                        user_stats[user_id]["first_date"] = date_obj
-                    if not user_stats[user_id]["last_date"] or date_obj > user_stats[user_id]["last_date"]:
-                        user_stats[user_id]["last_date"] = date_obj
-                    user_stats[user_id]["dates"].add(date_obj.date())
-            
-            # 统计Token和费用
-            if run_detail:
-                total_tokens += run_detail.get("total_tokens", 0) or 0
-                for node in node_executions:
-                    if node.get("node_type") == "llm":
-                        process_data = node.get("process_data", {})
-                        if isinstance(process_data, str):
+                    if not isinstance(process_data, dict):
+                        continue
+                    usage = process_data.get("usage", {})
+                    if usage and isinstance(usage, dict):
+                        price = usage.get("total_price", 0)
+                        if isinstance(price, str):
                             try:
-                                process_data = json.loads(process_data)
-                            except:
-                                continue
-                        if not isinstance(process_data, dict):
-                            continue
-                        usage = process_data.get("usage", {})
-                        if usage and isinstance(usage, dict):
-                            price = usage.get("total_price", 0)
-                            if isinstance(price, str):
-                                try:
-                                    price = float(price)
-                                except (ValueError, TypeError):
-                                    price = 0
-                            elif not isinstance(price, (int, float)):
+                                price = float(price)
+                            except (ValueError, TypeError):
                                 price = 0
-                            total_cost += price
+                        elif not isinstance(price, (int, float)):
+                            price = 0
+                        self.total_cost += price
+        
+        # 构建问答对：按知识库和文档组合展开为多行
+        # 不去重，直接按查到的内容显示（包括重复）
+        if not segments_list:
+            # 没有知识库的情况，生成一行空数据
+            qa_data = {
+                "序号": idx,
+                "用户id": user_id or "",
+                "会话id": session_id or "",
+                "问题排序": 1,
+                "用户提问": user_query,
+                "附件名称": "; ".join(attachments) if attachments else "",
+                "AI回答": ai_answer[:5000] if len(ai_answer) > 5000 else ai_answer,
+                "知识库名称": "",
+                "引用的文档名称": "",
+                "创建时间": format_timestamp(created_at) if created_at else "",
+                "created_at": created_at,
+                "log_id": log.get("id") or f"#{idx}",
+            }
+            if session_id:
+                session_qa_map[session_id].append(qa_data)
+            else:
+                qa_pairs.append(qa_data)
+        else:
+            # 按知识库和文档组合分组（但不去重，每个组合可能有多个片段）
+            # 使用字典按 (知识库, 文档) 分组，但保留所有片段（包括重复）
+            kb_doc_segments = {}  # {(知识库, 文档): [片段列表]}
+            
+            for kb_name, doc_name, segment_ref in segments_list:
+                kb_doc_key = (kb_name, doc_name)
+                if kb_doc_key not in kb_doc_segments:
+                    kb_doc_segments[kb_doc_key] = []
+                kb_doc_segments[kb_doc_key].append(segment_ref)
             
-            # 构建问答对：按知识库和文档组合展开为多行
-            # 不去重，直接按查到的内容显示（包括重复）
-            if not segments_list:
-                # 没有知识库的情况，生成一行空数据
+            # 为每个知识库-文档组合创建一行
+            for (kb_name, doc_name), doc_segments in kb_doc_segments.items():
+                # 动态生成文本片段列（每个片段一列）
                 qa_data = {
                     "序号": idx,
                     "用户id": user_id or "",
@@ -208,56 +251,72 @@ class ReportGenerator:
                     "用户提问": user_query,
                     "附件名称": "; ".join(attachments) if attachments else "",
                     "AI回答": ai_answer[:5000] if len(ai_answer) > 5000 else ai_answer,
-                    "知识库名称": "",
-                    "引用的文档名称": "",
+                    "知识库名称": kb_name,
+                    "引用的文档名称": doc_name,
                     "创建时间": format_timestamp(created_at) if created_at else "",
                     "created_at": created_at,
+                    "log_id": log.get("id") or f"#{idx}",
                 }
+                
+                # 动态添加文本片段列（每个片段一列，不去重）
+                for i, segment in enumerate(doc_segments, 1):
+                    qa_data[f"文本片段内容{i}"] = segment
+                
                 if session_id:
                     session_qa_map[session_id].append(qa_data)
                 else:
                     qa_pairs.append(qa_data)
-            else:
-                # 按知识库和文档组合分组（但不去重，每个组合可能有多个片段）
-                # 使用字典按 (知识库, 文档) 分组，但保留所有片段（包括重复）
-                kb_doc_segments = {}  # {(知识库, 文档): [片段列表]}
-                
-                for kb_name, doc_name, segment_text in segments_list:
-                    kb_doc_key = (kb_name, doc_name)
-                    if kb_doc_key not in kb_doc_segments:
-                        kb_doc_segments[kb_doc_key] = []
-                    kb_doc_segments[kb_doc_key].append(segment_text)
-                
-                # 为每个知识库-文档组合创建一行
-                for (kb_name, doc_name), doc_segments in kb_doc_segments.items():
-                    # 动态生成文本片段列（每个片段一列）
-                    qa_data = {
-                        "序号": idx,
-                        "用户id": user_id or "",
-                        "会话id": session_id or "",
-                        "问题排序": 1,
-                        "用户提问": user_query,
-                        "附件名称": "; ".join(attachments) if attachments else "",
-                        "AI回答": ai_answer[:5000] if len(ai_answer) > 5000 else ai_answer,
-                        "知识库名称": kb_name,
-                        "引用的文档名称": doc_name,
-                        "创建时间": format_timestamp(created_at) if created_at else "",
-                        "created_at": created_at,
-                    }
-                    
-                    # 动态添加文本片段列（每个片段一列，不去重）
-                    for i, segment in enumerate(doc_segments, 1):
-                        qa_data[f"文本片段内容{i}"] = segment
-                    
-                    if session_id:
-                        session_qa_map[session_id].append(qa_data)
-                    else:
-                        qa_pairs.append(qa_data)
+    
+    
+    def write(self, storage: StorageService, session_index: Optional[SessionIndex] = None) -> List[str]:
+        """
+        写出 CSV 报告文件（会整理累积的问答对，每个构建器只能写出一次）
+        
+        Args:
+            storage: 存储服务（报告按 report 类型的压缩策略流式写入）
+            session_index: 会话索引（提供时问题排序跨运行窗口连续计算）
+        
+        Returns:
+            生成的报告文件路径列表
+        """
+        if not self.message_count:
+            logger.warning("没有日志数据，无法生成 CSV 报告")
+            return []
+        
+        qa_pairs = self.qa_pairs
+        user_stats = self.user_stats
+        session_ids = self.session_ids
+        session_qa_map = self.session_qa_map
+        daily_stats = self.daily_stats
+        total_tokens = self.total_tokens
+        total_cost = self.total_cost
+        latency_stats = self.latency_stats
+        node_analytics = self.node_analytics
+        segment_store = self.segment_store
         
         # 按会话ID分组，计算问题排序
+        base_orders = {}
+        if session_index is not None:
+            # 每条日志在会话中的起始排序由会话索引给出，覆盖本次窗口之前的历史消息
+            session_entries = {}
+            for session_id, session_qas in session_qa_map.items():
+                row_counts = {}
+                for qa in session_qas:
+                    key = (qa.get("created_at") or 0, qa["log_id"])
+                    row_counts[key] = row_counts.get(key, 0) + 1
+                session_entries[session_id] = [
+                    (created_at, log_id, count) for (created_at, log_id), count in row_counts.items()
+                ]
+            base_orders = session_index.assign_orders(session_entries)
+        
         for session_id, session_qas in session_qa_map.items():
             session_qas.sort(key=lambda x: x.get("created_at") or 0)
+            log_offsets = defaultdict(int)
             for order, qa in enumerate(session_qas, 1):
+                log_id = qa.pop("log_id")
+                if base_orders:
+                    order = base_orders[(session_id, log_id)] + log_offsets[log_id]
+                    log_offsets[log_id] += 1
                 qa["问题排序"] = order
                 qa.pop("created_at", None)
                 qa_pairs.append(qa)
@@ -267,26 +326,24 @@ class ReportGenerator:
         report_files = []
         
         # 1. 生成总览 CSV
-        overview_file = self.output_dir / "问答类应用数-总览.csv"
-        with open(overview_file, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
+        with storage.open_writer("问答类应用数-总览.csv", "report", encoding="utf-8-sig", newline="") as overview_file:
+            writer = csv.writer(overview_file)
             writer.writerow(["开始日期", "结束日期", "全部消息数", "用户数", "全部会话数", "平均会话互动数", "Token输出速度", "用户满意度", "费用消耗"])
             
-            if logs:
-                dates = [datetime.fromtimestamp(log.get("created_at")) for log in logs if log.get("created_at")]
-                if dates:
-                    start_date = min(dates).strftime("%Y-%m-%d")
-                    end_date = max(dates).strftime("%Y-%m-%d")
+            if self.message_count:
+                if self.first_created_at is not None:
+                    start_date = datetime.fromtimestamp(self.first_created_at).strftime("%Y-%m-%d")
+                    end_date = datetime.fromtimestamp(self.last_created_at).strftime("%Y-%m-%d")
                 else:
                     start_date = ""
                     end_date = ""
                 
-                total_messages = len(logs)
+                total_messages = self.message_count
                 total_users = len(user_stats)
                 total_sessions = len(session_ids)
                 avg_interactions = total_messages / total_sessions if total_sessions > 0 else 0
                 
-                total_time = sum(log.get("workflow_run", {}).get("elapsed_time", 0) for log in logs if log.get("workflow_run", {}).get("elapsed_time"))
+                total_time = self.total_time
                 token_speed = total_tokens / total_time if total_time > 0 else 0
                 
                 writer.writerow([
@@ -296,22 +353,20 @@ class ReportGenerator:
             else:
                 writer.writerow([""] * 9)
         
-        report_files.append(str(overview_file))
+        report_files.append(overview_file.path)
         
         # 2. 生成每日消息数 CSV
-        daily_file = self.output_dir / "问答类应用数-每日消息数.csv"
-        with open(daily_file, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
+        with storage.open_writer("问答类应用数-每日消息数.csv", "report", encoding="utf-8-sig", newline="") as daily_file:
+            writer = csv.writer(daily_file)
             writer.writerow(["日期", "消息数量"])
             for date_str in sorted(daily_stats.keys()):
                 writer.writerow([date_str, daily_stats[date_str]])
         
-        report_files.append(str(daily_file))
+        report_files.append(daily_file.path)
         
         # 3. 生成用户列表 CSV
-        user_list_file = self.output_dir / "问答类应用数-用户列表.csv"
-        with open(user_list_file, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
+        with storage.open_writer("问答类应用数-用户列表.csv", "report", encoding="utf-8-sig", newline="") as user_list_file:
+            writer = csv.writer(user_list_file)
             writer.writerow(["用户ID", "消息数", "使用天数", "首次使用日期", "最后使用日期"])
             for user_id, stats in sorted(user_stats.items(), key=lambda x: x[1]["message_count"], reverse=True):
                 use_days = len(stats["dates"])
@@ -319,7 +374,7 @@ class ReportGenerator:
                 last_date = stats["last_date"].strftime("%Y-%m-%d") if stats["last_date"] else ""
                 writer.writerow([user_id, stats["message_count"], use_days, first_date, last_date])
         
-        report_files.append(str(user_list_file))
+        report_files.append(user_list_file.path)
         
         # 4. 生成用户问答对 CSV
         # 先统计所有问答对中，每个知识库-文档组合最多有多少个文本片段
@@ -348,9 +403,8 @@ class ReportGenerator:
         segment_columns = [f"文本片段内容{i}（相似度+文本内容）" for i in range(1, max_segments + 1)]
         all_columns = base_columns + segment_columns + ["创建时间"]
         
-        qa_file = self.output_dir / "问答类应用数-用户问答对.csv"
-        with open(qa_file, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
+        with storage.open_writer("问答类应用数-用户问答对.csv", "report", encoding="utf-8-sig", newline="") as qa_file:
+            writer = csv.writer(qa_file)
             writer.writerow([""] * len(all_columns))
             writer.writerow(all_columns)
             writer.writerow([""] * len(all_columns))
@@ -367,9 +421,12 @@ class ReportGenerator:
                     qa.get("知识库名称", ""),
                     qa.get("引用的文档名称", ""),
                 ]
-                # 动态填充文本片段列
+                # 动态填充文本片段列（片段引用在这里才展开为文本）
                 for i in range(1, max_segments + 1):
-                    row.append(qa.get(f"文本片段内容{i}", ""))
+                    segment = qa.get(f"文本片段内容{i}", "")
+                    if isinstance(segment, SegmentRef):
+                        segment = segment_store.render(segment)
+                    row.append(segment)
                 row.append(qa.get("创建时间", ""))
                 writer.writerow(row)
             
@@ -377,10 +434,116 @@ class ReportGenerator:
             writer.writerow(["注：此处区分是否可上传附件、是否引用RAG知识库，若无内容，为空即可。"] + [""] * (len(all_columns) - 1))
             writer.writerow([""] * len(all_columns))
         
-        report_files.append(str(qa_file))
+        report_files.append(qa_file.path)
+        
+        # 5. 生成延迟分位数 CSV
+        with storage.open_writer("问答类应用数-延迟分位数.csv", "report", encoding="utf-8-sig", newline="") as latency_file:
+            writer = csv.writer(latency_file)
+            writer.writerow(LatencyStats.header())
+            for row in latency_stats.rows():
+                writer.writerow(row)
+        
+        report_files.append(latency_file.path)
+        
+        # 6. 生成节点热点和最慢节点 CSV（仅在包含节点执行详情时）
+        if node_analytics.run_count > 0:
+            with storage.open_writer("问答类应用数-节点热点.csv", "report", encoding="utf-8-sig", newline="") as hotspot_file:
+                writer = csv.writer(hotspot_file)
+                writer.writerow(NodeAnalytics.hotspot_header())
+                for row in node_analytics.hotspot_rows():
+                    writer.writerow(row)
+            report_files.append(hotspot_file.path)
+            
+            with storage.open_writer("问答类应用数-最慢节点.csv", "report", encoding="utf-8-sig", newline="") as slowest_file:
+                writer = csv.writer(slowest_file)
+                writer.writerow(NodeAnalytics.slowest_header())
+                for row in node_analytics.slowest_rows():
+                    writer.writerow(row)
+            report_files.append(slowest_file.path)
         
         logger.info(f"CSV 报告已生成: {len(report_files)} 个文件")
         return report_files
+
+
+class ReportGenerator:
+    """报告生成器"""
+    
+    def __init__(self, output_dir: str, storage: Optional[StorageService] = None):
+        """
+        初始化报告生成器
+        
+        Args:
+            output_dir: 输出目录
+            storage: 存储服务（默认直接写入输出目录）
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.storage = storage or LocalStorageService(str(self.output_dir), manifest=False)
+    
+    def generate_csv_reports(
+        self,
+        result: Dict[str, Any],
+        session_index: Optional[SessionIndex] = None,
+    ) -> List[str]:
+        """
+        生成 CSV 报告文件
+        
+        Args:
+            result: 日志数据结果
+            session_index: 会话索引（提供时问题排序跨运行窗口连续计算）
+        
+        Returns:
+            生成的报告文件路径列表
+        """
+        logs = result.get("data", [])
+        if not logs:
+            logger.warning("没有日志数据，无法生成 CSV 报告")
+            return []
+        
+        builder = CsvReportBuilder()
+        for idx, log in enumerate(logs, 1):
+            builder.add_log(idx, log)
+        return builder.write(self.storage, session_index=session_index)
+    
+    def generate_document_usage_report(self, hit_index: RetrievalHitIndex) -> str:
+        """
+        根据检索命中索引生成文档引用排行 CSV
+        
+        Args:
+            hit_index: 检索命中索引
+        
+        Returns:
+            生成的报告文件路径
+        """
+        def format_score(value: Optional[float]) -> str:
+            return f"{value:.4f}" if value is not None else ""
+        
+        with self.storage.open_writer("问答类应用数-文档引用统计.csv", "report", encoding="utf-8-sig", newline="") as usage_file:
+            writer = csv.writer(usage_file)
+            writer.writerow([
+                "排名", "知识库名称", "文档名称", "命中次数", "命中片段数", "命中日志数",
+                "最低相似度", "平均相似度", "P50相似度", "P90相似度", "最高相似度",
+                "首次命中时间", "最近命中时间",
+            ])
+            for rank, stats in enumerate(hit_index.document_usage(), 1):
+                writer.writerow([
+                    rank,
+                    stats["dataset_name"],
+                    stats["document_name"],
+                    stats["hit_count"],
+                    stats["segment_count"],
+                    stats["log_count"],
+                    format_score(stats["score_min"]),
+                    format_score(stats["score_mean"]),
+                    format_score(stats["score_p50"]),
+                    format_score(stats["score_p90"]),
+                    format_score(stats["score_max"]),
+                    format_timestamp(stats["first_hit_at"]) if stats["first_hit_at"] else "",
+                    format_timestamp(stats["last_hit_at"]) if stats["last_hit_at"] else "",
+                ])
+        
+        logger.info(f"文档引用统计已生成: {usage_file.path}")
+        return usage_file.path
     
     def generate_markdown_report(self, result: Dict[str, Any], include_details: bool = False) -> str:
         """
@@ -393,93 +556,26 @@ class ReportGenerator:
         Returns:
             Markdown 报告内容
         """
-        from src.utils.formatters import format_json_for_markdown
-        
-        md_lines = []
-        md_lines.append("# Dify 工作流执行日志报告")
-        md_lines.append("")
-        md_lines.append(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        md_lines.append("")
-        
-        # 整体摘要
-        md_lines.append("## 📊 整体摘要")
-        md_lines.append("")
-        total = result.get("total", 0)
-        page = result.get("page", 1)
-        limit = result.get("limit", 20)
-        has_more = result.get("has_more", False)
-        data_count = len(result.get("data", []))
-        
-        md_lines.append("| 项目 | 值 |")
-        md_lines.append("|------|-----|")
-        md_lines.append(f"| 总记录数 | {total} |")
-        md_lines.append(f"| 当前页 | {page} |")
-        md_lines.append(f"| 每页数量 | {limit} |")
-        md_lines.append(f"| 当前页记录数 | {data_count} |")
-        md_lines.append(f"| 是否有更多 | {'是' if has_more else '否'} |")
-        md_lines.append("")
-        
-        # 统计信息
         logs = result.get("data", [])
-        if logs:
-            status_count = {}
-            for log in logs:
-                workflow_run = log.get("workflow_run", {})
-                status = workflow_run.get("status", "unknown")
-                status_count[status] = status_count.get(status, 0) + 1
-            
-            md_lines.append("### 状态统计")
-            md_lines.append("")
-            md_lines.append("| 状态 | 数量 |")
-            md_lines.append("|------|------|")
-            for status, count in sorted(status_count.items()):
-                md_lines.append(f"| {status} | {count} |")
-            md_lines.append("")
-        
+        status_count: Dict[str, int] = {}
+        latency_stats = LatencyStats()
+        for log in logs:
+            workflow_run = log.get("workflow_run", {})
+            status = workflow_run.get("status", "unknown")
+            status_count[status] = status_count.get(status, 0) + 1
+            latency_stats.add_log(log)
+
+        md_lines = render_markdown_summary(result, len(logs), status_count, latency_stats)
+
         # 详细日志（如果包含）
         if include_details:
-            md_lines.append("## 📋 日志详情")
+            md_lines.append(DETAILS_HEADING)
             md_lines.append("")
-            
+
             for i, log in enumerate(logs, 1):
-                log_id = log.get("id", "N/A")
-                workflow_run = log.get("workflow_run", {})
-                
-                md_lines.append(f"### {i}. 日志 ID: `{log_id}`")
-                md_lines.append("")
-                md_lines.append("#### 基本信息")
-                md_lines.append("")
-                md_lines.append("| 字段 | 值 |")
-                md_lines.append("|------|-----|")
-                md_lines.append(f"| 日志ID | `{log_id}` |")
-                md_lines.append(f"| 状态 | {workflow_run.get('status', 'N/A')} |")
-                md_lines.append(f"| 创建时间 | {format_timestamp(log.get('created_at'))} |")
-                md_lines.append(f"| 耗时 | {workflow_run.get('elapsed_time', 0):.2f} 秒 |")
-                md_lines.append("")
-                
-                # 工作流运行详情
-                run_detail = log.get("workflow_run_detail")
-                if run_detail:
-                    md_lines.append("#### 工作流运行详情")
-                    md_lines.append("")
-                    if run_detail.get("inputs"):
-                        md_lines.append("##### 输入参数")
-                        md_lines.append("")
-                        md_lines.append("```json")
-                        md_lines.append(format_json_for_markdown(run_detail.get("inputs")))
-                        md_lines.append("```")
-                        md_lines.append("")
-                    
-                    if run_detail.get("outputs"):
-                        md_lines.append("##### 输出结果")
-                        md_lines.append("")
-                        md_lines.append("```json")
-                        md_lines.append(format_json_for_markdown(run_detail.get("outputs")))
-                        md_lines.append("```")
-                        md_lines.append("")
-                
+                md_lines.extend(render_markdown_log(i, log))
                 if i < len(logs):
                     md_lines.append("---")
                     md_lines.append("")
-        
+
         return "\n".join(md_lines)
@@ -0,0 +1,216 @@
+"""知识库检索命中索引服务"""
+
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.core.logger import get_logger
+from src.utils.log_fields import extract_query_and_answer, iter_retrieval_hits
+from src.utils.tdigest import TDigest
+
+logger = get_logger(__name__)
+
+
+class RetrievalHitIndex:
+    """
+    知识库检索命中倒排索引
+
+    以（知识库, 文档, 片段）为键记录每一次检索命中（日志ID、用户提问、相似度、时间），
+    在丰富日志详情时增量写入，并持久化在本地 SQLite 文件中。
+    同一条日志重复写入时会先删除旧记录，因此重叠的时间窗口不会重复计数。
+    """
+
+    DB_FILENAME = "retrieval_hits.db"
+
+    def __init__(self, index_dir: str):
+        """
+        初始化检索命中索引
+
+        Args:
+            index_dir: 索引目录
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_dir / self.DB_FILENAME
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        """初始化表结构"""
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS retrieval_hits (
+                log_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                dataset_id TEXT,
+                dataset_name TEXT NOT NULL,
+                document_id TEXT,
+                document_name TEXT NOT NULL,
+                segment_id TEXT,
+                score REAL,
+                query TEXT,
+                created_at INTEGER,
+                PRIMARY KEY (log_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_hits_document
+                ON retrieval_hits (dataset_name, document_name);
+            CREATE INDEX IF NOT EXISTS idx_hits_segment
+                ON retrieval_hits (segment_id);
+            """
+        )
+
+    @classmethod
+    def exists(cls, index_dir: str) -> bool:
+        """索引文件是否已存在"""
+        return (Path(index_dir) / cls.DB_FILENAME).exists()
+
+    def add_log(self, log: Dict[str, Any]) -> int:
+        """
+        写入一条日志的检索命中记录
+
+        Args:
+            log: 丰富后的日志数据（需包含 node_executions）
+
+        Returns:
+            写入的命中记录数
+        """
+        log_id = log.get("id")
+        node_executions = log.get("node_executions")
+        if not log_id or not node_executions:
+            return 0
+
+        user_query, _ = extract_query_and_answer(log.get("workflow_run_detail") or {})
+        created_at = log.get("created_at")
+
+        rows = []
+        for position, item in enumerate(iter_retrieval_hits(node_executions)):
+            metadata = item.get("metadata") or {}
+            dataset_name = (metadata.get("dataset_name") or "").replace("...", "").strip()
+            document_name = (metadata.get("document_name") or "").replace("...", "").strip()
+            if not dataset_name or not document_name:
+                continue
+            rows.append((
+                log_id,
+                position,
+                metadata.get("dataset_id"),
+                dataset_name,
+                metadata.get("document_id"),
+                document_name,
+                metadata.get("segment_id") or metadata.get("index_node_hash"),
+                metadata.get("score"),
+                user_query,
+                created_at,
+            ))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM retrieval_hits WHERE log_id = ?", (log_id,))
+            self.conn.executemany(
+                "INSERT INTO retrieval_hits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def document_hits(
+        self,
+        dataset_name: str,
+        document_name: str,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        查询某个文档的全部命中记录（按时间倒序）
+
+        Args:
+            dataset_name: 知识库名称
+            document_name: 文档名称
+            limit: 最多返回条数
+
+        Returns:
+            命中记录列表
+        """
+        sql = (
+            "SELECT * FROM retrieval_hits WHERE dataset_name = ? AND document_name = ? "
+            "ORDER BY created_at DESC, log_id, position"
+        )
+        params: List[Any] = [dataset_name, document_name]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def segment_hits(self, segment_id: str) -> List[Dict[str, Any]]:
+        """查询某个片段的全部命中记录（按时间倒序）"""
+        rows = self.conn.execute(
+            "SELECT * FROM retrieval_hits WHERE segment_id = ? ORDER BY created_at DESC, log_id, position",
+            (segment_id,),
+        )
+        return [dict(row) for row in rows]
+
+    def document_usage(self) -> List[Dict[str, Any]]:
+        """
+        统计每个文档的命中情况（按命中次数降序）
+
+        Returns:
+            每个文档一条统计，包含命中次数、片段数、日志数、相似度分布和命中时间范围
+        """
+        usage: Dict[tuple, Dict[str, Any]] = {}
+        rows = self.conn.execute(
+            "SELECT dataset_name, document_name, segment_id, log_id, score, created_at FROM retrieval_hits"
+        )
+        for row in rows:
+            key = (row["dataset_name"], row["document_name"])
+            stats = usage.get(key)
+            if stats is None:
+                stats = {
+                    "dataset_name": row["dataset_name"],
+                    "document_name": row["document_name"],
+                    "hit_count": 0,
+                    "segments": set(),
+                    "logs": set(),
+                    "scores": TDigest(),
+                    "first_hit_at": None,
+                    "last_hit_at": None,
+                }
+                usage[key] = stats
+
+            stats["hit_count"] += 1
+            if row["segment_id"]:
+                stats["segments"].add(row["segment_id"])
+            stats["logs"].add(row["log_id"])
+            if row["score"] is not None:
+                stats["scores"].add(row["score"])
+            created_at = row["created_at"]
+            if created_at:
+                if stats["first_hit_at"] is None or created_at < stats["first_hit_at"]:
+                    stats["first_hit_at"] = created_at
+                if stats["last_hit_at"] is None or created_at > stats["last_hit_at"]:
+                    stats["last_hit_at"] = created_at
+
+        result = []
+        for stats in sorted(usage.values(), key=lambda s: s["hit_count"], reverse=True):
+            scores: TDigest = stats["scores"]
+            result.append({
+                "dataset_name": stats["dataset_name"],
+                "document_name": stats["document_name"],
+                "hit_count": stats["hit_count"],
+                "segment_count": len(stats["segments"]),
+                "log_count": len(stats["logs"]),
+                "score_min": scores.min,
+                "score_mean": scores.mean,
+                "score_p50": scores.quantile(0.5),
+                "score_p90": scores.quantile(0.9),
+                "score_max": scores.max,
+                "first_hit_at": stats["first_hit_at"],
+                "last_hit_at": stats["last_hit_at"],
+            })
+        return result
+
+    def close(self):
+        """关闭索引"""
+        self.conn.close()
+
+    def __enter__(self) -> "RetrievalHitIndex":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
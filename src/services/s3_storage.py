@@ -0,0 +1,370 @@
+"""S3 兼容对象存储服务"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+from src.core.exceptions import DifyStorageError
+from src.core.logger import get_logger
+from src.services.storage import StorageService, parse_partition_path
+
+logger = get_logger(__name__)
+
+# S3 分片上传要求除最后一片外每片至少 5MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+_CLIENT_CACHE: Dict[Tuple[Any, ...], Any] = {}
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_s3_client(
+    endpoint_url: Optional[str] = None,
+    access_key_id: Optional[str] = None,
+    secret_access_key: Optional[str] = None,
+    region: Optional[str] = None,
+    max_pool_connections: int = 10,
+):
+    """
+    获取（复用）S3 客户端
+
+    相同连接参数的客户端在进程内只创建一次，多次保存复用同一个连接池。
+
+    Raises:
+        DifyStorageError: 未安装 boto3
+    """
+    key = (endpoint_url, access_key_id, secret_access_key, region, max_pool_connections)
+    with _CLIENT_LOCK:
+        client = _CLIENT_CACHE.get(key)
+        if client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError as e:
+                raise DifyStorageError("S3 存储需要安装 boto3: uv pip install -e '.[storage]'") from e
+
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                region_name=region,
+                config=Config(max_pool_connections=max_pool_connections, retries={"mode": "standard"}),
+            )
+            _CLIENT_CACHE[key] = client
+    return client
+
+
+class S3MultipartWriter:
+    """
+    S3 流式分片上传写入器
+
+    write 的数据先缓存到一个分片大小，满了就交给线程池并发上传，同时在途的分片数不超过 max_concurrency，
+    内存占用约为 分片大小 × (max_concurrency + 1)。总数据不足一个分片时退化为一次 put_object。
+    出现异常时中止分片上传，不会留下不完整的对象。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        key: str,
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 4,
+        content_type: Optional[str] = None,
+    ):
+        """
+        初始化写入器
+
+        Args:
+            client: S3 客户端
+            bucket: 存储桶
+            key: 对象键
+            part_size: 分片大小（字节，最小 5MB）
+            max_concurrency: 并发上传的分片数
+            content_type: 对象的 Content-Type
+        """
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.extra_args = {"ContentType": content_type} if content_type else {}
+
+        self.size = 0
+        self.closed = False
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Future, int] = {}
+        self._parts: List[Dict[str, Any]] = []
+
+    def write(self, data: bytes) -> int:
+        """写入数据"""
+        if self.closed:
+            raise ValueError("写入器已关闭")
+        self._buffer.extend(data)
+        self.size += len(data)
+        while len(self._buffer) >= self.part_size:
+            chunk = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(chunk)
+        return len(data)
+
+    def _submit_part(self, chunk: bytes):
+        """提交一个分片（在途分片过多时等待其中一个完成）"""
+        if self._upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.extra_args)
+            self._upload_id = response["UploadId"]
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="s3-upload"
+            )
+
+        while len(self._pending) >= self.max_concurrency:
+            done, _ = wait(list(self._pending), return_when=FIRST_COMPLETED)
+            self._collect(done)
+
+        part_number = len(self._parts) + len(self._pending) + 1
+        future = self._executor.submit(self._upload_part, part_number, chunk)
+        self._pending[future] = part_number
+
+    def _upload_part(self, part_number: int, chunk: bytes) -> Dict[str, Any]:
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=chunk,
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def _collect(self, futures):
+        """收集已完成的分片结果（上传失败时抛出异常）"""
+        for future in futures:
+            self._pending.pop(future)
+            self._parts.append(future.result())
+
+    def close(self):
+        """完成上传"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._upload_id is None:
+                self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.extra_args)
+                return
+
+            if self._buffer:
+                self._submit_part(bytes(self._buffer))
+            self._collect(list(self._pending))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": sorted(self._parts, key=lambda part: part["PartNumber"])},
+            )
+        except Exception:
+            self._abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            self._shutdown()
+
+    # 作为存储写入器的底层对象时，commit 即完成上传
+    commit = close
+
+    def abort(self):
+        """中止上传，丢弃已上传的分片"""
+        if self.closed:
+            return
+        self.closed = True
+        self._abort()
+        self._shutdown()
+
+    def _abort(self):
+        if self._upload_id is None:
+            return
+        for future in self._pending:
+            future.cancel()
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        except Exception as e:
+            logger.warning(f"中止分片上传失败: s3://{self.bucket}/{self.key}: {e}")
+
+    def _shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> "S3MultipartWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class S3StorageService(StorageService):
+    """
+    S3 兼容对象存储服务（AWS S3、MinIO 等）
+
+    对象键布局与本地存储一致：{prefix}reports/{report_type}/{filename}、{prefix}data/{filename}。
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        endpoint_url: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        region: Optional[str] = None,
+        prefix: str = "",
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 4,
+        max_pool_connections: int = 10,
+        compression: Union[str, Dict[str, str], None] = None,
+    ):
+        """
+        初始化 S3 存储服务
+
+        Args:
+            bucket_name: 存储桶名称
+            endpoint_url: S3 兼容服务地址（MinIO 等，AWS S3 留空）
+            access_key_id: Access Key ID（留空时使用 boto3 默认凭证链）
+            secret_access_key: Secret Access Key
+            region: 区域
+            prefix: 对象键前缀
+            part_size: 分片上传的分片大小（字节，最小 5MB）
+            max_concurrency: 单个文件并发上传的分片数
+            max_pool_connections: 客户端连接池大小
+            compression: 压缩策略（产物类型 → none/gzip/zstd）
+        """
+        super().__init__(compression)
+        if not bucket_name:
+            raise DifyStorageError("S3 存储需要配置 bucket_name")
+        self.bucket = bucket_name
+        self.prefix = prefix.strip("/") + "/" if prefix and prefix.strip("/") else ""
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.client = get_s3_client(
+            endpoint_url=endpoint_url,
+            access_key_id=access_key_id,
+            secret_access_key=secret_access_key,
+            region=region,
+            max_pool_connections=max(max_pool_connections, max_concurrency),
+        )
+
+    def _key(self, relative_path: str) -> str:
+        return f"{self.prefix}{relative_path.lstrip('/')}"
+
+    def _uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def open_upload(self, relative_path: str, content_type: Optional[str] = None) -> S3MultipartWriter:
+        """
+        打开一个流式上传写入器，数据边写边上传，不需要先在本地落盘
+
+        Args:
+            relative_path: 相对路径（如 data/logs_data_100.ndjson.gz）
+            content_type: 对象的 Content-Type
+
+        Returns:
+            写入器（配合 with 使用，正常退出时完成上传，异常时中止）
+        """
+        return S3MultipartWriter(
+            self.client,
+            self.bucket,
+            self._key(relative_path),
+            part_size=self.part_size,
+            max_concurrency=self.max_concurrency,
+            content_type=content_type,
+        )
+
+    def _open_raw_writer(self, relative_path: str) -> S3MultipartWriter:
+        return self.open_upload(relative_path)
+
+    def _open_raw_reader(self, relative_path: str) -> IO[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(relative_path))["Body"]
+        except Exception as e:
+            raise DifyStorageError(f"读取失败: {self._uri(self._key(relative_path))}: {e}") from e
+
+    def _location(self, relative_path: str) -> str:
+        return self._uri(self._key(relative_path))
+
+    def read_range(self, relative_path: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """
+        按字节范围读取对象
+
+        Args:
+            relative_path: 相对路径
+            start: 起始字节（含）
+            end: 结束字节（含），None 表示读到末尾
+
+        Returns:
+            读取的字节内容
+        """
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(relative_path), Range=byte_range)
+            return response["Body"].read()
+        except Exception as e:
+            raise DifyStorageError(f"读取失败: {self._uri(self._key(relative_path))} ({byte_range}): {e}") from e
+
+    def object_size(self, relative_path: str) -> int:
+        """对象大小（字节）"""
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(relative_path))["ContentLength"]
+        except Exception as e:
+            raise DifyStorageError(f"获取对象信息失败: {self._uri(self._key(relative_path))}: {e}") from e
+
+    def _iter_objects(self, relative_prefix: str):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(relative_prefix)):
+            for obj in page.get("Contents", []):
+                yield obj
+
+    def _list_files(self, relative_prefix: str) -> List[str]:
+        return sorted(obj["Key"][len(self.prefix):] for obj in self._iter_objects(relative_prefix))
+
+    def _delete_files(self, relative_paths: List[str]):
+        keys = [self._key(relative_path) for relative_path in relative_paths]
+        # delete_objects 每次最多 1000 个键
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+
+    def list_reports(self, report_type: str, days: int = 30) -> List[str]:
+        """列出报告文件"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        return sorted(
+            self._uri(obj["Key"])
+            for obj in self._iter_objects(f"reports/{report_type}/")
+            if obj["LastModified"] >= cutoff
+        )
+
+    def cleanup_old_files(self, days: int) -> int:
+        """清理旧文件"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        expired = []
+        for relative_prefix in ("reports/", "data/"):
+            for obj in self._iter_objects(relative_prefix):
+                relative_path = obj["Key"][len(self.prefix):]
+                # 对象的修改时间无法设置，分区文件按周期结束时间判断，合并后的周 / 月分区整个周期过期后才删除
+                partition = parse_partition_path(relative_path)
+                if partition is not None:
+                    expired_at = datetime.combine(partition["end"], datetime.min.time()).astimezone(timezone.utc)
+                else:
+                    expired_at = obj["LastModified"]
+                if expired_at < cutoff:
+                    expired.append(relative_path)
+
+        self._delete_files(expired)
+
+        logger.info(f"已清理 {len(expired)} 个旧文件")
+        return len(expired)
@@ -0,0 +1,236 @@
+"""本地全文检索索引服务"""
+
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.core.logger import get_logger
+from src.utils.log_fields import extract_query_and_answer, iter_retrieval_hits
+
+logger = get_logger(__name__)
+
+
+class LogSearchIndex:
+    """
+    用户提问 / AI 回答 / 检索片段的本地全文检索索引
+
+    基于 SQLite FTS5（trigram 分词，支持中文子串匹配），在丰富日志详情时增量更新，
+    检索时不需要再访问 Dify API。
+    """
+
+    DB_FILENAME = "search.db"
+
+    # trigram 分词最少需要 3 个字符才能走全文索引
+    MIN_MATCH_CHARS = 3
+
+    HIGHLIGHT_START = "【"
+    HIGHLIGHT_END = "】"
+
+    def __init__(self, index_dir: str):
+        """
+        初始化全文检索索引
+
+        Args:
+            index_dir: 索引目录
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_dir / self.DB_FILENAME
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        """初始化表结构（logs 保存元数据，log_fts 保存全文，两者 rowid 一一对应）"""
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS logs (
+                rowid INTEGER PRIMARY KEY,
+                log_id TEXT NOT NULL UNIQUE,
+                workflow_run_id TEXT,
+                status TEXT,
+                created_at INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs (created_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(
+                user_query,
+                ai_answer,
+                segments,
+                tokenize = 'trigram'
+            );
+            """
+        )
+
+    @classmethod
+    def exists(cls, index_dir: str) -> bool:
+        """索引文件是否已存在"""
+        return (Path(index_dir) / cls.DB_FILENAME).exists()
+
+    def add_log(self, log: Dict[str, Any]) -> bool:
+        """
+        写入（或更新）一条日志
+
+        Args:
+            log: 丰富后的日志数据
+
+        Returns:
+            是否写入了索引（没有可检索文本的日志会被跳过）
+        """
+        log_id = log.get("id")
+        if not log_id:
+            return False
+
+        user_query, ai_answer = extract_query_and_answer(log.get("workflow_run_detail") or {})
+        segments = "\n".join(
+            item.get("content") or ""
+            for item in iter_retrieval_hits(log.get("node_executions") or [])
+        )
+        if not (user_query or ai_answer or segments):
+            return False
+
+        workflow_run = log.get("workflow_run") or {}
+        with self.conn:
+            row = self.conn.execute("SELECT rowid FROM logs WHERE log_id = ?", (log_id,)).fetchone()
+            if row:
+                rowid = row["rowid"]
+                self.conn.execute("DELETE FROM log_fts WHERE rowid = ?", (rowid,))
+                self.conn.execute(
+                    "UPDATE logs SET workflow_run_id = ?, status = ?, created_at = ? WHERE rowid = ?",
+                    (workflow_run.get("id"), workflow_run.get("status"), log.get("created_at"), rowid),
+                )
+            else:
+                cursor = self.conn.execute(
+                    "INSERT INTO logs (log_id, workflow_run_id, status, created_at) VALUES (?, ?, ?, ?)",
+                    (log_id, workflow_run.get("id"), workflow_run.get("status"), log.get("created_at")),
+                )
+                rowid = cursor.lastrowid
+            self.conn.execute(
+                "INSERT INTO log_fts (rowid, user_query, ai_answer, segments) VALUES (?, ?, ?, ?)",
+                (rowid, user_query, ai_answer, segments),
+            )
+        return True
+
+    @staticmethod
+    def _build_match_expression(terms: List[str]) -> str:
+        """把检索词转换为 FTS5 MATCH 表达式（每个词作为短语，词之间为 AND）"""
+        return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def _highlight(self, text: str, terms: List[str]) -> str:
+        """在 Python 中为短检索词添加高亮标记"""
+        if not text:
+            return ""
+        pattern = "|".join(re.escape(term) for term in terms)
+        return re.sub(
+            f"({pattern})",
+            lambda m: f"{self.HIGHLIGHT_START}{m.group(1)}{self.HIGHLIGHT_END}",
+            text,
+        )
+
+    def _excerpt(self, text: str, terms: List[str], width: int = 64) -> str:
+        """截取第一个命中词附近的片段"""
+        if not text:
+            return ""
+        positions = [text.find(term) for term in terms if term in text]
+        if not positions:
+            return text[:width * 2]
+        first = min(positions)
+        begin = max(first - width, 0)
+        excerpt = text[begin:first + width]
+        if begin > 0:
+            excerpt = "…" + excerpt
+        if first + width < len(text):
+            excerpt += "…"
+        return excerpt
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        created_at_after: Optional[int] = None,
+        created_at_before: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        全文检索
+
+        多个检索词用空格分隔，需同时命中。检索词都不少于 3 个字符时走 FTS5 索引并按相关度排序，
+        否则退化为子串扫描并按时间倒序排列。
+
+        Args:
+            query: 检索词
+            limit: 最多返回条数
+            created_at_after: 创建时间下限（Unix 时间戳）
+            created_at_before: 创建时间上限（Unix 时间戳）
+
+        Returns:
+            命中记录列表，包含日志ID、状态、创建时间和带高亮的提问 / 回答 / 片段摘要
+        """
+        terms = [term for term in query.split() if term]
+        if not terms:
+            return []
+
+        filters = []
+        params: List[Any] = []
+        if created_at_after is not None:
+            filters.append("logs.created_at >= ?")
+            params.append(created_at_after)
+        if created_at_before is not None:
+            filters.append("logs.created_at <= ?")
+            params.append(created_at_before)
+
+        start, end = self.HIGHLIGHT_START, self.HIGHLIGHT_END
+        use_fts = all(len(term) >= self.MIN_MATCH_CHARS for term in terms)
+
+        if use_fts:
+            where = ["log_fts MATCH ?"] + filters
+            sql = f"""
+                SELECT logs.log_id, logs.workflow_run_id, logs.status, logs.created_at,
+                       highlight(log_fts, 0, '{start}', '{end}') AS user_query,
+                       highlight(log_fts, 1, '{start}', '{end}') AS ai_answer,
+                       snippet(log_fts, 2, '{start}', '{end}', '…', 64) AS segments
+                FROM log_fts JOIN logs ON logs.rowid = log_fts.rowid
+                WHERE {" AND ".join(where)}
+                ORDER BY bm25(log_fts)
+                LIMIT ?
+            """
+            rows = self.conn.execute(sql, [self._build_match_expression(terms)] + params + [limit])
+            return [dict(row) for row in rows]
+
+        where = [
+            "(instr(log_fts.user_query, ?) > 0 OR instr(log_fts.ai_answer, ?) > 0 "
+            "OR instr(log_fts.segments, ?) > 0)"
+        ] * len(terms) + filters
+        term_params: List[Any] = []
+        for term in terms:
+            term_params.extend([term, term, term])
+        sql = f"""
+            SELECT logs.log_id, logs.workflow_run_id, logs.status, logs.created_at,
+                   log_fts.user_query, log_fts.ai_answer, log_fts.segments
+            FROM log_fts JOIN logs ON logs.rowid = log_fts.rowid
+            WHERE {" AND ".join(where)}
+            ORDER BY logs.created_at DESC
+            LIMIT ?
+        """
+        results = []
+        for row in self.conn.execute(sql, term_params + params + [limit]):
+            record = dict(row)
+            record["segments"] = self._excerpt(record["segments"], terms)
+            for field in ("user_query", "ai_answer", "segments"):
+                record[field] = self._highlight(record[field], terms)
+            results.append(record)
+        return results
+
+    def count(self) -> int:
+        """已索引的日志数量"""
+        return self.conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+
+    def close(self):
+        """关闭索引"""
+        self.conn.close()
+
+    def __enter__(self) -> "LogSearchIndex":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,95 @@
+"""检索片段存储服务"""
+
+import hashlib
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class SegmentRef(NamedTuple):
+    """问答行中对检索片段的引用（只保存片段 ID、相似度和命中位置）"""
+    segment_id: str
+    score: float
+    position: int
+
+
+class SegmentStore:
+    """
+    按内容寻址的检索片段存储
+
+    同一个片段无论被检索命中多少次，内容只保存一份；问答行中只保存 SegmentRef，
+    写 CSV 时再通过 render 展开为 "相似度 + 文本内容"。
+    """
+
+    def __init__(self, preview_chars: int = 200):
+        """
+        初始化片段存储
+
+        Args:
+            preview_chars: 展开时保留的片段内容长度
+        """
+        self.preview_chars = preview_chars
+        self._contents: Dict[str, str] = {}
+
+    @staticmethod
+    def segment_key(item: Dict[str, Any]) -> str:
+        """
+        计算片段的存储键
+
+        优先使用 metadata.segment_id，其次是 index_node_hash，都没有时使用内容哈希。
+
+        Args:
+            item: 知识检索命中片段
+        """
+        metadata = item.get("metadata") or {}
+        key = metadata.get("segment_id") or metadata.get("index_node_hash")
+        if key:
+            return str(key)
+        content = item.get("content") or ""
+        return "sha1:" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def add(self, item: Dict[str, Any], position: int = 0) -> Optional[SegmentRef]:
+        """
+        保存一个命中片段并返回引用
+
+        Args:
+            item: 知识检索命中片段
+            position: 片段在本次检索结果中的位置
+
+        Returns:
+            片段引用，片段没有内容时返回 None
+        """
+        content = item.get("content") or ""
+        if not content:
+            return None
+
+        segment_id = self.segment_key(item)
+        if segment_id not in self._contents:
+            self._contents[segment_id] = content
+
+        metadata = item.get("metadata") or {}
+        return SegmentRef(segment_id=segment_id, score=metadata.get("score", 0) or 0, position=position)
+
+    def get(self, segment_id: str) -> str:
+        """获取片段内容"""
+        return self._contents.get(segment_id, "")
+
+    def render(self, ref: SegmentRef) -> str:
+        """把片段引用展开为报告中的 "相似度 + 文本内容" 格式"""
+        content = self.get(ref.segment_id)
+        return f"相似度:{ref.score:.4f}\n{content[:self.preview_chars]}"
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def __contains__(self, segment_id: str) -> bool:
+        return segment_id in self._contents
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可 JSON 化的字典"""
+        return {"preview_chars": self.preview_chars, "segments": dict(self._contents)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SegmentStore":
+        """从 to_dict 的结果恢复"""
+        store = cls(preview_chars=data.get("preview_chars", 200))
+        store._contents = dict(data.get("segments", {}))
+        return store
@@ -0,0 +1,162 @@
+"""会话索引服务"""
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SessionIndex:
+    """
+    跨运行的会话索引
+
+    持久化保存 会话ID → 按 (created_at, log_id) 排序的日志条目，每个条目记录该日志在问答对报告中占用的行数
+    和第一行的问题排序（start_order）。每次运行只处理本次出现的日志：按索引查到前一个条目即可得到新条目的排序，
+    只有晚到的日志插入到已有条目之前时才把其后的条目整体后移，开销与本次新日志数成正比，与会话历史长度无关，
+    即可得到跨运行窗口的 "问题排序"，不需要扩大日志获取的时间范围。
+    """
+
+    DB_FILENAME = "sessions.db"
+
+    def __init__(self, index_dir: str):
+        """
+        初始化会话索引
+
+        Args:
+            index_dir: 索引目录
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_dir / self.DB_FILENAME
+        self.conn = sqlite3.connect(str(self.db_path))
+        self._init_schema()
+
+    def _init_schema(self):
+        """初始化表结构（旧版本的索引没有 start_order 列时补充并计算一次）"""
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS session_entries (
+                session_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                log_id TEXT NOT NULL,
+                row_count INTEGER NOT NULL DEFAULT 1,
+                start_order INTEGER,
+                PRIMARY KEY (session_id, log_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_session_entries_order
+                ON session_entries (session_id, created_at, log_id);
+            """
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(session_entries)")}
+        if "start_order" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE session_entries ADD COLUMN start_order INTEGER")
+                self._backfill_start_orders()
+
+    def _backfill_start_orders(self):
+        """按时间顺序计算所有条目的 start_order（只在升级旧索引时执行一次）"""
+        rows = self.conn.execute(
+            "SELECT session_id, log_id, row_count FROM session_entries ORDER BY session_id, created_at, log_id"
+        )
+        updates = []
+        current_session, order = None, 1
+        for session_id, log_id, row_count in rows:
+            if session_id != current_session:
+                current_session, order = session_id, 1
+            updates.append((order, session_id, log_id))
+            order += row_count
+        self.conn.executemany(
+            "UPDATE session_entries SET start_order = ? WHERE session_id = ? AND log_id = ?", updates
+        )
+
+    def _remove(self, session_id: str, created_at: float, log_id: str, row_count: int):
+        """删除一个条目，其后的条目前移"""
+        self.conn.execute("DELETE FROM session_entries WHERE session_id = ? AND log_id = ?", (session_id, log_id))
+        self.conn.execute(
+            "UPDATE session_entries SET start_order = start_order - ? "
+            "WHERE session_id = ? AND (created_at, log_id) > (?, ?)",
+            (row_count, session_id, created_at, log_id),
+        )
+
+    def _insert(self, session_id: str, created_at: float, log_id: str, row_count: int):
+        """插入一个条目：排序紧接前一个条目，其后的条目（晚到的日志才会有）后移"""
+        previous = self.conn.execute(
+            "SELECT start_order + row_count FROM session_entries "
+            "WHERE session_id = ? AND (created_at, log_id) < (?, ?) "
+            "ORDER BY created_at DESC, log_id DESC LIMIT 1",
+            (session_id, created_at, log_id),
+        ).fetchone()
+        shifted = self.conn.execute(
+            "UPDATE session_entries SET start_order = start_order + ? "
+            "WHERE session_id = ? AND (created_at, log_id) > (?, ?)",
+            (row_count, session_id, created_at, log_id),
+        ).rowcount
+        if shifted:
+            logger.debug(f"会话 {session_id} 插入晚到的日志 {log_id}，后移 {shifted} 条记录")
+        self.conn.execute(
+            "INSERT INTO session_entries (session_id, created_at, log_id, row_count, start_order) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (session_id, created_at, log_id, row_count, previous[0] if previous else 1),
+        )
+
+    def assign_orders(
+        self,
+        sessions: Dict[str, List[Tuple[float, str, int]]],
+    ) -> Dict[Tuple[str, str], int]:
+        """
+        合并本次运行的日志并计算每条日志的起始问题排序
+
+        Args:
+            sessions: 会话ID → 本次运行中该会话的 (created_at, log_id, 行数) 列表
+
+        Returns:
+            (会话ID, 日志ID) → 该日志第一行的问题排序（从 1 开始）
+        """
+        orders: Dict[Tuple[str, str], int] = {}
+        changed = 0
+
+        with self.conn:
+            for session_id, new_entries in sessions.items():
+                for created_at, log_id, row_count in sorted(new_entries, key=lambda e: (e[0] or 0, e[1])):
+                    created_at = created_at or 0
+                    existing = self.conn.execute(
+                        "SELECT created_at, row_count FROM session_entries WHERE session_id = ? AND log_id = ?",
+                        (session_id, log_id),
+                    ).fetchone()
+                    if existing == (created_at, row_count):
+                        continue
+                    if existing is not None:
+                        # 同一日志再次出现（时间窗口重叠）且内容变化，以本次为准
+                        self._remove(session_id, existing[0], log_id, existing[1])
+                    self._insert(session_id, created_at, log_id, row_count)
+                    changed += 1
+
+                # 同一会话后插入的条目可能使先处理的条目后移，全部写入后再读取排序
+                log_ids = [log_id for _, log_id, _ in new_entries]
+                for start in range(0, len(log_ids), 500):
+                    batch = log_ids[start:start + 500]
+                    rows = self.conn.execute(
+                        "SELECT log_id, start_order FROM session_entries "
+                        f"WHERE session_id = ? AND log_id IN ({','.join('?' * len(batch))})",
+                        (session_id, *batch),
+                    )
+                    for log_id, start_order in rows:
+                        orders[(session_id, log_id)] = start_order
+
+        if changed:
+            logger.debug(f"会话索引已更新: {changed} 条记录")
+
+        return orders
+
+    def close(self):
+        """关闭索引"""
+        self.conn.close()
+
+    def __enter__(self) -> "SessionIndex":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
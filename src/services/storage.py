@@ -1,34 +1,494 @@
 """存储服务"""
 
+import hashlib
+import io
 import os
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from abc import ABC, abstractmethod
 
 from src.core.exceptions import DifyStorageError
 from src.core.logger import get_logger
+from src.services.artifact_manifest import ArtifactManifest
+from src.utils import jsoncodec
+from src.utils.atomic import AtomicFile
+from src.utils.compression import (
+    CODEC_SUFFIXES,
+    CompressionPolicy,
+    codec_from_path,
+    compress_writer,
+    decompress_reader,
+    resolve_codec,
+    with_codec_suffix,
+)
 
 logger = get_logger(__name__)
 
+# 按应用、按天写入的分区文件：data/partitions/{app_id}/daily/2026-10-01.ndjson（按压缩策略追加 .gz / .zst），
+# 合并后为 weekly/2026-W40.ndjson 或 monthly/2026-10.ndjson
+PARTITIONS_DIR = "data/partitions"
+PARTITION_SUFFIX = ".ndjson"
+PARTITION_GRANULARITIES = ("daily", "weekly", "monthly")
+
+
+def partition_key(day: date, granularity: str = "daily") -> str:
+    """日期所在分区的键（daily: 2026-10-01，weekly: 2026-W40，monthly: 2026-10）"""
+    if granularity == "daily":
+        return day.isoformat()
+    if granularity == "weekly":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "monthly":
+        return f"{day.year}-{day.month:02d}"
+    raise ValueError(f"不支持的分区粒度: {granularity}（可选: {', '.join(PARTITION_GRANULARITIES)}）")
+
+
+def partition_period(key: str, granularity: str) -> Tuple[date, date]:
+    """
+    分区覆盖的日期范围
+
+    Returns:
+        (起始日期, 结束日期)，结束日期不含
+    """
+    if granularity == "daily":
+        start = date.fromisoformat(key)
+        return start, start + timedelta(days=1)
+    if granularity == "weekly":
+        year, week = key.split("-W")
+        start = date.fromisocalendar(int(year), int(week), 1)
+        return start, start + timedelta(days=7)
+    if granularity == "monthly":
+        year, month = (int(part) for part in key.split("-"))
+        start = date(year, month, 1)
+        return start, date(year + month // 12, month % 12 + 1, 1)
+    raise ValueError(f"不支持的分区粒度: {granularity}（可选: {', '.join(PARTITION_GRANULARITIES)}）")
+
+
+def partition_path(app_id: str, day: date, granularity: str = "daily") -> str:
+    """
+    分区文件的相对路径（不含压缩后缀，写入时由压缩策略追加）
+
+    Args:
+        app_id: 应用 ID
+        day: 分区中的任意一天
+        granularity: 分区粒度（daily/weekly/monthly）
+    """
+    return f"{PARTITIONS_DIR}/{app_id}/{granularity}/{partition_key(day, granularity)}{PARTITION_SUFFIX}"
+
+
+def parse_partition_path(relative_path: str) -> Optional[Dict[str, Any]]:
+    """
+    解析分区文件路径
+
+    Returns:
+        {"app_id", "granularity", "key", "start", "end", "codec"}，不是分区文件时返回 None
+    """
+    prefix = PARTITIONS_DIR + "/"
+    if not relative_path.startswith(prefix):
+        return None
+    parts = relative_path[len(prefix):].split("/")
+    if len(parts) != 3 or parts[1] not in PARTITION_GRANULARITIES:
+        return None
+    app_id, granularity, filename = parts
+    codec = codec_from_path(filename)
+    suffix = CODEC_SUFFIXES[codec]
+    name = filename[:-len(suffix)] if suffix else filename
+    if not name.endswith(PARTITION_SUFFIX):
+        return None
+    key = name[:-len(PARTITION_SUFFIX)]
+    try:
+        start, end = partition_period(key, granularity)
+    except ValueError:
+        return None
+    return {"app_id": app_id, "granularity": granularity, "key": key, "start": start, "end": end, "codec": codec}
+
+
+def _date_timestamp(day: date) -> float:
+    """日期零点（本地时间）的 Unix 时间戳"""
+    return datetime.combine(day, time()).timestamp()
+
+
+class _HashingWriter(io.RawIOBase):
+    """统计写入的字节数和 SHA-256，再转交给底层写入对象（关闭时不关闭底层对象）"""
+
+    def __init__(self, raw: Any):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        self.size += len(data)
+        self.raw.write(data)
+        return len(data)
+
+
+class StorageWriter:
+    """
+    存储写入器
+
+    写入的数据经过 压缩（可选）→ 缓冲 → 校验和统计 后交给存储后端的原始写入对象，
+    commit 时完成写入（本地文件原子替换 / 对象存储完成上传），异常时 abort 丢弃已写入的内容。
+    可以直接传给 csv.writer、shutil.copyfileobj 等只需要 write 方法的对象。
+    """
+
+    def __init__(
+        self,
+        raw: Any,
+        path: str,
+        codec: str = "none",
+        encoding: Optional[str] = None,
+        newline: Optional[str] = None,
+        on_commit: Optional[Callable[["StorageWriter"], None]] = None,
+        compression_level: Optional[int] = None,
+    ):
+        """
+        初始化写入器
+
+        Args:
+            raw: 后端原始写入对象（需要 write / commit / abort 方法）
+            path: 写入位置（本地路径或对象 URI）
+            codec: 压缩算法
+            encoding: 文本编码（提供时按文本写入）
+            newline: 换行符处理（文本模式）
+            on_commit: 写入完成后的回调
+            compression_level: 压缩级别（None 使用默认值）
+        """
+        self.raw = raw
+        self.path = path
+        self.codec = codec
+        self.on_commit = on_commit
+        self.closed = False
+
+        self._hashing = _HashingWriter(raw)
+        self._buffered = io.BufferedWriter(self._hashing, buffer_size=1024 * 1024)
+        self._compressed = compress_writer(self._buffered, codec, level=compression_level)
+        self._text = (
+            io.TextIOWrapper(self._compressed, encoding=encoding, newline=newline)
+            if encoding else None
+        )
+
+    @property
+    def size(self) -> int:
+        """实际写入存储的字节数（压缩后）"""
+        return self._hashing.size
+
+    @property
+    def checksum(self) -> str:
+        """实际写入存储的内容的 SHA-256（压缩后）"""
+        return self._hashing.digest.hexdigest()
+
+    def write(self, data: Union[str, bytes]) -> int:
+        """写入数据（文本模式写入 str，否则写入 bytes）"""
+        return (self._text or self._compressed).write(data)
+
+    def _close_streams(self):
+        if self._text is not None:
+            self._text.flush()
+            self._text.detach()
+        if self._compressed is not self._buffered:
+            self._compressed.close()
+        self._buffered.flush()
+        self._buffered.detach()
+
+    def commit(self):
+        """完成写入"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._close_streams()
+            self.raw.commit()
+        except BaseException:
+            self.raw.abort()
+            raise
+        if self.on_commit:
+            self.on_commit(self)
+
+    def abort(self):
+        """放弃写入"""
+        if self.closed:
+            return
+        self.closed = True
+        self.raw.abort()
+
+    def __enter__(self) -> "StorageWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
 
 class StorageService(ABC):
-    """存储服务抽象基类"""
-    
+    """
+    存储服务抽象基类
+
+    open_writer / open_reader 提供流式读写，按产物类型的压缩策略透明地压缩 / 解压（gzip / zstd），
+    调用方不需要先在内存中拼出完整内容。
+    """
+
+    def __init__(self, compression: Union[str, Dict[str, str], None] = None):
+        """
+        初始化存储服务
+
+        Args:
+            compression: 压缩策略（产物类型 → none/gzip/zstd，或 "report=gzip,data=zstd" 形式的字符串）
+        """
+        self.compression_policy = CompressionPolicy(compression)
+
     @abstractmethod
-    def save_report(self, content: bytes, filename: str, report_type: str) -> str:
-        """保存报告文件"""
+    def _open_raw_writer(self, relative_path: str) -> Any:
+        """打开后端原始写入对象（需要 write / commit / abort 方法）"""
+        pass
+
+    @abstractmethod
+    def _open_raw_reader(self, relative_path: str) -> IO[bytes]:
+        """打开后端原始字节流"""
+        pass
+
+    @abstractmethod
+    def _location(self, relative_path: str) -> str:
+        """相对路径对应的完整位置（本地路径或对象 URI）"""
+        pass
+
+    @abstractmethod
+    def _list_files(self, relative_prefix: str) -> List[str]:
+        """列出前缀下的所有文件（相对路径）"""
         pass
-    
+
     @abstractmethod
+    def _delete_files(self, relative_paths: List[str]):
+        """删除文件（不存在的文件忽略）"""
+        pass
+
+    def _on_saved(self, relative_path: str, artifact_type: str, writer: StorageWriter):
+        """文件写入完成后的回调（子类可用于记录清单）"""
+        pass
+
+    def _set_modified_time(self, relative_path: str, timestamp: float):
+        """设置文件修改时间（对象存储不支持时忽略）"""
+        pass
+
+    def open_writer(
+        self,
+        relative_path: str,
+        artifact_type: str = "report",
+        compression: Optional[str] = None,
+        encoding: Optional[str] = None,
+        newline: Optional[str] = None,
+        compression_level: Optional[int] = None,
+    ) -> StorageWriter:
+        """
+        打开流式写入器
+
+        Args:
+            relative_path: 相对路径（压缩时自动追加 .gz / .zst 后缀）
+            artifact_type: 产物类型（report/data/export），决定默认的压缩算法
+            compression: 指定压缩算法（覆盖压缩策略）
+            encoding: 文本编码（提供时按文本写入）
+            newline: 换行符处理（文本模式，写 CSV 时传 ""）
+            compression_level: 压缩级别（None 使用默认值）
+
+        Returns:
+            写入器（配合 with 使用，正常退出时完成写入，写入位置见 writer.path）
+        """
+        codec = resolve_codec(compression) if compression is not None else self.compression_policy.codec_for(artifact_type)
+        relative_path = with_codec_suffix(relative_path, codec)
+        return StorageWriter(
+            self._open_raw_writer(relative_path),
+            self._location(relative_path),
+            codec=codec,
+            encoding=encoding,
+            newline=newline,
+            on_commit=lambda writer: self._on_saved(relative_path, artifact_type, writer),
+            compression_level=compression_level,
+        )
+
+    @contextmanager
+    def open_reader(
+        self,
+        relative_path: str,
+        encoding: Optional[str] = None,
+        newline: Optional[str] = None,
+    ) -> Iterator[IO[Any]]:
+        """
+        打开流式读取器（根据文件后缀自动解压）
+
+        Args:
+            relative_path: 相对路径（含压缩后缀）
+            encoding: 文本编码（提供时按文本读取）
+            newline: 换行符处理（文本模式）
+
+        Yields:
+            字节流或文本流
+        """
+        raw = self._open_raw_reader(relative_path)
+        stream = decompress_reader(raw, codec_from_path(relative_path))
+        text = io.TextIOWrapper(stream, encoding=encoding, newline=newline) if encoding else None
+        try:
+            yield text or stream
+        finally:
+            if text is not None:
+                text.close()
+            stream.close()
+            raw.close()
+
+    def save_report(self, content: bytes, filename: str, report_type: str) -> str:
+        """保存报告文件"""
+        with self.open_writer(f"reports/{report_type}/{filename}", "report") as writer:
+            writer.write(content)
+        logger.info(f"报告已保存: {writer.path}")
+        return writer.path
+
     def save_data(self, data: dict, filename: str) -> str:
         """保存数据文件"""
-        pass
-    
+        with self.open_writer(f"data/{filename}", "data") as writer:
+            writer.write(jsoncodec.dumps_bytes(data, indent=2))
+        logger.info(f"数据已保存: {writer.path}")
+        return writer.path
+
+    def list_partitions(
+        self,
+        app_id: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[str]:
+        """
+        列出与日期范围有交集的分区文件（包括压缩后的周 / 月分区）
+
+        Args:
+            app_id: 应用 ID
+            start: 起始日期（含）
+            end: 结束日期（不含）
+
+        Returns:
+            分区文件的相对路径（按分区起始日期排序）
+        """
+        partitions = []
+        for relative_path in self._list_files(f"{PARTITIONS_DIR}/{app_id}/"):
+            info = parse_partition_path(relative_path)
+            if info is None:
+                continue
+            if start is not None and info["end"] <= start:
+                continue
+            if end is not None and info["start"] >= end:
+                continue
+            partitions.append((info["start"], relative_path))
+        return [relative_path for _, relative_path in sorted(partitions)]
+
+    def compact_partitions(
+        self,
+        app_id: Optional[str] = None,
+        granularity: str = "weekly",
+        min_age_days: int = 7,
+        compression: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        把已经结束的周期内的日分区合并为一个周 / 月分区文件
+
+        合并后的文件按压缩策略压缩（默认不压缩），修改时间设为周期结束时间，过期清理按整个周期删除。
+        重新读取合并结果校验内容的 SHA-256 与各日分区拼接后一致后才删除日分区；
+        周期内已有合并文件时（日分区补写晚到），会和新的日分区一起重新合并。
+
+        Args:
+            app_id: 应用 ID（None 表示所有应用）
+            granularity: 合并粒度（weekly/monthly）
+            min_age_days: 周期结束至少多少天后才合并（给晚到的数据留出时间）
+            compression: 合并文件的压缩算法（None 使用 data 的压缩策略）
+
+        Returns:
+            {"compacted": 合并后的文件列表, "merged_files": 合并的日分区数, "records": 合并的记录数}
+
+        Raises:
+            DifyStorageError: 校验失败（保留日分区）
+        """
+        if granularity not in ("weekly", "monthly"):
+            raise ValueError(f"不支持的合并粒度: {granularity}（可选: weekly/monthly）")
+
+        cutoff = date.today() - timedelta(days=min_age_days)
+        prefix = f"{PARTITIONS_DIR}/{app_id}/" if app_id else f"{PARTITIONS_DIR}/"
+        groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for relative_path in self._list_files(prefix):
+            info = parse_partition_path(relative_path)
+            if info is None or info["granularity"] not in ("daily", granularity):
+                continue
+            key = info["key"] if info["granularity"] == granularity else partition_key(info["start"], granularity)
+            group = groups.setdefault((info["app_id"], key), {"daily": [], "existing": []})
+            if info["granularity"] == "daily":
+                group["daily"].append((info["start"], relative_path))
+            else:
+                group["existing"].append(relative_path)
+
+        result = {"compacted": [], "merged_files": 0, "records": 0}
+        for (group_app_id, key), group in sorted(groups.items()):
+            start, end = partition_period(key, granularity)
+            if not group["daily"] or end > cutoff:
+                continue
+            sources = group["existing"] + [relative_path for _, relative_path in sorted(group["daily"])]
+            path, records = self._compact_group(group_app_id, start, end, granularity, sources, compression)
+            result["compacted"].append(path)
+            result["merged_files"] += len(group["daily"])
+            result["records"] += records
+
+        logger.info(
+            f"分区合并完成: {len(result['compacted'])} 个{granularity}分区，"
+            f"合并 {result['merged_files']} 个日分区，{result['records']} 条记录"
+        )
+        return result
+
+    def _compact_group(
+        self,
+        app_id: str,
+        start: date,
+        end: date,
+        granularity: str,
+        sources: List[str],
+        compression: Optional[str],
+    ) -> Tuple[str, int]:
+        """合并一个周期的分区文件，校验通过后删除源文件，返回 (合并文件位置, 记录数)"""
+        digest = hashlib.sha256()
+        records = 0
+        with self.open_writer(partition_path(app_id, start, granularity), "data", compression=compression) as writer:
+            for source in sources:
+                last = b"\n"
+                with self.open_reader(source) as reader:
+                    for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+                        writer.write(chunk)
+                        digest.update(chunk)
+                        records += chunk.count(b"\n")
+                        last = chunk[-1:]
+                # 每个分区按行拼接，缺少结尾换行时补上
+                if last != b"\n":
+                    writer.write(b"\n")
+                    digest.update(b"\n")
+                    records += 1
+
+        target = with_codec_suffix(partition_path(app_id, start, granularity), writer.codec)
+        verify = hashlib.sha256()
+        with self.open_reader(target) as reader:
+            for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+                verify.update(chunk)
+        if verify.hexdigest() != digest.hexdigest():
+            raise DifyStorageError(f"分区合并校验失败，已保留日分区: {writer.path}")
+
+        self._delete_files([source for source in sources if source != target])
+        self._set_modified_time(target, _date_timestamp(end))
+        logger.debug(f"已合并 {len(sources)} 个分区: {writer.path}")
+        return writer.path, records
+
     @abstractmethod
     def list_reports(self, report_type: str, days: int = 30) -> List[str]:
         """列出报告文件"""
         pass
-    
+
     @abstractmethod
     def cleanup_old_files(self, days: int) -> int:
         """清理旧文件"""
@@ -36,102 +496,193 @@ class StorageService(ABC):
 
 
 class LocalStorageService(StorageService):
-    """本地文件存储服务"""
-    
-    def __init__(self, base_dir: str = "./outputs"):
+    """本地文件存储服务（写入的文件记录在产物清单中，列表和清理直接查询清单）"""
+
+    def __init__(
+        self,
+        base_dir: str = "./outputs",
+        compression: Union[str, Dict[str, str], None] = None,
+        manifest: bool = True,
+    ):
         """
         初始化本地存储服务
-        
+
         Args:
             base_dir: 基础目录
+            compression: 压缩策略
+            manifest: 是否使用产物清单（关闭时列表和清理直接遍历目录）
         """
+        super().__init__(compression)
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
-    
-    def save_report(self, content: bytes, filename: str, report_type: str) -> str:
-        """保存报告文件"""
-        report_dir = self.base_dir / "reports" / report_type
-        report_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = report_dir / filename
-        file_path.write_bytes(content)
-        
-        logger.info(f"报告已保存: {file_path}")
-        return str(file_path)
-    
-    def save_data(self, data: dict, filename: str) -> str:
-        """保存数据文件"""
-        import json
-        
-        data_dir = self.base_dir / "data"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = data_dir / filename
-        file_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-        
-        logger.info(f"数据已保存: {file_path}")
-        return str(file_path)
-    
+        self.manifest: Optional[ArtifactManifest] = None
+        if manifest:
+            self.manifest = ArtifactManifest(str(self.base_dir))
+            if self.manifest.created:
+                # 首次启用清单时补录已有文件
+                self.manifest.reconcile()
+
+    def _open_raw_writer(self, relative_path: str) -> AtomicFile:
+        return AtomicFile(self.base_dir / relative_path, "wb")
+
+    def _open_raw_reader(self, relative_path: str) -> IO[bytes]:
+        try:
+            return open(self.base_dir / relative_path, "rb")
+        except OSError as e:
+            raise DifyStorageError(f"读取失败: {self.base_dir / relative_path}: {e}") from e
+
+    def _location(self, relative_path: str) -> str:
+        return str(self.base_dir / relative_path)
+
+    def _list_files(self, relative_prefix: str) -> List[str]:
+        if self.manifest is not None:
+            return [row["path"] for row in self.manifest.query(path_prefix=relative_prefix)]
+        dir_path = self.base_dir / relative_prefix
+        if not dir_path.exists():
+            return []
+        return sorted(
+            file_path.relative_to(self.base_dir).as_posix()
+            for file_path in dir_path.rglob("*")
+            if file_path.is_file() and not file_path.name.startswith(".")
+        )
+
+    def _delete_files(self, relative_paths: List[str]):
+        for relative_path in relative_paths:
+            file_path = self.base_dir / relative_path
+            try:
+                file_path.unlink()
+            except FileNotFoundError:
+                pass
+            logger.debug(f"已删除文件: {file_path}")
+        if self.manifest is not None:
+            self.manifest.remove(relative_paths)
+
+    def _set_modified_time(self, relative_path: str, timestamp: float):
+        file_path = self.base_dir / relative_path
+        os.utime(file_path, (timestamp, timestamp))
+        if self.manifest is not None:
+            kind = ArtifactManifest.classify(relative_path)
+            if kind is not None:
+                self.manifest.record(file_path, kind["artifact_type"], kind["report_type"])
+
+    def _on_saved(self, relative_path: str, artifact_type: str, writer: StorageWriter):
+        if self.manifest is None:
+            return
+        kind = ArtifactManifest.classify(Path(relative_path).as_posix())
+        if kind is not None:
+            self.manifest.record(
+                self.base_dir / relative_path,
+                kind["artifact_type"],
+                kind["report_type"],
+                checksum=writer.checksum,
+            )
+
     def list_reports(self, report_type: str, days: int = 30) -> List[str]:
         """列出报告文件"""
-        report_dir = self.base_dir / "reports" / report_type
-        if not report_dir.exists():
-            return []
-        
-        from datetime import datetime, timedelta
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        reports = []
-        for file_path in report_dir.iterdir():
-            if file_path.is_file():
-                mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if mtime >= cutoff_date:
-                    reports.append(str(file_path))
-        
-        return sorted(reports)
-    
-    def cleanup_old_files(self, days: int) -> int:
-        """清理旧文件"""
-        from datetime import datetime, timedelta
-        
-        cutoff_date = datetime.now() - timedelta(days=days)
-        cleaned_count = 0
-        
-        for dir_path in [self.base_dir / "reports", self.base_dir / "data"]:
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        return self.list_artifacts(artifact_type="report", report_type=report_type, modified_after=cutoff)
+
+    def list_artifacts(
+        self,
+        artifact_type: Optional[str] = None,
+        report_type: Optional[str] = None,
+        modified_after: Optional[float] = None,
+        modified_before: Optional[float] = None,
+    ) -> List[str]:
+        """
+        按类型和修改时间范围列出文件
+
+        Args:
+            artifact_type: 产物类型（report/data）
+            report_type: 报告类型
+            modified_after: 修改时间下限（含，Unix 时间戳）
+            modified_before: 修改时间上限（不含，Unix 时间戳）
+
+        Returns:
+            文件路径列表（已排序）
+        """
+        if self.manifest is None:
+            return self._scan_artifacts(artifact_type, report_type, modified_after, modified_before)
+        rows = self.manifest.query(artifact_type, report_type, modified_after, modified_before)
+        return sorted(str(self.base_dir / row["path"]) for row in rows)
+
+    def _scan_artifacts(
+        self,
+        artifact_type: Optional[str],
+        report_type: Optional[str],
+        modified_after: Optional[float],
+        modified_before: Optional[float],
+    ) -> List[str]:
+        """未启用清单时遍历目录查询文件"""
+        results = []
+        for dir_name in ("reports", "data"):
+            dir_path = self.base_dir / dir_name
             if not dir_path.exists():
                 continue
-            
             for file_path in dir_path.rglob("*"):
-                if file_path.is_file():
-                    mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
-                    if mtime < cutoff_date:
-                        file_path.unlink()
-                        cleaned_count += 1
-                        logger.debug(f"已删除旧文件: {file_path}")
-        
+                if not file_path.is_file() or file_path.name.startswith("."):
+                    continue
+                kind = ArtifactManifest.classify(file_path.relative_to(self.base_dir).as_posix())
+                if kind is None:
+                    continue
+                if artifact_type is not None and kind["artifact_type"] != artifact_type:
+                    continue
+                if report_type is not None and kind["report_type"] != report_type:
+                    continue
+                mtime = file_path.stat().st_mtime
+                if modified_after is not None and mtime < modified_after:
+                    continue
+                if modified_before is not None and mtime >= modified_before:
+                    continue
+                results.append(str(file_path))
+        return sorted(results)
+
+    def cleanup_old_files(self, days: int) -> int:
+        """清理旧文件"""
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        if self.manifest is None:
+            expired = [
+                os.path.relpath(path, self.base_dir)
+                for path in self._scan_artifacts(None, None, None, cutoff)
+            ]
+        else:
+            expired = [row["path"] for row in self.manifest.query(modified_before=cutoff)]
+
+        # 合并后的周 / 月分区修改时间为周期结束时间，整个周期过期后才会被删除
+        self._delete_files(expired)
+
+        cleaned_count = len(expired)
         logger.info(f"已清理 {cleaned_count} 个旧文件")
         return cleaned_count
 
+    def reconcile_manifest(self) -> Dict[str, int]:
+        """从磁盘重建产物清单"""
+        if self.manifest is None:
+            raise DifyStorageError("未启用产物清单")
+        return self.manifest.reconcile()
+
 
 def create_storage_service(storage_type: str = "local", **kwargs) -> StorageService:
     """
     创建存储服务实例
-    
+
     Args:
         storage_type: 存储类型 (local/oss/s3)
-        **kwargs: 存储服务配置参数
-    
+        **kwargs: 存储服务配置参数（compression 压缩策略；s3: bucket_name、endpoint_url、access_key_id、secret_access_key、region、prefix 等）
+
     Returns:
         存储服务实例
     """
     if storage_type == "local":
         base_dir = kwargs.get("base_dir", "./outputs")
-        return LocalStorageService(base_dir=base_dir)
+        return LocalStorageService(base_dir=base_dir, compression=kwargs.get("compression"))
     elif storage_type == "oss":
         # TODO: 实现 OSS 存储服务
         raise NotImplementedError("OSS 存储服务尚未实现")
     elif storage_type == "s3":
-        # TODO: 实现 S3 存储服务
-        raise NotImplementedError("S3 存储服务尚未实现")
+        # 延迟导入，未使用 S3 时不需要安装 boto3
+        from src.services.s3_storage import S3StorageService
+        options = {key: value for key, value in kwargs.items() if value is not None}
+        return S3StorageService(**options)
     else:
         raise ValueError(f"不支持的存储类型: {storage_type}")
@@ -0,0 +1,261 @@
+"""HTTP Webhook 批量推送"""
+
+import gzip
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import requests
+from tenacity import (
+    Retrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from src.core.exceptions import DifyWebhookError
+from src.core.logger import get_logger
+from src.utils.retry import RETRYABLE_STATUS, parse_retry_after
+
+logger = get_logger(__name__)
+
+
+class _RetryableWebhookError(DifyWebhookError):
+    """可以重试的推送失败"""
+
+
+class _Batch(NamedTuple):
+    """一个批次：第一条记录的序号、记录内容和记录 ID"""
+
+    first_index: int
+    lines: List[bytes]
+    record_ids: List[str]
+
+
+def batch_idempotency_key(first_index: int, record_ids: List[str]) -> str:
+    """
+    批次的 Idempotency-Key
+
+    由批次第一条记录的序号和各条记录的 ID 计算，与推送时机、线程调度无关：
+    同样的记录按同样的顺序重新推送（重试、重新运行）时得到同一个键。
+
+    Args:
+        first_index: 批次第一条记录的序号（从 0 开始）
+        record_ids: 批次中各条记录的 ID
+
+    Returns:
+        十六进制的 SHA-256
+    """
+    payload = f"{first_index}\n" + "\n".join(record_ids)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class WebhookBatchSender:
+    """
+    按批次把 NDJSON 记录推送到 HTTP 接口
+
+    记录先缓存，达到条数 / 字节数上限时打包成一个批次，gzip 压缩后 POST 到目标地址。
+    批次只按记录序号和内容切分（不按等待时间），同样的记录总是得到同样的批次。
+    同时在途的批次不超过 max_in_flight，超过时 add 会等待（背压）。
+    每个批次带 Idempotency-Key（见 batch_idempotency_key），重试和重新运行都使用同一个键，下游可以据此去重。
+    暂时性错误（连接失败、408/429/5xx）按指数退避重试并遵循 Retry-After，重试耗尽或其他 4xx 时
+    批次中的记录追加到死信文件，不会中断报告生成。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        batch_max_records: int = 500,
+        batch_max_bytes: int = 1024 * 1024,
+        max_in_flight: int = 4,
+        max_retries: int = 5,
+        retry_max_wait: float = 30.0,
+        timeout: float = 30.0,
+        compresslevel: int = 6,
+        spool_path: Optional[str] = None,
+    ):
+        """
+        初始化推送器
+
+        Args:
+            url: 目标地址
+            headers: 额外的请求头（如 Authorization）
+            batch_max_records: 每个批次最多的记录数
+            batch_max_bytes: 每个批次最多的字节数（压缩前）
+            max_in_flight: 同时在途的批次数
+            max_retries: 每个批次最多重试次数
+            retry_max_wait: 单次重试最长等待时间（秒）
+            timeout: 请求超时（秒）
+            compresslevel: gzip 压缩级别
+            spool_path: 死信文件路径（None 表示只记录日志）
+        """
+        self.url = url
+        self.batch_max_records = max(batch_max_records, 1)
+        self.batch_max_bytes = max(batch_max_bytes, 1)
+        self.max_retries = max(max_retries, 0)
+        self.retry_max_wait = retry_max_wait
+        self.timeout = timeout
+        self.compresslevel = compresslevel
+        self.spool_path = Path(spool_path) if spool_path else None
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/x-ndjson",
+            "Content-Encoding": "gzip",
+        })
+        self.session.headers.update(headers or {})
+
+        self.stats = {"batches": 0, "records": 0, "failed_batches": 0, "failed_records": 0}
+        self._buffer: List[bytes] = []
+        self._buffer_ids: List[str] = []
+        self._buffer_bytes = 0
+        self._buffer_start = 0
+        self._next_index = 0
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max(max_in_flight, 1))
+        self._executor = ThreadPoolExecutor(max_workers=max(max_in_flight, 1), thread_name_prefix="webhook")
+        self._futures: List[Future] = []
+
+    def add(self, line: bytes, record_id: Optional[str] = None):
+        """
+        添加一条记录（一行 NDJSON，不含换行符）
+
+        Args:
+            line: 序列化后的记录
+            record_id: 记录 ID（用于计算批次的 Idempotency-Key，None 时使用记录内容的哈希）
+        """
+        if record_id is None:
+            record_id = hashlib.sha256(line).hexdigest()
+        with self._lock:
+            self._buffer.append(line)
+            self._buffer_ids.append(str(record_id))
+            self._buffer_bytes += len(line) + 1
+            self._next_index += 1
+            full = len(self._buffer) >= self.batch_max_records or self._buffer_bytes >= self.batch_max_bytes
+            batch = self._take_batch() if full else None
+        if batch:
+            self._submit(batch)
+
+    def _take_batch(self) -> Optional[_Batch]:
+        """取出当前缓存（调用方持有锁）"""
+        if not self._buffer:
+            return None
+        batch = _Batch(self._buffer_start, self._buffer, self._buffer_ids)
+        self._buffer, self._buffer_ids = [], []
+        self._buffer_bytes = 0
+        self._buffer_start = self._next_index
+        return batch
+
+    def _submit(self, batch: _Batch):
+        """提交一个批次（在途批次已满时等待）"""
+        self._in_flight.acquire()
+        future = self._executor.submit(self._deliver, batch)
+        future.add_done_callback(lambda _: self._in_flight.release())
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(future)
+
+    def _deliver(self, batch: _Batch):
+        """推送一个批次，失败时写入死信文件"""
+        payload = b"\n".join(batch.lines) + b"\n"
+        key = batch_idempotency_key(batch.first_index, batch.record_ids)
+        body = gzip.compress(payload, compresslevel=self.compresslevel, mtime=0)
+        try:
+            for attempt in Retrying(
+                stop=stop_after_attempt(self.max_retries + 1),
+                wait=self._wait,
+                retry=retry_if_exception_type((_RetryableWebhookError, requests.ConnectionError, requests.Timeout)),
+                reraise=True,
+            ):
+                with attempt:
+                    self._post(body, key, len(batch.lines))
+        except Exception as e:
+            self._dead_letter(batch.lines, key, e)
+            return
+
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["records"] += len(batch.lines)
+        logger.debug(f"已推送批次 {key[:12]}: {len(batch.lines)} 条记录，{len(body)} 字节")
+
+    def _wait(self, retry_state) -> float:
+        """重试等待：优先使用 Retry-After，否则使用带随机抖动的指数退避"""
+        error = retry_state.outcome.exception()
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.retry_max_wait)
+        return wait_random_exponential(multiplier=0.5, max=self.retry_max_wait)(retry_state)
+
+    def _post(self, body: bytes, key: str, record_count: int):
+        response = self.session.post(
+            self.url,
+            data=body,
+            headers={"Idempotency-Key": key, "X-Batch-Records": str(record_count)},
+            timeout=self.timeout,
+        )
+        if response.ok:
+            return
+        message = f"HTTP {response.status_code}: {response.text[:200]}"
+        if response.status_code in RETRYABLE_STATUS:
+            raise _RetryableWebhookError(
+                message,
+                status_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+        raise DifyWebhookError(message, status_code=response.status_code)
+
+    def _dead_letter(self, batch: List[bytes], key: str, error: Exception):
+        """把推送失败的批次追加到死信文件（每行一条原始记录，可以直接重新推送）"""
+        with self._lock:
+            self.stats["failed_batches"] += 1
+            self.stats["failed_records"] += len(batch)
+        if self.spool_path is None:
+            logger.error(f"批次 {key[:12]} 推送失败，丢弃 {len(batch)} 条记录: {error}")
+            return
+        with self._spool_lock:
+            self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_path, "ab") as f:
+                f.write(b"\n".join(batch) + b"\n")
+        logger.error(f"批次 {key[:12]} 推送失败，{len(batch)} 条记录已写入死信文件 {self.spool_path}: {error}")
+
+    def flush(self):
+        """推送缓存中的记录并等待所有在途批次完成"""
+        with self._lock:
+            batch = self._take_batch()
+        if batch:
+            self._submit(batch)
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.result()
+
+    def close(self) -> Dict[str, Any]:
+        """
+        推送剩余记录并关闭
+
+        Returns:
+            推送统计（batches、records、failed_batches、failed_records）
+        """
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self.session.close()
+        return dict(self.stats)
+
+    def abort(self) -> Dict[str, Any]:
+        """
+        丢弃缓存中尚未推送的记录，等待在途批次完成后关闭
+
+        Returns:
+            推送统计（batches、records、failed_batches、failed_records）
+        """
+        with self._lock:
+            dropped = self._take_batch()
+        if dropped:
+            logger.warning(f"报告生成中断，{len(dropped.lines)} 条记录未推送")
+        self._executor.shutdown(wait=True)
+        self.session.close()
+        return dict(self.stats)
@@ -0,0 +1,152 @@
+"""原子文件写入"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional, Union
+
+# mkstemp 创建的临时文件权限为 0600，替换前改为普通文件的默认权限（0666 去掉 umask）
+_default_permissions: Optional[int] = None
+_default_permissions_lock = threading.Lock()
+
+
+def _read_umask() -> int:
+    """
+    读取进程的 umask（不修改它）
+
+    os.umask 只能先设置再恢复，期间其他线程创建的文件会得到错误的权限，所以这里优先读取
+    /proc/self/status，不可用时创建一个探测文件，用它的实际权限推算。
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    probe_dir = tempfile.mkdtemp(prefix=".umask.")
+    try:
+        probe = os.path.join(probe_dir, "probe")
+        os.close(os.open(probe, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+        return 0o666 & ~(os.stat(probe).st_mode & 0o777)
+    finally:
+        try:
+            os.unlink(os.path.join(probe_dir, "probe"))
+        except OSError:
+            pass
+        os.rmdir(probe_dir)
+
+
+def default_file_permissions() -> int:
+    """普通文件的默认权限（0666 去掉 umask，首次调用时读取并缓存）"""
+    global _default_permissions
+    with _default_permissions_lock:
+        if _default_permissions is None:
+            _default_permissions = 0o666 & ~_read_umask()
+        return _default_permissions
+
+
+class AtomicFile:
+    """
+    原子写入的文件
+
+    内容写入同目录下的临时文件，commit 时通过 os.replace 替换目标文件，abort 时删除临时文件，
+    目标文件保持原样。读取方不会看到写了一半的文件。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        mode: str = "wb",
+        encoding: Optional[str] = None,
+        newline: Optional[str] = None,
+        permissions: Optional[int] = None,
+    ):
+        """
+        打开临时文件
+
+        Args:
+            path: 目标文件路径
+            mode: 打开模式（"w" 或 "wb"）
+            encoding: 文本编码（文本模式）
+            newline: 换行符处理（文本模式，写 CSV 时传 ""）
+            permissions: 目标文件权限（None 表示普通文件的默认权限；临时文件创建时即为 0600，
+                传 0o600 时整个过程中文件都不会对其他用户可读）
+        """
+        self.path = Path(path)
+        self.permissions = permissions
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp_name = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=str(self.path.parent))
+        self.file: IO[Any] = os.fdopen(fd, mode, encoding=encoding, newline=newline)
+
+    def write(self, data: Any) -> int:
+        return self.file.write(data)
+
+    def commit(self):
+        """关闭临时文件并替换目标文件"""
+        try:
+            self.file.close()
+            permissions = default_file_permissions() if self.permissions is None else self.permissions
+            if permissions != 0o600:
+                os.chmod(self.tmp_name, permissions)
+            os.replace(self.tmp_name, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """关闭并删除临时文件"""
+        self.file.close()
+        try:
+            os.unlink(self.tmp_name)
+        except OSError:
+            pass
+
+
+@contextmanager
+def atomic_open(
+    path: Union[str, Path],
+    mode: str = "w",
+    encoding: Optional[str] = None,
+    newline: Optional[str] = None,
+    permissions: Optional[int] = None,
+) -> Iterator[IO[Any]]:
+    """
+    以原子方式写入文件（正常结束时替换目标文件，出现异常时目标文件保持原样）
+
+    Args:
+        path: 目标文件路径
+        mode: 打开模式（"w" 或 "wb"）
+        encoding: 文本编码（文本模式）
+        newline: 换行符处理（文本模式，写 CSV 时传 ""）
+        permissions: 目标文件权限（None 表示普通文件的默认权限）
+
+    Yields:
+        临时文件对象
+    """
+    atomic_file = AtomicFile(path, mode, encoding=encoding, newline=newline, permissions=permissions)
+    try:
+        yield atomic_file.file
+    except BaseException:
+        atomic_file.abort()
+        raise
+    atomic_file.commit()
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes, permissions: Optional[int] = None) -> None:
+    """以原子方式写入字节内容（permissions 为目标文件权限，None 表示默认权限）"""
+    with atomic_open(path, "wb", permissions=permissions) as f:
+        f.write(data)
+
+
+def atomic_write_text(
+    path: Union[str, Path],
+    text: str,
+    encoding: str = "utf-8",
+    permissions: Optional[int] = None,
+) -> None:
+    """以原子方式写入文本内容（permissions 为目标文件权限，None 表示默认权限）"""
+    with atomic_open(path, "w", encoding=encoding, permissions=permissions) as f:
+        f.write(text)
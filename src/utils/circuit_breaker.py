@@ -0,0 +1,234 @@
+"""接口熔断器"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    单个接口的熔断器（closed / open / half_open）
+
+    - closed：正常请求，连续失败 failure_threshold 次后进入 open；
+    - open：不再请求该接口，调用方直接按失败处理；经过 reset_timeout 秒后进入 half_open；
+    - half_open：只放行一个探测请求，成功则回到 closed，失败则重新进入 open。
+
+    接口不可用（服务故障、账户密码错误）时，剩余的日志不再逐条请求、逐条重新登录，运行很快结束并保留部分数据。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: Optional[float] = 300.0):
+        """
+        初始化熔断器
+
+        Args:
+            name: 接口名称
+            failure_threshold: 连续失败多少次后熔断
+            reset_timeout: 熔断后多少秒允许一次探测请求（None 表示本次运行内不再恢复）
+        """
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        """当前状态（open 状态超过 reset_timeout 后视为 half_open）"""
+        with self._lock:
+            if self._state == OPEN and self._reset_due():
+                return HALF_OPEN
+            return self._state
+
+    def _reset_due(self) -> bool:
+        return self.reset_timeout is not None and time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """
+        判断是否可以发出请求
+
+        Returns:
+            closed 时返回 True；open 时返回 False；half_open 时只有一个调用方得到 True（探测请求）
+        """
+        with self._lock:
+            if self._state == OPEN and self._reset_due():
+                self._state = HALF_OPEN
+                logger.info(f"接口 {self.name} 熔断 {self.reset_timeout:g} 秒后尝试恢复（half_open）")
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        """记录一次成功请求"""
+        with self._lock:
+            self.stats["successes"] += 1
+            self._consecutive_failures = 0
+            self._probing = False
+            if self._state != CLOSED:
+                logger.info(f"接口 {self.name} 已恢复，关闭熔断")
+                self._state = CLOSED
+
+    def record_failure(self, error: Any = None):
+        """
+        记录一次失败请求
+
+        Args:
+            error: 失败原因
+        """
+        with self._lock:
+            self.stats["failures"] += 1
+            self._consecutive_failures += 1
+            if error is not None:
+                self.last_error = str(error)
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self.stats["opened"] += 1
+                retry = f"{self.reset_timeout:g} 秒后再尝试" if self.reset_timeout is not None else "本次运行内不再请求"
+                logger.warning(
+                    f"接口 {self.name} 连续失败 {self._consecutive_failures} 次，已熔断（{retry}）: {self.last_error}"
+                )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        熔断器状态
+
+        Returns:
+            {state, consecutive_failures, opened, rejected, failures, successes, last_error}
+        """
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                **self.stats,
+                "last_error": self.last_error,
+            }
+
+
+class CircuitBreakers:
+    """一次运行内按接口名称共享的熔断器"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: Optional[float] = 300.0):
+        """
+        初始化熔断器集合
+
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            reset_timeout: 熔断后多少秒允许一次探测请求（None 表示本次运行内不再恢复）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """
+        获取接口的熔断器（不存在时创建）
+
+        Args:
+            name: 接口名称
+
+        Returns:
+            熔断器
+        """
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+                self._breakers[name] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        所有熔断器的状态
+
+        Returns:
+            {接口名称: 熔断器状态}
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def create_circuit_breakers() -> CircuitBreakers:
+    """
+    按环境变量创建熔断器集合
+
+    读取 CIRCUIT_BREAKER_FAILURE_THRESHOLD（默认 5）、CIRCUIT_BREAKER_RESET_TIMEOUT
+    （默认 300 秒，设置为 0 表示本次运行内不再恢复）。
+
+    Returns:
+        熔断器集合
+    """
+    reset_timeout = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", "300"))
+    return CircuitBreakers(
+        failure_threshold=int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5")),
+        reset_timeout=reset_timeout or None,
+    )
+
+
+_current_breakers: "contextvars.ContextVar[Optional[CircuitBreakers]]" = contextvars.ContextVar(
+    "circuit_breakers", default=None
+)
+_DEFAULT_BREAKERS: Optional[CircuitBreakers] = None
+_DEFAULT_BREAKERS_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def circuit_breaker_scope(breakers: CircuitBreakers) -> Iterator[CircuitBreakers]:
+    """
+    在当前上下文内使用指定的熔断器集合
+
+    Flow 中提交的 Task（线程任务执行器会复制上下文）共享同一组熔断器。
+
+    Args:
+        breakers: 熔断器集合
+    """
+    token = _current_breakers.set(breakers)
+    try:
+        yield breakers
+    finally:
+        _current_breakers.reset(token)
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    获取当前上下文中接口的熔断器（不在 circuit_breaker_scope 内时使用进程内共享的熔断器）
+
+    Args:
+        name: 接口名称
+
+    Returns:
+        熔断器
+    """
+    global _DEFAULT_BREAKERS
+    breakers = _current_breakers.get()
+    if breakers is None:
+        with _DEFAULT_BREAKERS_LOCK:
+            if _DEFAULT_BREAKERS is None:
+                _DEFAULT_BREAKERS = create_circuit_breakers()
+            breakers = _DEFAULT_BREAKERS
+    return breakers.get(name)
@@ -0,0 +1,143 @@
+"""存储压缩编解码"""
+
+import gzip
+import io
+from typing import IO, Dict, Optional, Union
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+CODEC_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# 默认策略：所有产物都不压缩，文件名和内容与未引入压缩前一致（save_data 仍写 data/*.json），
+# 需要压缩时通过策略显式开启（如 "data=gzip"）
+DEFAULT_POLICY = {"report": "none", "export": "none", "data": "none"}
+
+_zstd_warned = False
+
+
+def _load_zstd():
+    """加载 zstd 实现（标准库 compression.zstd 或 zstandard），都不可用时返回 None"""
+    try:
+        from compression import zstd  # Python 3.14+
+        return "stdlib", zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return "zstandard", zstandard
+    except ImportError:
+        return None
+
+
+def resolve_codec(codec: Optional[str]) -> str:
+    """
+    规范化压缩算法名称
+
+    zstd 不可用时回退到 gzip（只提示一次）。
+
+    Args:
+        codec: none/gzip/zstd（None 视为 none）
+
+    Returns:
+        实际使用的压缩算法
+    """
+    global _zstd_warned
+    codec = (codec or "none").strip().lower()
+    if codec in ("gz",):
+        codec = "gzip"
+    if codec in ("zst",):
+        codec = "zstd"
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"不支持的压缩算法: {codec}（可选: {', '.join(CODEC_SUFFIXES)}）")
+    if codec == "zstd" and _load_zstd() is None:
+        if not _zstd_warned:
+            logger.warning("未安装 zstandard，zstd 压缩回退为 gzip")
+            _zstd_warned = True
+        codec = "gzip"
+    return codec
+
+
+def codec_from_path(path: str) -> str:
+    """根据文件后缀判断压缩算法"""
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if suffix and path.endswith(suffix):
+            return codec
+    return "none"
+
+
+def with_codec_suffix(path: str, codec: str) -> str:
+    """给路径追加压缩后缀（已有后缀时不重复追加）"""
+    suffix = CODEC_SUFFIXES[codec]
+    return path if not suffix or path.endswith(suffix) else path + suffix
+
+
+def compress_writer(raw: IO[bytes], codec: str, level: Optional[int] = None) -> IO[bytes]:
+    """
+    在字节流外包一层压缩写入器（关闭压缩写入器不会关闭 raw）
+
+    Args:
+        raw: 底层字节流
+        codec: 压缩算法
+        level: 压缩级别（None 使用默认值：gzip 6，zstd 3）
+    """
+    if codec == "none":
+        return raw
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6 if level is None else level, mtime=0)
+
+    impl, zstd = _load_zstd()
+    if impl == "stdlib":
+        return zstd.ZstdFile(raw, "wb", level=level)
+    return zstd.ZstdCompressor(level=3 if level is None else level).stream_writer(raw, closefd=False)
+
+
+def decompress_reader(raw: IO[bytes], codec: str) -> IO[bytes]:
+    """
+    在字节流外包一层解压读取器
+
+    Args:
+        raw: 底层字节流
+        codec: 压缩算法
+    """
+    if codec == "none":
+        return raw
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+
+    loaded = _load_zstd()
+    if loaded is None:
+        raise ValueError("读取 zstd 文件需要安装 zstandard")
+    impl, zstd = loaded
+    if impl == "stdlib":
+        return zstd.ZstdFile(raw, "rb")
+    return io.BufferedReader(zstd.ZstdDecompressor().stream_reader(raw, closefd=False, read_across_frames=True))
+
+
+class CompressionPolicy:
+    """
+    按产物类型选择压缩算法
+
+    例如 {"report": "none", "data": "gzip"}：报告不压缩，数据文件使用 gzip。
+    """
+
+    def __init__(self, policy: Union[str, Dict[str, str], None] = None):
+        """
+        初始化压缩策略
+
+        Args:
+            policy: 产物类型 → 压缩算法，也可以是 "report=gzip,data=zstd" 形式的字符串；
+                未出现的类型使用默认策略
+        """
+        self.policy = dict(DEFAULT_POLICY)
+        if isinstance(policy, str):
+            policy = dict(
+                item.split("=", 1) for item in policy.split(",") if "=" in item
+            )
+        for artifact_type, codec in (policy or {}).items():
+            self.policy[artifact_type.strip()] = codec.strip().lower()
+
+    def codec_for(self, artifact_type: str) -> str:
+        """产物类型对应的压缩算法"""
+        return resolve_codec(self.policy.get(artifact_type, "none"))
@@ -0,0 +1,101 @@
+"""报告输入指纹"""
+
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from src.core.logger import get_logger
+from src.utils import jsoncodec
+from src.utils.atomic import atomic_write_bytes
+
+logger = get_logger(__name__)
+
+# 报告内容的生成逻辑变化时递增，使旧指纹失效
+FINGERPRINT_VERSION = 1
+
+
+def compute_logs_fingerprint(logs_result: Dict[str, Any], **params: Any) -> str:
+    """
+    计算一次报告输入的指纹
+
+    指纹覆盖结果元数据、每条日志的 ID 和状态，以及日志内容（含运行详情、节点执行详情）的哈希，
+    再加上影响输出的参数（输出格式、配置等）。
+
+    Args:
+        logs_result: 日志数据结果
+        **params: 影响报告内容的其他参数（需要可 JSON 序列化）
+
+    Returns:
+        十六进制指纹字符串
+    """
+    digest = hashlib.sha256()
+    meta = {key: value for key, value in logs_result.items() if key != "data"}
+    digest.update(jsoncodec.dumps_bytes([FINGERPRINT_VERSION, meta, params], default=str))
+
+    for log in logs_result.get("data", []):
+        status = (log.get("workflow_run") or {}).get("status")
+        detail_hash = hashlib.blake2b(jsoncodec.dumps_bytes(log, default=str), digest_size=16).hexdigest()
+        digest.update(jsoncodec.dumps_bytes([log.get("id"), status, detail_hash]))
+
+    return digest.hexdigest()
+
+
+class ReportFingerprint:
+    """
+    报告输入指纹记录
+
+    保存在输出目录下的 .report_fingerprint.json，记录上次生成报告时的输入指纹和生成的文件列表。
+    """
+
+    FILENAME = ".report_fingerprint.json"
+
+    def __init__(self, output_dir: Union[str, Path]):
+        """
+        初始化指纹记录
+
+        Args:
+            output_dir: 报告输出目录
+        """
+        self.path = Path(output_dir) / self.FILENAME
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """读取上次的指纹记录，不存在或无法解析时返回 None"""
+        if not self.path.exists():
+            return None
+        try:
+            record = jsoncodec.loads(self.path.read_bytes())
+        except (OSError, jsoncodec.JSONDecodeError) as e:
+            logger.warning(f"读取报告指纹失败，将重新生成报告: {e}")
+            return None
+        return record if isinstance(record, dict) else None
+
+    def unchanged_reports(self, fingerprint: str) -> Optional[List[str]]:
+        """
+        指纹与上次一致且上次生成的文件都还在时，返回上次的文件列表
+
+        Args:
+            fingerprint: 本次输入的指纹
+
+        Returns:
+            上次生成的报告文件列表；需要重新生成时返回 None
+        """
+        record = self.load()
+        if not record or record.get("fingerprint") != fingerprint:
+            return None
+        report_files = record.get("report_files") or []
+        if not all(Path(path).exists() for path in report_files):
+            return None
+        return report_files
+
+    def save(self, fingerprint: str, report_files: List[str]):
+        """
+        保存本次的指纹记录
+
+        Args:
+            fingerprint: 本次输入的指纹
+            report_files: 本次生成的报告文件列表
+        """
+        atomic_write_bytes(
+            self.path,
+            jsoncodec.dumps_bytes({"fingerprint": fingerprint, "report_files": report_files}, indent=2),
+        )
@@ -1,9 +1,10 @@
 """格式化工具函数"""
 
-import json
 from typing import Any, Optional
 from datetime import datetime
 
+from src.utils import jsoncodec
+
 
 def format_timestamp(timestamp: Optional[float]) -> str:
     """格式化时间戳"""
@@ -15,30 +16,60 @@ def format_timestamp(timestamp: Optional[float]) -> str:
         return str(timestamp)
 
 
-def format_json_for_markdown(data: Any) -> str:
+def format_json_for_markdown(data: Any, max_chars: Optional[int] = None) -> str:
     """
     格式化 JSON 数据为 Markdown 友好的格式，处理 Unicode 编码
     
     Args:
         data: 要格式化的数据（可能是 dict、list 或 JSON 字符串）
+        max_chars: 需要的最大字符数（None 表示不限制）。遍历时累计已输出的字符数（下限估计），
+            超过后不再解码和遍历剩余部分，结果的前 max_chars 个字符与完整格式化的结果相同，
+            调用方按 max_chars 截断即可；大字段不再整体解码、格式化后才截断
     
     Returns:
-        格式化后的 JSON 字符串
+        格式化后的 JSON 字符串（指定 max_chars 时可能超过 max_chars）
     """
+    # 剩余可输出的字符数；每个值按其 JSON 写法的最小长度扣减（缩进和空白只会让实际输出更长）
+    remaining = [max_chars] if max_chars else None
+
+    def exhausted() -> bool:
+        return remaining is not None and remaining[0] <= 0
+
+    def spend(count: int):
+        if remaining is not None:
+            remaining[0] -= count
+
     def decode_json_strings(obj: Any) -> Any:
-        """递归解码嵌套的 JSON 字符串"""
+        """递归解码嵌套的 JSON 字符串（预算用完后容器只保留已遍历的元素，至少保留一个，保证前缀不变）"""
         if isinstance(obj, str):
             try:
-                parsed = json.loads(obj)
-                return decode_json_strings(parsed)
-            except (json.JSONDecodeError, TypeError):
+                parsed = jsoncodec.loads(obj)
+            except (jsoncodec.JSONDecodeError, TypeError):
+                if remaining is not None:
+                    obj = obj[:max(remaining[0], 0) + 1]
+                spend(len(obj) + 2)
                 return obj
+            return decode_json_strings(parsed)
         elif isinstance(obj, dict):
-            return {k: decode_json_strings(v) for k, v in obj.items()}
+            spend(1)
+            result = {}
+            for k, v in obj.items():
+                if result and exhausted():
+                    break
+                spend(len(str(k)) + 4)
+                result[k] = decode_json_strings(v)
+            return result
         elif isinstance(obj, list):
-            return [decode_json_strings(item) for item in obj]
+            spend(1)
+            result = []
+            for item in obj:
+                if result and exhausted():
+                    break
+                result.append(decode_json_strings(item))
+            return result
         else:
+            spend(len(str(obj)))
             return obj
     
     decoded_data = decode_json_strings(data)
-    return json.dumps(decoded_data, ensure_ascii=False, indent=2)
+    return jsoncodec.dumps(decoded_data, indent=2)
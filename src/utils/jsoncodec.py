@@ -0,0 +1,181 @@
+"""JSON 编解码
+
+项目中所有 JSON 编解码统一经过本模块。安装了 orjson 或 msgspec 时使用更快的后端，
+否则回退到标准库 json。可以通过环境变量 DIFY_JSON_BACKEND（auto/orjson/msgspec/json）固定后端。
+
+输出约定（与后端无关）：
+- 非 ASCII 字符原样输出（相当于 ensure_ascii=False）
+- indent=None 时输出紧凑格式（无空格），indent=2 时与 json.dumps(indent=2) 的格式一致
+
+已知差异：快速后端不支持 NaN/Infinity（快速后端会把它们写成 null，输出中有 null 时检查对象中是否有非有限浮点数）、
+非字符串键、超出 64 位的整数（编码时；解码时输入中有 20 位以上的数字）等时会自动回退到标准库；
+指数形式浮点数的写法不同（1e-07 会写成 1e-7），对格式有严格要求时可设置 DIFY_JSON_BACKEND=json。
+"""
+
+import json
+import math
+import os
+import re
+from typing import Any, Callable, Optional, Tuple, Union
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 调用方统一捕获的解码异常（各后端的解码异常都会转换为它）
+JSONDecodeError = json.JSONDecodeError
+
+_NON_FINITE_TOKENS = ("NaN", "Infinity")
+
+# 20 位及以上的数字（可能超出 64 位，orjson 会把它解析为有精度损失的浮点数）
+_LONG_NUMBER = re.compile(r"[:\[,]\s*-?\d{20,}")
+_LONG_NUMBER_BYTES = re.compile(_LONG_NUMBER.pattern.encode())
+
+
+def _std_loads(data: Union[str, bytes]) -> Any:
+    return json.loads(data)
+
+
+def _std_dumps(obj: Any, indent: Optional[int] = None, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    if indent is None:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, indent=indent, default=default)
+    return text.encode("utf-8")
+
+
+def _load_backend(name: str) -> Tuple[str, Callable, Callable, Tuple[type, ...], Tuple[type, ...]]:
+    """
+    加载 JSON 后端
+
+    Returns:
+        (后端名称, loads, dumps, 解码异常, 编码异常)
+    """
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+
+            def _orjson_dumps(obj, indent=None, default=None):
+                option = orjson.OPT_INDENT_2 if indent == 2 else 0
+                if indent not in (None, 2):
+                    raise TypeError(f"orjson 不支持 indent={indent}")
+                return orjson.dumps(obj, default=default, option=option)
+
+            return "orjson", orjson.loads, _orjson_dumps, (orjson.JSONDecodeError,), (TypeError,)
+        except ImportError:
+            if name == "orjson":
+                logger.warning("未安装 orjson，使用标准库 json")
+
+    if name in ("auto", "msgspec"):
+        try:
+            import msgspec
+
+            def _msgspec_dumps(obj, indent=None, default=None):
+                data = msgspec.json.encode(obj, enc_hook=default)
+                if indent is not None:
+                    data = msgspec.json.format(data, indent=indent)
+                return data
+
+            return (
+                "msgspec",
+                msgspec.json.decode,
+                _msgspec_dumps,
+                (msgspec.DecodeError,),
+                (TypeError, OverflowError, msgspec.EncodeError),
+            )
+        except ImportError:
+            if name == "msgspec":
+                logger.warning("未安装 msgspec，使用标准库 json")
+
+    return "json", _std_loads, _std_dumps, (), ()
+
+
+BACKEND, _fast_loads, _fast_dumps, _DECODE_ERRORS, _ENCODE_ERRORS = _load_backend(
+    os.getenv("DIFY_JSON_BACKEND", "auto").strip().lower()
+)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    解析 JSON
+
+    Args:
+        data: JSON 文本或 UTF-8 字节
+
+    Returns:
+        解析结果
+
+    Raises:
+        JSONDecodeError: 不是合法的 JSON（非字符串/字节输入同样抛出此异常）
+    """
+    if not isinstance(data, (str, bytes, bytearray)):
+        raise JSONDecodeError(f"不支持的 JSON 输入类型: {type(data).__name__}", "", 0)
+    if _fast_loads is _std_loads:
+        return json.loads(data)
+    pattern = _LONG_NUMBER if isinstance(data, str) else _LONG_NUMBER_BYTES
+    if pattern.search(data):
+        return json.loads(data)
+    try:
+        return _fast_loads(data)
+    except _DECODE_ERRORS as e:
+        # NaN / Infinity 等标准库可以解析的扩展写法
+        text = data if isinstance(data, str) else bytes(data).decode("utf-8", errors="replace")
+        if any(token in text for token in _NON_FINITE_TOKENS):
+            return json.loads(data)
+        if isinstance(e, JSONDecodeError):
+            raise
+        raise JSONDecodeError(str(e), text, 0) from e
+
+
+def _has_non_finite(obj: Any) -> bool:
+    """对象中是否有 NaN / Infinity（快速后端会把它们静默写成 null）"""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float):
+            if not math.isfinite(item):
+                return True
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return False
+
+
+def dumps_bytes(obj: Any, indent: Optional[int] = None, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    序列化为 UTF-8 编码的 JSON 字节（直接写文件时使用，避免多一次编解码）
+
+    Args:
+        obj: 要序列化的对象
+        indent: 缩进空格数，None 表示紧凑格式
+        default: 无法序列化的对象的转换函数
+
+    Returns:
+        JSON 字节
+    """
+    if _fast_dumps is _std_dumps:
+        return _std_dumps(obj, indent=indent, default=default)
+    try:
+        data = _fast_dumps(obj, indent=indent, default=default)
+    except _ENCODE_ERRORS:
+        return _std_dumps(obj, indent=indent, default=default)
+    # 只有输出中出现 null 时才可能有被改写的 NaN / Infinity，此时才遍历对象检查
+    if b"null" in data and _has_non_finite(obj):
+        return _std_dumps(obj, indent=indent, default=default)
+    return data
+
+
+def dumps(obj: Any, indent: Optional[int] = None, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    序列化为 JSON 字符串
+
+    Args:
+        obj: 要序列化的对象
+        indent: 缩进空格数，None 表示紧凑格式
+        default: 无法序列化的对象的转换函数
+
+    Returns:
+        JSON 字符串
+    """
+    return dumps_bytes(obj, indent=indent, default=default).decode("utf-8")
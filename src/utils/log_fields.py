@@ -0,0 +1,105 @@
+"""日志字段解析工具"""
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+from src.utils import jsoncodec
+
+
+def load_json_dict(value: Any) -> Dict[str, Any]:
+    """
+    把可能是 JSON 字符串的字段解析为字典
+
+    Args:
+        value: 字段值（dict、JSON 字符串或其他）
+
+    Returns:
+        解析后的字典，无法解析时返回空字典
+    """
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = jsoncodec.loads(value)
+        except (jsoncodec.JSONDecodeError, TypeError):
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+    return {}
+
+
+def to_float(value: Any) -> float:
+    """把数值或数值字符串转换为 float，无法转换时返回 0"""
+    if isinstance(value, bool):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+def extract_node_usage(node: Dict[str, Any]) -> Tuple[int, float]:
+    """
+    提取节点执行的 Token 数和费用
+
+    优先读取 execution_metadata，缺失时回退到 process_data.usage。
+
+    Args:
+        node: 节点执行详情
+
+    Returns:
+        (Token 数, 费用)
+    """
+    metadata = load_json_dict(node.get("execution_metadata"))
+    tokens = metadata.get("total_tokens")
+    price = metadata.get("total_price")
+
+    if tokens is None or price is None:
+        usage = load_json_dict(node.get("process_data")).get("usage")
+        if isinstance(usage, dict):
+            if tokens is None:
+                tokens = usage.get("total_tokens")
+            if price is None:
+                price = usage.get("total_price")
+
+    return int(to_float(tokens)), to_float(price)
+
+
+def iter_retrieval_hits(node_executions: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    遍历知识检索节点输出中的命中片段
+
+    Args:
+        node_executions: 节点执行详情列表
+
+    Yields:
+        命中片段（包含 content 和 metadata）
+    """
+    for node in node_executions or []:
+        if node.get("node_type") != "knowledge-retrieval":
+            continue
+        node_outputs = load_json_dict(node.get("outputs"))
+        for item in node_outputs.get("result") or []:
+            if isinstance(item, dict):
+                yield item
+
+
+def extract_query_and_answer(run_detail: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    从工作流运行详情中提取用户提问和 AI 回答
+
+    Args:
+        run_detail: 工作流运行详情
+
+    Returns:
+        (用户提问, AI 回答)
+    """
+    if not run_detail:
+        return "", ""
+    inputs = load_json_dict(run_detail.get("inputs"))
+    outputs = load_json_dict(run_detail.get("outputs"))
+    user_query = inputs.get("query") or inputs.get("sys.query", "") or ""
+    ai_answer = outputs.get("text", "") or ""
+    return str(user_query), str(ai_answer)
@@ -1,17 +1,282 @@
 """重试装饰器"""
 
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from typing import Callable, Type, Tuple, Any
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Type
 from tenacity import (
-    retry,
+    Retrying,
     stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    RetryError,
+    wait_random_exponential,
 )
 import requests
 
 from src.core.exceptions import DifyAPIError, DifyAuthenticationError
+from src.core.logger import LogSampler
+
+_sampler = LogSampler()
+
+# 这些状态码视为暂时性错误，会重试；其他 4xx（400/401/403/404 等）重试也不会成功，直接抛出
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# 没有状态码时，这些网络错误视为暂时性错误
+RETRYABLE_NETWORK_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+# Retry-After 超过这个时间时不再等待（服务端要求等待太久，按重试失败处理）
+MAX_RETRY_AFTER = 60.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 响应头的值（秒数或 HTTP 日期）
+
+    Returns:
+        需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _exception_chain(error: BaseException) -> Iterator[BaseException]:
+    """依次返回异常本身和它的 __cause__ / __context__"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for item in _exception_chain(error):
+        status_code = getattr(item, "status_code", None)
+        if status_code is None:
+            status_code = getattr(getattr(item, "response", None), "status_code", None)
+        if status_code is not None:
+            return status_code
+    return None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    读取异常对应响应的 Retry-After
+
+    Args:
+        error: 请求异常（DifyAPIError 会沿 __cause__ 找到原始的 requests 异常）
+
+    Returns:
+        需要等待的秒数，响应中没有 Retry-After 时返回 None
+    """
+    for item in _exception_chain(error):
+        retry_after = getattr(item, "retry_after", None)
+        if retry_after is not None:
+            return retry_after
+        response = getattr(item, "response", None)
+        if response is not None:
+            return parse_retry_after(response.headers.get("Retry-After"))
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    判断请求失败是否值得重试
+
+    有状态码时按状态码分类（408/425/429/5xx 重试，其他 4xx 不重试）；
+    没有状态码时只有连接失败、超时、响应体中断重试；认证错误不重试。
+
+    Args:
+        error: 请求异常
+
+    Returns:
+        是否重试
+    """
+    if isinstance(error, DifyAuthenticationError):
+        return False
+    status_code = _status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS
+    return any(isinstance(item, RETRYABLE_NETWORK_ERRORS) for item in _exception_chain(error))
+
+
+class RetryBudget:
+    """
+    一次运行内所有请求共享的重试预算
+
+    重试次数不超过 min_retries + ratio × 请求次数（可选再加一个绝对上限 max_retries）。
+    Dify 故障时大量请求同时失败，预算用完后不再重试，直接按失败处理，避免重试风暴拖长运行时间、加重服务端负担。
+    同时按接口统计请求次数、重试次数、重试等待时间和因预算用完而放弃的次数。
+    """
+
+    def __init__(self, ratio: float = 0.1, min_retries: int = 10, max_retries: Optional[int] = None):
+        """
+        初始化重试预算
+
+        Args:
+            ratio: 每个请求可以带来的重试次数（0.1 表示重试最多占请求数的 10%）
+            min_retries: 请求数很少时也允许的重试次数
+            max_retries: 重试次数的绝对上限（None 表示不限制）
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.max_retries = max_retries
+        self._requests = 0
+        self._retries = 0
+        self._endpoints: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint: str) -> Dict[str, float]:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = {"requests": 0, "retries": 0, "retry_wait_seconds": 0.0, "budget_exhausted": 0}
+            self._endpoints[endpoint] = stats
+        return stats
+
+    def record_request(self, endpoint: str):
+        """记录一次请求（不含重试）"""
+        with self._lock:
+            self._requests += 1
+            self._endpoint(endpoint)["requests"] += 1
+
+    def try_spend(self, endpoint: str) -> bool:
+        """
+        申请一次重试
+
+        Args:
+            endpoint: 接口名称
+
+        Returns:
+            预算是否还够（够时计入一次重试）
+        """
+        with self._lock:
+            limit = self.min_retries + self.ratio * self._requests
+            if self.max_retries is not None:
+                limit = min(limit, self.max_retries)
+            stats = self._endpoint(endpoint)
+            if self._retries >= limit:
+                stats["budget_exhausted"] += 1
+                return False
+            self._retries += 1
+            stats["retries"] += 1
+            return True
+
+    def record_wait(self, endpoint: str, seconds: float):
+        """记录一次重试前的等待时间"""
+        with self._lock:
+            self._endpoint(endpoint)["retry_wait_seconds"] += seconds
+
+    @property
+    def retries(self) -> int:
+        """已使用的重试次数"""
+        return self._retries
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按接口统计的请求和重试情况
+
+        Returns:
+            {接口: {requests, retries, retry_wait_seconds, budget_exhausted}}
+        """
+        with self._lock:
+            return {
+                endpoint: {**stats, "retry_wait_seconds": round(stats["retry_wait_seconds"], 1)}
+                for endpoint, stats in self._endpoints.items()
+            }
+
+
+def format_retry_stats(stats: Dict[str, Dict[str, Any]]) -> str:
+    """
+    把按接口统计的重试情况格式化为一行文字（只列出发生过重试或放弃重试的接口）
+
+    Args:
+        stats: RetryBudget.stats() 的结果
+
+    Returns:
+        如 "fetch_workflow_run_detail: 12/3000 次请求重试，等待 8.4 秒，预算用完放弃 5 次"
+    """
+    parts = []
+    for endpoint, item in stats.items():
+        if not item["retries"] and not item["budget_exhausted"]:
+            continue
+        part = f"{endpoint}: {item['retries']}/{item['requests']} 次请求重试，等待 {item['retry_wait_seconds']} 秒"
+        if item["budget_exhausted"]:
+            part += f"，预算用完放弃 {item['budget_exhausted']} 次"
+        parts.append(part)
+    return "；".join(parts) or "无"
+
+
+def create_retry_budget() -> RetryBudget:
+    """
+    按环境变量创建重试预算
+
+    读取 RETRY_BUDGET_RATIO（默认 0.1）、RETRY_BUDGET_MIN_RETRIES（默认 10）、
+    RETRY_BUDGET_MAX_RETRIES（默认不限制）。
+
+    Returns:
+        重试预算
+    """
+    max_retries = os.getenv("RETRY_BUDGET_MAX_RETRIES")
+    return RetryBudget(
+        ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.1")),
+        min_retries=int(os.getenv("RETRY_BUDGET_MIN_RETRIES", "10")),
+        max_retries=int(max_retries) if max_retries else None,
+    )
+
+
+_current_budget: "contextvars.ContextVar[Optional[RetryBudget]]" = contextvars.ContextVar("retry_budget", default=None)
+_DEFAULT_BUDGET: Optional[RetryBudget] = None
+_DEFAULT_BUDGET_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def retry_budget_scope(budget: RetryBudget) -> Iterator[RetryBudget]:
+    """
+    在当前上下文内使用指定的重试预算
+
+    Flow 中提交的 Task（线程任务执行器会复制上下文）共享同一个预算。
+
+    Args:
+        budget: 重试预算
+    """
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def get_retry_budget() -> RetryBudget:
+    """
+    获取当前上下文的重试预算（不在 retry_budget_scope 内时使用进程内共享的预算）
+
+    Returns:
+        重试预算
+    """
+    global _DEFAULT_BUDGET
+    budget = _current_budget.get()
+    if budget is not None:
+        return budget
+    with _DEFAULT_BUDGET_LOCK:
+        if _DEFAULT_BUDGET is None:
+            _DEFAULT_BUDGET = create_retry_budget()
+        return _DEFAULT_BUDGET
 
 
 def retry_on_api_error(
@@ -19,28 +284,62 @@ def retry_on_api_error(
     initial_wait: float = 1.0,
     max_wait: float = 10.0,
     retry_exceptions: Tuple[Type[Exception], ...] = (requests.RequestException, DifyAPIError),
+    endpoint: Optional[str] = None,
 ):
     """
     重试装饰器，用于 API 请求
-    
+
+    只重试暂时性错误（见 is_retryable），等待时间优先使用响应的 Retry-After，
+    否则使用 full jitter 指数退避（0 到 min(max_wait, initial_wait × 2^n) 之间随机），
+    每次重试都要从当前的重试预算（get_retry_budget）中申请，预算用完后不再重试。
+
     Args:
-        max_attempts: 最大重试次数
+        max_attempts: 最大尝试次数（含第一次请求）
         initial_wait: 初始等待时间（秒）
         max_wait: 最大等待时间（秒）
         retry_exceptions: 需要重试的异常类型
-    
+        endpoint: 统计用的接口名称（默认使用函数名）
+
     Returns:
         装饰器函数
     """
+    backoff = wait_random_exponential(multiplier=initial_wait, max=max_wait)
+
     def decorator(func: Callable) -> Callable:
+        name = endpoint or func.__name__
+
         @wraps(func)
-        @retry(
-            stop=stop_after_attempt(max_attempts),
-            wait=wait_exponential(multiplier=initial_wait, max=max_wait),
-            retry=retry_if_exception_type(retry_exceptions),
-            reraise=True,
-        )
         def wrapper(*args, **kwargs) -> Any:
-            return func(*args, **kwargs)
+            budget = get_retry_budget()
+            budget.record_request(name)
+
+            def should_retry(retry_state) -> bool:
+                error = retry_state.outcome.exception()
+                if error is None or not isinstance(error, retry_exceptions) or not is_retryable(error):
+                    return False
+                if retry_state.attempt_number >= max_attempts:
+                    return False
+                retry_after = retry_after_seconds(error)
+                if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                    return False
+                if not budget.try_spend(name):
+                    _sampler.warning("budget", "重试预算已用完，{} 失败后不再重试: {}", name, error)
+                    return False
+                return True
+
+            def wait(retry_state) -> float:
+                retry_after = retry_after_seconds(retry_state.outcome.exception())
+                seconds = retry_after if retry_after is not None else backoff(retry_state)
+                budget.record_wait(name, seconds)
+                return seconds
+
+            for attempt in Retrying(
+                stop=stop_after_attempt(max_attempts),
+                wait=wait,
+                retry=should_retry,
+                reraise=True,
+            ):
+                with attempt:
+                    return func(*args, **kwargs)
         return wrapper
     return decorator
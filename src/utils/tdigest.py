@@ -0,0 +1,198 @@
+"""t-digest 流式分位数估计"""
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class TDigest:
+    """
+    t-digest 流式分位数估计器（merging 变体）
+
+    内存占用只与压缩参数有关，与样本数量无关；尾部分位数（p99 等）精度较高。
+    多个分片的摘要可以通过 merge 合并，也可以 to_dict/from_dict 序列化后再合并。
+    """
+
+    def __init__(self, compression: float = 100.0):
+        """
+        初始化 t-digest
+
+        Args:
+            compression: 压缩参数，越大越精确，质心数量大约不超过该值
+        """
+        self.compression = float(compression)
+        self._centroids: List[Tuple[float, float]] = []
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_size = max(int(self.compression) * 5, 50)
+        self.count = 0.0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        """添加一个样本"""
+        if value is None or weight <= 0:
+            return
+        value = float(value)
+        if math.isnan(value):
+            return
+
+        self._buffer.append((value, float(weight)))
+        self.count += weight
+        self.total += value * weight
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        """批量添加样本"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """
+        合并另一个 t-digest（原地修改并返回自身）
+
+        Args:
+            other: 另一个分片的 t-digest
+        """
+        if other.count <= 0:
+            return self
+
+        for mean, weight in other._centroids + other._buffer:
+            self._buffer.append((mean, weight))
+        self.count += other.count
+        self.total += other.total
+        if self.min is None or (other.min is not None and other.min < self.min):
+            self.min = other.min
+        if self.max is None or (other.max is not None and other.max > self.max):
+            self.max = other.max
+
+        self._compress()
+        return self
+
+    @property
+    def mean(self) -> Optional[float]:
+        """样本均值"""
+        if self.count <= 0:
+            return None
+        return self.total / self.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        估计分位数
+
+        Args:
+            q: 分位点，取值 [0, 1]
+
+        Returns:
+            分位数估计值，没有样本时返回 None
+        """
+        if self.count <= 0:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError("q 必须在 [0, 1] 范围内")
+
+        self._compress()
+        centroids = self._centroids
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        if len(centroids) == 1:
+            return centroids[0][0]
+
+        target = q * self.count
+
+        # 第一个质心中心之前：在 min 和第一个质心之间插值
+        first_mean, first_weight = centroids[0]
+        if target < first_weight / 2:
+            if first_weight <= 1:
+                return self.min
+            return self.min + (first_mean - self.min) * target / (first_weight / 2)
+
+        # 最后一个质心中心之后：在最后一个质心和 max 之间插值
+        last_mean, last_weight = centroids[-1]
+        if target > self.count - last_weight / 2:
+            if last_weight <= 1:
+                return self.max
+            remaining = self.count - target
+            return self.max - (self.max - last_mean) * remaining / (last_weight / 2)
+
+        # 相邻质心中心之间线性插值
+        cumulative = 0.0
+        for i in range(len(centroids) - 1):
+            mean, weight = centroids[i]
+            next_mean, next_weight = centroids[i + 1]
+            left = cumulative + weight / 2
+            right = cumulative + weight + next_weight / 2
+            if left <= target <= right:
+                if right == left:
+                    return mean
+                return mean + (next_mean - mean) * (target - left) / (right - left)
+            cumulative += weight
+
+        return last_mean
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可 JSON 化的字典"""
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "centroids": [[mean, weight] for mean, weight in self._centroids],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TDigest":
+        """从 to_dict 的结果恢复"""
+        digest = cls(compression=data.get("compression", 100.0))
+        digest._centroids = [(float(mean), float(weight)) for mean, weight in data.get("centroids", [])]
+        digest.count = float(data.get("count", 0.0))
+        digest.total = float(data.get("total", 0.0))
+        digest.min = data.get("min")
+        digest.max = data.get("max")
+        return digest
+
+    def _k(self, q: float) -> float:
+        """k1 尺度函数"""
+        q = min(max(q, 0.0), 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, q: float) -> float:
+        """从分位点 q 开始，一个质心最多可以覆盖到的分位点"""
+        k = min(self._k(q) + 1, self.compression / 4)
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        """把缓冲区中的样本合并进质心"""
+        if not self._buffer:
+            return
+
+        points = sorted(self._centroids + self._buffer, key=lambda c: c[0])
+        self._buffer = []
+        total_weight = sum(weight for _, weight in points)
+
+        merged: List[Tuple[float, float]] = []
+        cur_mean, cur_weight = points[0]
+        weight_so_far = 0.0
+        limit = total_weight * self._q_limit(0.0)
+
+        for mean, weight in points[1:]:
+            if weight_so_far + cur_weight + weight <= limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                weight_so_far += cur_weight
+                merged.append((cur_mean, cur_weight))
+                limit = total_weight * self._q_limit(weight_so_far / total_weight)
+                cur_mean, cur_weight = mean, weight
+
+        merged.append((cur_mean, cur_weight))
+        self._centroids = merged
@@ -0,0 +1,29 @@
+"""原子写入测试"""
+
+import os
+import stat
+
+from src.utils import atomic
+from src.utils.atomic import atomic_write_bytes
+
+
+def _mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_default_permissions_follow_umask(tmp_path, monkeypatch):
+    umask = os.umask(0o027)
+    monkeypatch.setattr(atomic, "_default_permissions", None)
+    try:
+        atomic_write_bytes(tmp_path / "a.bin", b"x")
+        assert _mode(tmp_path / "a.bin") == 0o640
+        # 读取 umask 不会修改它
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(umask)
+
+
+def test_explicit_permissions(tmp_path):
+    atomic_write_bytes(tmp_path / "secret.json", b"{}", permissions=0o600)
+    assert _mode(tmp_path / "secret.json") == 0o600
+    assert os.listdir(tmp_path) == ["secret.json"]
@@ -0,0 +1,27 @@
+"""检查点测试"""
+
+from datetime import datetime, timezone
+
+from src.flows.tasks.fetch_task import _dedupe_by_id
+from src.services.checkpoint import RunCheckpoint, is_bounded_window
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def test_only_past_upper_bound_is_bounded():
+    assert is_bounded_window("2026-10-19T00:00:00Z", now=NOW)
+    assert is_bounded_window("2026-10-01", now=NOW)
+    assert not is_bounded_window(None, now=NOW)
+    assert not is_bounded_window("2026-10-20T00:00:00+08:00", now=NOW)
+    assert not is_bounded_window("昨天", now=NOW)
+
+
+def test_resumed_pages_are_deduplicated(tmp_path):
+    with RunCheckpoint(str(tmp_path), "key") as checkpoint:
+        checkpoint.save_page(1, [{"id": "c"}, {"id": "b"}], has_more=True)
+    logs, next_page, finished = RunCheckpoint(str(tmp_path), "key").load_pages()
+    assert (next_page, finished) == (2, False)
+
+    # 新日志 d 产生后，第 2 页的开头是第 1 页已经获取过的 b
+    logs.extend([{"id": "b"}, {"id": "a"}])
+    assert [log["id"] for log in _dedupe_by_id(logs)] == ["c", "b", "a"]
@@ -0,0 +1,35 @@
+"""运行配置解析测试"""
+
+import os
+import stat
+
+from src.core.config_resolver import BlockConfigCache, default_config_cache_dir
+from src.utils import atomic
+
+
+def test_cache_file_is_private_from_creation(tmp_path, monkeypatch):
+    modes = []
+    real_replace = os.replace
+
+    def record_replace(src, dst):
+        modes.append(stat.S_IMODE(os.stat(src).st_mode))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(atomic.os, "replace", record_replace)
+    umask = os.umask(0)
+    try:
+        cache = BlockConfigCache(tmp_path / "cache")
+        cache._write_disk("daily", {"data": {"api_token": "app-secret"}})
+    finally:
+        os.umask(umask)
+
+    assert modes == [0o600]
+    assert stat.S_IMODE(os.stat(tmp_path / "cache" / "daily.json").st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(tmp_path / "cache").st_mode) == 0o700
+    assert cache._read_disk("daily") == {"data": {"api_token": "app-secret"}}
+
+
+def test_default_cache_dir_is_outside_output_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("OUTPUT_BASE_DIR", str(tmp_path / "outputs"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert default_config_cache_dir() == tmp_path / "xdg" / "dify-workflow-monitor" / "block-config"
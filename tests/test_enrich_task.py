@@ -0,0 +1,21 @@
+"""丰富日志 Task 测试"""
+
+import sqlite3
+
+from src.flows.tasks import enrich_task
+from src.flows.tasks.enrich_task import update_local_indexes
+from src.services.retrieval_index import RetrievalHitIndex
+
+
+def test_index_that_cannot_open_is_skipped(tmp_path, monkeypatch):
+    class BrokenIndex:
+        DB_FILENAME = "search.db"
+
+        def __init__(self, index_dir):
+            raise sqlite3.OperationalError("no such tokenizer: trigram")
+
+    monkeypatch.setattr(enrich_task, "LogSearchIndex", BrokenIndex)
+    update_local_indexes([{"id": "log-1"}], str(tmp_path), with_node_executions=True)
+
+    assert RetrievalHitIndex.exists(str(tmp_path))
+    assert not (tmp_path / "search.db").exists()
@@ -0,0 +1,27 @@
+"""格式化工具测试"""
+
+from src.utils import jsoncodec
+from src.utils.formatters import format_json_for_markdown
+
+
+def _sample():
+    return {
+        "query": "退款流程",
+        "context": jsoncodec.dumps({"docs": [{"id": i, "text": "内容" * 30} for i in range(50)]}),
+        "items": [[], {}, "", None, True, 1.5, list(range(20))],
+    }
+
+
+def test_capped_output_keeps_prefix():
+    full = format_json_for_markdown(_sample())
+    for max_chars in (1, 2, 10, 57, 300, 1000, len(full) - 1, len(full), len(full) + 10):
+        capped = format_json_for_markdown(_sample(), max_chars=max_chars)
+        assert capped[:max_chars] == full[:max_chars]
+        if len(full) <= max_chars:
+            assert capped == full
+
+
+def test_capped_output_stops_traversal():
+    data = {"rows": [{"text": "x" * 1000} for _ in range(10000)]}
+    capped = format_json_for_markdown(data, max_chars=500)
+    assert len(capped) < 5000
@@ -0,0 +1,42 @@
+"""JSON 编解码测试"""
+
+import json
+import math
+
+from src.utils import jsoncodec
+
+
+def _std(obj, indent=None):
+    if indent is None:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(obj, ensure_ascii=False, indent=indent)
+
+
+def test_non_finite_floats_match_stdlib():
+    obj = {"a": float("nan"), "b": float("inf"), "c": [1, {"d": float("-inf")}], "e": None}
+    for indent in (None, 2):
+        assert jsoncodec.dumps(obj, indent=indent) == _std(obj, indent)
+    decoded = jsoncodec.loads(jsoncodec.dumps_bytes(obj))
+    assert math.isnan(decoded["a"])
+    assert decoded["b"] == float("inf")
+    assert decoded["c"][1]["d"] == float("-inf")
+    assert decoded["e"] is None
+
+
+def test_large_ints_round_trip():
+    obj = {"big": 2 ** 64 + 1, "neg": -(2 ** 70), "small": 1}
+    assert jsoncodec.dumps(obj) == _std(obj)
+    assert jsoncodec.loads(jsoncodec.dumps(obj)) == obj
+
+
+def test_non_str_keys_match_stdlib():
+    obj = {1: "a", 2.5: "b", None: "c", False: "d"}
+    assert jsoncodec.dumps(obj) == _std(obj)
+    assert jsoncodec.loads(jsoncodec.dumps(obj)) == json.loads(_std(obj))
+
+
+def test_unicode_and_indent_match_stdlib():
+    obj = {"文本": "中文 \"引号\" \n", "list": [1, 2.5, None, True, {}], "empty": []}
+    for indent in (None, 2):
+        assert jsoncodec.dumps(obj, indent=indent) == _std(obj, indent)
+    assert jsoncodec.loads(jsoncodec.dumps(obj)) == obj
@@ -0,0 +1,16 @@
+"""日志工具测试"""
+
+import pickle
+
+from src.core.logger import LogSampler
+
+
+def test_log_sampler_survives_pickling():
+    sampler = LogSampler(interval=60)
+    assert sampler.sample("enrich") == 0
+    assert sampler.sample("enrich") is None
+
+    # 进程池执行器会连带序列化任务模块中的采样器
+    restored = pickle.loads(pickle.dumps(sampler))
+    assert restored.sample("enrich") is None
+    assert restored.sample("other") == 0
@@ -0,0 +1,162 @@
+"""通知分发测试（本地 SMTP 服务器和 HTTP 服务器代替真实的邮件服务器 / 钉钉）"""
+
+import json
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from src.services.notification_dispatcher import NotificationSpool, get_notification_dispatcher
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+class _SMTPHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        message = message_from_bytes(envelope.content)
+        self.messages.append(str(make_header(decode_header(message["Subject"]))))
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = _SMTPHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield port, handler.messages
+    finally:
+        controller.stop()
+
+
+@pytest.fixture
+def dingtalk_server():
+    received = []
+    status = {"code": 200}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            body = b'{"errcode": 0}'
+            self.send_response(status["code"])
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/robot/send", received, status
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# 模拟部署的一次运行：在单独的进程中提交一条报告通知，标准输入关闭后退出
+_RUN_SCRIPT = """
+import sys
+from src.services.notification_dispatcher import get_notification_dispatcher
+
+dispatcher = get_notification_dispatcher(
+    "email",
+    digest_window=60.0,
+    spool_dir=sys.argv[1],
+    smtp_host="127.0.0.1",
+    smtp_port=int(sys.argv[2]),
+    smtp_user="monitor@example.com",
+    smtp_password="",
+    smtp_to="ops@example.com",
+    smtp_starttls=False,
+)
+dispatcher.submit_report_ready(sys.argv[3], "csv")
+sys.stdin.read()
+"""
+
+
+def _start_run(tmp_path, port: int, report_path: str) -> subprocess.Popen:
+    run = subprocess.Popen(
+        [sys.executable, "-c", _RUN_SCRIPT, str(tmp_path), str(port), report_path],
+        cwd=PROJECT_ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    spool = tmp_path / NotificationSpool.DB_FILENAME
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if spool.exists():
+            with sqlite3.connect(str(spool)) as conn:
+                (found,) = conn.execute(
+                    "SELECT COUNT(*) FROM pending_reports WHERE report_path = ?", (report_path,)
+                ).fetchone()
+            if found:
+                return run
+        time.sleep(0.1)
+    run.kill()
+    raise AssertionError(f"运行未提交通知: {report_path}")
+
+
+def _finish_run(run: subprocess.Popen) -> float:
+    started = time.time()
+    run.stdin.close()
+    assert run.wait(timeout=30) == 0
+    return time.time() - started
+
+
+def test_reports_from_separate_processes_are_merged(tmp_path, smtp_server):
+    port, messages = smtp_server
+    first = _start_run(tmp_path, port, "report-0.csv")
+    second = _start_run(tmp_path, port, "report-1.csv")
+
+    # 先提交的运行退出时留给之后提交的运行发送，最后提交的运行退出时立即合并发送，都不等待 60 秒的合并窗口
+    assert _finish_run(first) < 15
+    assert messages == []
+    assert _finish_run(second) < 15
+
+    assert messages == ["📊 2 份报告已生成"]
+    assert NotificationSpool(str(tmp_path)).remaining({1, 2}) == set()
+
+
+def test_reports_in_window_sent_as_one_digest(tmp_path, dingtalk_server):
+    url, received, _ = dingtalk_server
+    dispatcher = get_notification_dispatcher(
+        "dingtalk", digest_window=0.5, spool_dir=str(tmp_path), webhook_url=url
+    )
+    for i in range(3):
+        assert dispatcher.submit_report_ready(f"report-{i}.csv", "csv")
+    dispatcher.close()
+
+    assert len(received) == 1
+    assert received[0]["markdown"]["title"] == "📊 3 份报告已生成"
+
+
+def test_failed_send_is_not_retried_forever(tmp_path, dingtalk_server):
+    url, received, status = dingtalk_server
+    status["code"] = 500
+    dispatcher = get_notification_dispatcher(
+        "dingtalk", digest_window=0, spool_dir=str(tmp_path), webhook_url=url + "?failing"
+    )
+    assert dispatcher.submit_report_ready("report.csv", "csv")
+    dispatcher.close()
+
+    assert len(received) == 1
+    assert NotificationSpool(str(tmp_path)).deadline(dispatcher.channel, 0) is None
@@ -0,0 +1,83 @@
+"""报告输出测试"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from src.services import report_sinks
+from src.services.report_sinks import ReportSink, generate_reports
+from src.services.webhook_sender import WebhookBatchSender
+
+
+@pytest.fixture
+def webhook_server():
+    keys = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            keys.append(self.headers["Idempotency-Key"])
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/ingest", keys
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _push(url: str, count: int) -> None:
+    sender = WebhookBatchSender(url, batch_max_records=10, max_in_flight=3)
+    for i in range(count):
+        sender.add(json.dumps({"id": f"log-{i}"}).encode(), record_id=f"log-{i}")
+    sender.close()
+
+
+def test_idempotency_keys_are_stable_across_runs(webhook_server):
+    url, keys = webhook_server
+    _push(url, 25)
+    first_run = sorted(keys)
+    keys.clear()
+    _push(url, 25)
+
+    assert len(first_run) == 3
+    assert len(set(first_run)) == 3
+    assert sorted(keys) == first_run
+
+
+class _FailingSink(ReportSink):
+    def write(self, idx, log):
+        if idx == 2:
+            raise RuntimeError("写入失败")
+
+    def close(self, meta):
+        return []
+
+
+def test_failed_write_aborts_opened_sinks(tmp_path, monkeypatch, webhook_server):
+    url, keys = webhook_server
+    monkeypatch.setitem(report_sinks._SINK_REGISTRY, "failing", _FailingSink)
+    logs = [{"id": f"log-{i}", "workflow_run": {"status": "succeeded"}} for i in range(3)]
+
+    with pytest.raises(RuntimeError):
+        generate_reports(
+            {"data": logs, "total": 3},
+            str(tmp_path),
+            output_format="markdown,ndjson,webhook,failing",
+            sink_options={"webhook": {"url": url}},
+            force=True,
+        )
+
+    assert list(tmp_path.iterdir()) == []
+    assert keys == []
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("webhook")]
@@ -0,0 +1,118 @@
+"""S3 存储测试（使用 moto 模拟 S3）"""
+
+from datetime import date, timedelta
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.services import s3_storage
+from src.services.s3_storage import MIN_PART_SIZE, S3StorageService
+from src.services.storage import partition_path
+
+BUCKET = "dify-logs"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        s3_storage._CLIENT_CACHE.clear()
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    s3_storage._CLIENT_CACHE.clear()
+
+
+def _service(prefix: str = "team-a") -> S3StorageService:
+    return S3StorageService(
+        BUCKET,
+        access_key_id="testing",
+        secret_access_key="testing",
+        region="us-east-1",
+        prefix=prefix,
+        part_size=MIN_PART_SIZE,
+        max_concurrency=2,
+    )
+
+
+def _keys(client, prefix: str = "") -> list:
+    response = client.list_objects_v2(Bucket=BUCKET, Prefix=prefix)
+    return sorted(obj["Key"] for obj in response.get("Contents", []))
+
+
+def _uploads(client) -> list:
+    return client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+
+
+def test_multipart_upload_across_part_size(s3):
+    service = _service()
+    chunk = bytes(range(256)) * 4096  # 1MB
+    with service.open_upload("data/large.bin") as writer:
+        for _ in range(11):
+            writer.write(chunk)
+    assert writer._upload_id is not None
+    assert len(writer._parts) == 3
+
+    body = s3.get_object(Bucket=BUCKET, Key="team-a/data/large.bin")["Body"].read()
+    assert body == chunk * 11
+    assert _uploads(s3) == []
+
+
+def test_small_upload_uses_put_object(s3):
+    service = _service()
+    with service.open_upload("data/small.bin") as writer:
+        writer.write(b"hello")
+    assert writer._upload_id is None
+    assert service.object_size("data/small.bin") == 5
+
+
+def test_read_range(s3):
+    service = _service()
+    with service.open_upload("data/range.bin") as writer:
+        writer.write(b"0123456789")
+    assert service.read_range("data/range.bin", 2, 5) == b"2345"
+    assert service.read_range("data/range.bin", 7) == b"789"
+
+
+def test_abort_on_exception_leaves_nothing(s3):
+    service = _service()
+    with pytest.raises(RuntimeError):
+        with service.open_upload("data/broken.bin") as writer:
+            writer.write(b"x" * (MIN_PART_SIZE + 1))
+            raise RuntimeError("写入中断")
+    assert writer._upload_id is not None
+    assert _keys(s3) == []
+    assert _uploads(s3) == []
+
+    with pytest.raises(RuntimeError):
+        with service.open_writer("reports/daily/broken.md", "report") as storage_writer:
+            storage_writer.write(b"x" * (MIN_PART_SIZE * 2))
+            raise RuntimeError("写入中断")
+    assert _keys(s3) == []
+    assert _uploads(s3) == []
+
+
+def test_list_reports_within_prefix(s3):
+    service = _service()
+    service.save_report(b"# a", "a.md", "daily")
+    service.save_report(b"# b", "b.md", "weekly")
+    _service(prefix="team-b").save_report(b"# c", "c.md", "daily")
+
+    assert service.list_reports("daily") == [f"s3://{BUCKET}/team-a/reports/daily/a.md"]
+    assert _keys(s3, "team-a/") == ["team-a/reports/daily/a.md", "team-a/reports/weekly/b.md"]
+
+
+def test_cleanup_old_files(s3):
+    service = _service()
+    old_day = date.today() - timedelta(days=60)
+    recent_day = date.today() - timedelta(days=1)
+    for day in (old_day, recent_day):
+        with service.open_writer(partition_path("app-1", day), "data", compression="none") as writer:
+            writer.write(b"{}\n")
+    service.save_report(b"# a", "a.md", "daily")
+    _service(prefix="team-b").save_report(b"# c", "c.md", "daily")
+
+    assert service.cleanup_old_files(days=30) == 1
+    assert service.list_partitions("app-1") == [partition_path("app-1", recent_day)]
+    assert _keys(s3, "team-a/reports/") == ["team-a/reports/daily/a.md"]
+    assert _keys(s3, "team-b/") == ["team-b/reports/daily/c.md"]
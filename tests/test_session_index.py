@@ -0,0 +1,24 @@
+"""跨运行会话索引测试"""
+
+from src.services.session_index import SessionIndex
+
+
+def test_orders_across_runs_overlap_and_late_arrival(tmp_path):
+    with SessionIndex(str(tmp_path)) as index:
+        # 第一次运行：两条日志，第二条占两行
+        assert index.assign_orders({"s1": [(10.0, "a", 1), (20.0, "b", 2)]}) == {("s1", "a"): 1, ("s1", "b"): 2}
+
+        # 第二次运行：时间窗口与上次重叠（b 再次出现），新增 c
+        assert index.assign_orders({"s1": [(20.0, "b", 2), (30.0, "c", 1)]}) == {("s1", "b"): 2, ("s1", "c"): 4}
+
+    with SessionIndex(str(tmp_path)) as index:
+        # 第三次运行：晚到的日志插入 a 和 b 之间，其后的条目后移
+        assert index.assign_orders({"s1": [(15.0, "late", 1), (40.0, "d", 1)]}) == {
+            ("s1", "late"): 2,
+            ("s1", "d"): 6,
+        }
+        rows = index.conn.execute(
+            "SELECT log_id, start_order FROM session_entries WHERE session_id = 's1' ORDER BY created_at"
+        ).fetchall()
+
+    assert rows == [("a", 1), ("late", 2), ("b", 3), ("c", 5), ("d", 6)]
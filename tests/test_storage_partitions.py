@@ -0,0 +1,96 @@
+"""分区合并与过期清理测试（本地存储）"""
+
+import io
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+from src.core.exceptions import DifyStorageError
+from src.services.storage import LocalStorageService, partition_path
+
+
+def _write_daily(service: LocalStorageService, day: date, content: bytes) -> str:
+    with service.open_writer(partition_path("app-1", day), "data", compression="none") as writer:
+        writer.write(content)
+    return partition_path("app-1", day)
+
+
+def _read(service: LocalStorageService, relative_path: str) -> bytes:
+    with service.open_reader(relative_path) as reader:
+        return reader.read()
+
+
+def test_compact_daily_into_weekly_and_monthly(tmp_path):
+    service = LocalStorageService(str(tmp_path))
+    monday = date(2025, 1, 6)
+    _write_daily(service, monday, b'{"id": 1}\n')
+    _write_daily(service, monday + timedelta(days=2), b'{"id": 2}')
+
+    result = service.compact_partitions("app-1", "weekly", compression="none")
+
+    weekly = partition_path("app-1", monday, "weekly")
+    assert weekly.endswith("weekly/2025-W02.ndjson")
+    assert result["merged_files"] == 2
+    assert result["records"] == 2
+    assert service.list_partitions("app-1") == [weekly]
+    assert _read(service, weekly) == b'{"id": 1}\n{"id": 2}\n'
+
+    for day in (date(2025, 2, 3), date(2025, 2, 17)):
+        _write_daily(service, day, f'{{"day": "{day}"}}\n'.encode())
+    service.compact_partitions("app-1", "monthly", compression="none")
+
+    monthly = partition_path("app-1", date(2025, 2, 1), "monthly")
+    assert service.list_partitions("app-1", start=date(2025, 2, 1)) == [monthly]
+    assert _read(service, monthly) == b'{"day": "2025-02-03"}\n{"day": "2025-02-17"}\n'
+
+
+def test_late_daily_is_merged_into_existing_compacted_file(tmp_path):
+    service = LocalStorageService(str(tmp_path))
+    monday = date(2025, 1, 6)
+    _write_daily(service, monday, b'{"id": 1}\n')
+    service.compact_partitions("app-1", "weekly", compression="none")
+
+    _write_daily(service, monday + timedelta(days=4), b'{"id": 2}\n')
+    result = service.compact_partitions("app-1", "weekly", compression="none")
+
+    weekly = partition_path("app-1", monday, "weekly")
+    assert result["compacted"] == [str(tmp_path / weekly)]
+    assert result["merged_files"] == 1
+    assert service.list_partitions("app-1") == [weekly]
+    assert _read(service, weekly) == b'{"id": 1}\n{"id": 2}\n'
+
+
+def test_checksum_mismatch_keeps_daily_files(tmp_path, monkeypatch):
+    service = LocalStorageService(str(tmp_path))
+    monday = date(2025, 1, 6)
+    dailies = [_write_daily(service, monday + timedelta(days=i), b'{"id": 1}\n') for i in range(2)]
+    weekly = partition_path("app-1", monday, "weekly")
+    open_reader = service.open_reader
+
+    @contextmanager
+    def corrupted_reader(relative_path, *args, **kwargs):
+        if relative_path == weekly:
+            yield io.BytesIO(b"corrupted\n")
+        else:
+            with open_reader(relative_path, *args, **kwargs) as reader:
+                yield reader
+
+    monkeypatch.setattr(service, "open_reader", corrupted_reader)
+    with pytest.raises(DifyStorageError):
+        service.compact_partitions("app-1", "weekly", compression="none")
+
+    for daily in dailies:
+        assert (tmp_path / daily).exists()
+
+
+def test_cleanup_deletes_compacted_files_by_period_end(tmp_path):
+    service = LocalStorageService(str(tmp_path))
+    old_day = date.today() - timedelta(days=70)
+    recent_day = date.today() - timedelta(days=14)
+    for day in (old_day, recent_day):
+        _write_daily(service, day, b'{"id": 1}\n')
+    service.compact_partitions("app-1", "weekly", min_age_days=0, compression="none")
+
+    assert service.cleanup_old_files(days=30) == 1
+    assert service.list_partitions("app-1") == [partition_path("app-1", recent_day, "weekly")]